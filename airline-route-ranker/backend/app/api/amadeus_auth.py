@@ -0,0 +1,180 @@
+"""
+Amadeus OAuth access-token management.
+
+The client-credentials token lasts about 30 minutes, so it is cached
+process-wide and refreshed in the background shortly before it expires.
+Refreshes are single-flight: concurrent searches share one token request.
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from ..utils.http_client import upstream_request
+from ..utils.circuit_breaker import CircuitOpenError
+from ..utils.config import AMADEUS_TOKEN_REFRESH_MARGIN
+
+AMADEUS_BASE_URL = "https://test.api.amadeus.com"
+AMADEUS_TOKEN_URL = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+
+
+class AmadeusAuthError(Exception):
+    """Raised when an Amadeus access token cannot be obtained."""
+
+
+class AmadeusTokenManager:
+    """Cache and proactively refresh the Amadeus access token."""
+    
+    def __init__(self, refresh_margin: float = AMADEUS_TOKEN_REFRESH_MARGIN):
+        """
+        Initialize the token manager.
+        
+        Args:
+            refresh_margin: Seconds before expiry at which the token is refreshed
+        """
+        self.refresh_margin = refresh_margin
+        self._access_token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+        self._stats = {"token_requests": 0, "token_failures": 0, "invalidations": 0}
+    
+    def _has_valid_token(self) -> bool:
+        """Check whether the cached token can still be used."""
+        return self._access_token is not None and time.time() < self._expires_at
+    
+    async def get_token(self) -> str:
+        """
+        Get a valid access token, fetching a new one only if needed.
+        
+        Returns:
+            The access token
+            
+        Raises:
+            AmadeusAuthError: If no token could be obtained
+        """
+        if self._has_valid_token():
+            return self._access_token
+        
+        return await asyncio.shield(self._start_refresh())
+    
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """
+        Drop the cached token (e.g. after a 401 from the search API).
+        
+        Args:
+            token: The token that was rejected. If a newer token has been cached
+                in the meantime it is kept.
+        """
+        if token is None or token == self._access_token:
+            print("⚠️ Dropping cached Amadeus access token")
+            self._access_token = None
+            self._expires_at = 0.0
+            self._stats["invalidations"] += 1
+    
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a token refresh, or join the one already in flight."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch_token())
+        return self._refresh_task
+    
+    async def _fetch_token(self) -> str:
+        """Request a new token from Amadeus and schedule its background refresh."""
+        load_dotenv()
+        api_key = os.environ.get("AMADUS_KEY")
+        api_secret = os.environ.get("AMADUS_SECRET")
+        
+        if not api_key or not api_secret:
+            print("Warning: API credentials not set correctly. Please check environment variables.")
+            raise AmadeusAuthError("API credentials not configured")
+        
+        self._stats["token_requests"] += 1
+        
+        # Visual indicator for API call start
+        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 MAKING API CALL FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
+        print(f"Requesting Amadeus Authentication Token...")
+        auth_data = {
+            "grant_type": "client_credentials",
+            "client_id": api_key,
+            "client_secret": api_secret
+        }
+        
+        try:
+            auth_response = await upstream_request("POST", AMADEUS_TOKEN_URL, data=auth_data, timeout=10)
+            auth_response.raise_for_status()
+            token_data = auth_response.json()
+        except httpx.HTTPError as e:
+            # Visual indicator for API call end with error
+            print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
+            print(f"Error during authentication: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    print(f"Response body: {e.response.json()}")
+                except json.JSONDecodeError:
+                    print(f"Response body (non-JSON): {e.response.text}")
+            self._stats["token_failures"] += 1
+            raise AmadeusAuthError(f"Authentication failed: {str(e)}") from e
+        except CircuitOpenError as e:
+            print(f"⚠️ Skipping Amadeus authentication: {e}")
+            self._stats["token_failures"] += 1
+            raise AmadeusAuthError(f"Authentication unavailable: {e}") from e
+        except json.JSONDecodeError as e:
+            # Visual indicator for API call end with error
+            print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
+            print("Error decoding authentication response.")
+            self._stats["token_failures"] += 1
+            raise AmadeusAuthError("Authentication response decode error") from e
+        
+        access_token = token_data.get("access_token")
+        if not access_token:
+            print("Failed to retrieve access token.")
+            self._stats["token_failures"] += 1
+            raise AmadeusAuthError("No access token received")
+        
+        # Amadeus tokens last about 30 minutes; fall back to that if expires_in is missing
+        expires_in = float(token_data.get("expires_in", 1799))
+        self._access_token = access_token
+        self._expires_at = time.time() + expires_in
+        print(f"Authentication Successful (token valid for {expires_in:.0f}s).")
+        # Visual indicator for API call end
+        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 COMPLETED API CALL FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
+        
+        self._schedule_background_refresh(expires_in)
+        return access_token
+    
+    def _schedule_background_refresh(self, expires_in: float) -> None:
+        """Refresh the token in the background shortly before it expires."""
+        if self._background_task is not None and not self._background_task.done():
+            self._background_task.cancel()
+        
+        delay = max(expires_in - self.refresh_margin, 0)
+        self._background_task = asyncio.create_task(self._refresh_after(delay))
+    
+    async def _refresh_after(self, delay: float) -> None:
+        """Wait for the given delay, then refresh the token."""
+        await asyncio.sleep(delay)
+        # Past this point the task only waits on the refresh itself; detach it so the
+        # refresh scheduling the next one cannot cancel the task awaiting it
+        if self._background_task is asyncio.current_task():
+            self._background_task = None
+        try:
+            await self._start_refresh()
+        except AmadeusAuthError as e:
+            # The current token stays usable until it expires; the next search retries
+            print(f"⚠️ Background Amadeus token refresh failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return token cache statistics."""
+        return {
+            **self._stats,
+            "token_cached": self._has_valid_token(),
+            "expires_in_seconds": max(round(self._expires_at - time.time()), 0) if self._access_token else 0,
+        }
+
+
+# Process-wide token manager shared by all route searches
+amadeus_token_manager = AmadeusTokenManager()
@@ -4,15 +4,33 @@ Reliability API functionality for flight reliability analysis.
 import os
 import json
 import time
+import asyncio
 from dotenv import load_dotenv
-import requests
+import httpx
 
 # Replace the pickle cache import with Supabase client import
 from ..utils.supabase_client import (
-    get_historical_flight_data, save_historical_flight_data,
-    get_recent_flight_data, save_recent_flight_data,
-    FLIGHT_CACHE_EXPIRY
+    get_historical_flight_entry, save_historical_flight_data,
+    get_recent_flight_entry, save_recent_flight_data,
+    get_historical_flight_data_bulk, get_recent_flight_data_bulk,
+    get_latest_recent_flight_data,
+    get_reliability_stats_bulk, save_reliability_stats_bulk,
 )
+from ..utils.http_client import upstream_request
+from ..utils.negative_cache import (
+    is_negative, make_negative_entry, reason_for_exception, negative_cache_stats, note_unavailable_data
+)
+from ..utils.rate_limiter import RateLimitExceeded
+from ..utils.circuit_breaker import CircuitOpenError
+from ..utils.executor import run_blocking
+from ..utils.revalidation import revalidator, is_revalidating, refresh_horizon
+from ..utils.config import HISTORICAL_FRESH_TTL, RECENT_FRESH_TTL, DERIVED_STATS_TTL
+from ..models.reliability import SCORING_VERSION
+
+
+def week_bucket(date):
+    """Return the weekly cache bucket (YYYY-WW) that recent flight data for a date is stored under."""
+    return date.strftime("%Y-%U")
 
 
 class FlightDataAPI:
@@ -33,24 +51,192 @@ class FlightDataAPI:
             "x-rapidapi-host": "aerodatabox.p.rapidapi.com"
         }
         self.base_url = "https://aerodatabox.p.rapidapi.com"
+    
+    # --- Storage helpers (Supabase calls are blocking, so they run on the storage pool) ---
+    
+    async def _load_historical(self, flight_number):
+        """Load cached historical data for a flight as a (data, stored_at) entry."""
+        return await run_blocking("storage", get_historical_flight_entry, flight_number)
+    
+    async def _save_historical(self, flight_number, data):
+        """Save historical data for a flight to the cache."""
+        if self._keep_stale_entry(data):
+            print(f"  ⓘ Background refresh for {flight_number} found no data, keeping the cached historical data")
+            return False
+        if is_negative(data):
+            negative_cache_stats.record_write(data)
+            note_unavailable_data("historical", flight_number, data)
+        return await run_blocking("storage", save_historical_flight_data, flight_number, data)
+    
+    async def _load_recent(self, flight_number, week_year):
+        """Load cached recent data for a flight and week bucket as a (data, stored_at) entry."""
+        return await run_blocking("storage", get_recent_flight_entry, flight_number, week_year)
+    
+    async def _load_latest_recent(self, flight_number, oldest_week, newest_week):
+        """Load the newest cached recent data for a flight within a range of week buckets."""
+        return await run_blocking("storage", get_latest_recent_flight_data, flight_number, oldest_week, newest_week)
+    
+    async def _save_recent(self, flight_number, week_year, data):
+        """Save recent data for a flight and week bucket to the cache."""
+        if self._keep_stale_entry(data):
+            print(f"  ⓘ Background refresh for {flight_number} found no data, keeping the cached recent data")
+            return False
+        if is_negative(data):
+            negative_cache_stats.record_write(data)
+            note_unavailable_data("recent", flight_number, data)
+        return await run_blocking("storage", save_recent_flight_data, flight_number, week_year, data)
+    
+    async def load_derived_stats(self, flight_numbers):
+        """
+        Load the persisted derived statistics that are still current for many flights.
+        
+        A row is current if it was computed with the current scoring version from
+        this week's recent data and is younger than DERIVED_STATS_TTL. Rows that the
+        prefetcher would refresh ahead of time count as expired, so its runs still
+        go through the raw data and renew it.
+        
+        Args:
+            flight_numbers: Flight numbers to look up
+            
+        Returns:
+            dict: Derived statistics keyed by flight number (flights without current
+            statistics are left out)
+        """
+        from datetime import datetime
+        
+        entries = await run_blocking("storage", get_reliability_stats_bulk, flight_numbers)
+        if not entries:
+            return {}
+        
+        current_week = week_bucket(datetime.now())
+        valid_after = time.time() + refresh_horizon()
+        return {
+            flight_number: row["stats"]
+            for flight_number, (row, stored_at) in entries.items()
+            if row.get("stats") and row.get("scoring_version") == SCORING_VERSION
+            and row.get("data_version") == current_week
+            and stored_at is not None and stored_at + DERIVED_STATS_TTL > valid_after
+        }
+    
+    async def save_derived_stats(self, stats_by_flight, since=None):
+        """
+        Persist derived statistics (keyed by flight number) computed from this week's data.
         
-        # Initialize rate limit flag
-        self._rate_limited = False
+        Flights whose raw data a background refresh rewrote after the ``since``
+        snapshot (revalidator.generation()) are skipped. Returns the number saved.
+        """
+        from datetime import datetime
+        
+        if not stats_by_flight:
+            return 0
+        return await run_blocking("storage", save_reliability_stats_bulk, stats_by_flight,
+                                  SCORING_VERSION, week_bucket(datetime.now()), since)
+    
+    @staticmethod
+    def _skipped_recent_result(flight_number, expired_cache_data):
+        """Result for a recent-data fetch that was rate limited or rejected by the circuit breaker."""
+        note_unavailable_data("recent", flight_number)
+        if expired_cache_data:
+            print(f"  ⚠️ Using expired cache data for {flight_number} since the API call was skipped")
+            return expired_cache_data
+        return []
     
-    def get_historical_delay_stats(self, flight_number, use_cache=True):
-        """Fetch historical delay statistics for a flight number."""
-        # Check cache if enabled
-        if use_cache:
-            cached_result = get_historical_flight_data(flight_number)
-            if cached_result:
-                return cached_result
+    @staticmethod
+    def _negative_recent_result(flight_number, entry):
+        """Result for a recent-data lookup answered by a still valid negative cache entry."""
+        print(f"  ⓘ Using cached empty result for {flight_number}: {entry.get('message')} (reason: {entry.get('reason')})")
+        note_unavailable_data("recent", flight_number, entry)
+        return [] if entry.get("reason") == "no_content" else None
+    
+    @staticmethod
+    def _describe_negative(entry):
+        """Short description of a negative cache entry's lifetime for log messages."""
+        return f"{entry['ttl']:.0f}s (failure #{entry['failures']})"
+    
+    @staticmethod
+    def _keep_stale_entry(data):
+        """During a background refresh, don't replace a stale but usable entry with an empty/error marker."""
+        return is_revalidating() and (not data or (isinstance(data, dict) and data.get("empty")))
+    
+    @staticmethod
+    def _revalidate_if_stale(kind, flight_number, stored_at, ttl, refresh, stale_entries):
+        """
+        Start a background refresh for a cached entry that is stale (or picked for early refresh).
+        
+        Args:
+            kind: "historical" or "recent"
+            flight_number: Flight number of the entry
+            stored_at: When the entry was stored (epoch seconds)
+            ttl: Freshness TTL in seconds
+            refresh: Coroutine function that fetches and stores fresh data
+            stale_entries: Optional set that collects "<kind>:<flight>" for entries served stale
+        """
+        stale, refresh_now = revalidator.check(kind, stored_at, ttl)
+        if refresh_now:
+            revalidator.schedule((kind, flight_number), refresh)
+        if stale and stale_entries is not None:
+            stale_entries.add(f"{kind}:{flight_number}")
+    
+    async def prefetch_cached_data(self, flight_numbers):
+        """
+        Load cached historical and current-week recent data for many flights at once.
+        
+        Returns one round trip per table instead of one per flight. The maps can be
+        passed to get_historical_delay_stats/get_recent_flights as ``prefetched``.
+        
+        Args:
+            flight_numbers: Flight numbers to look up
+            
+        Returns:
+            tuple: (historical map, recent map) of (data, stored_at) entries keyed by
+            flight number; a map is None if its bulk query failed
+        """
+        from datetime import datetime
+        
+        return await asyncio.gather(
+            run_blocking("storage", get_historical_flight_data_bulk, flight_numbers),
+            run_blocking("storage", get_recent_flight_data_bulk, flight_numbers, week_bucket(datetime.now())),
+        )
+    
+    async def get_historical_delay_stats(self, flight_number, use_cache=True, prefetched=None, stale_entries=None):
+        """
+        Fetch historical delay statistics for a flight number.
+        
+        If ``prefetched`` (a bulk lookup result keyed by flight number) is given,
+        it is used instead of querying the cache for this flight. Cached data older
+        than HISTORICAL_FRESH_TTL is still returned, refreshed in the background and
+        recorded in ``stale_entries`` (if given).
+        
+        Cached empty/error markers are served until they expire; after that the
+        API is tried again and a repeated failure is cached for longer.
+        """
+        # Expired negative entry being retried, used to back off repeated failures
+        previous_negative = None
+        
+        # Check cache if enabled (a background refresh always goes to the API)
+        if use_cache and not is_revalidating():
+            if prefetched is not None:
+                entry = prefetched.get(flight_number)
+            else:
+                entry = await self._load_historical(flight_number)
+            if entry is not None and entry[0]:
+                cached_result, stored_at = entry
+                if not is_negative(cached_result):
+                    self._revalidate_if_stale("historical", flight_number, stored_at, HISTORICAL_FRESH_TTL,
+                                              lambda: self.get_historical_delay_stats(flight_number), stale_entries)
+                    return cached_result
+                if negative_cache_stats.record_lookup(cached_result):
+                    note_unavailable_data("historical", flight_number, cached_result)
+                    return cached_result
+                print(f"  ⓘ Cached empty historical result for {flight_number} expired, retrying the API")
+                previous_negative = cached_result
         
         # Visual indicator for API call start
         print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 MAKING API CALL FOR HISTORICAL DATA: {flight_number} 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
         
         url = f"{self.base_url}/flights/{flight_number}/delays"
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = await upstream_request("GET", url, headers=self.headers, timeout=15)
             
             # Visual indicator for API call end
             print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 COMPLETED API CALL FOR HISTORICAL DATA: {flight_number} 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
@@ -58,19 +244,13 @@ class FlightDataAPI:
             # Handle 204 No Content specifically
             if response.status_code == 204:
                 print(f"  ⚠️ No historical data available for {flight_number} (API returned 204 No Content)")
-                # Create a special empty cache object to prevent future API calls
-                empty_result = {
-                    "empty": True,
-                    "flight_number": flight_number,
-                    "cached_at": time.time(),
-                    "reason": "204_No_Content",
-                    "message": "No historical data available for this flight"
-                }
-                # Cache this empty result to prevent repeated API calls
+                # Cache a special empty object to prevent repeated API calls until it expires
                 if use_cache:
-                    cache_days = FLIGHT_CACHE_EXPIRY // (24 * 60 * 60)  # Convert seconds to days
-                    print(f"  ⓘ Caching empty historical data result for {flight_number} for {cache_days} days")
-                    save_historical_flight_data(flight_number, empty_result)
+                    empty_result = make_negative_entry(flight_number, "no_content",
+                                                       "No historical data available for this flight",
+                                                       previous=previous_negative)
+                    print(f"  ⓘ Caching empty historical data result for {flight_number} for {self._describe_negative(empty_result)}")
+                    await self._save_historical(flight_number, empty_result)
                 return None
             
             response.raise_for_status()
@@ -78,25 +258,26 @@ class FlightDataAPI:
             
             result = response.json()
             if use_cache:
-                save_historical_flight_data(flight_number, result)
+                await self._save_historical(flight_number, result)
             return result
-        except requests.exceptions.HTTPError as http_err:
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            # No call slot within the allowed wait, or the upstream is failing and its
+            # circuit is open; nothing is cached so a later request retries
+            print(f"  ⚠️ {e}, skipping historical data for {flight_number}")
+            note_unavailable_data("historical", flight_number)
+            return None
+        except httpx.HTTPStatusError as http_err:
             # Visual indicator for API call end with error
             print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR HISTORICAL DATA: {flight_number} 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
             print(f"  ⚠️ HTTP error fetching historical data for {flight_number}: {http_err}")
             
-            # Cache the failure to prevent repeated API calls
+            # Cache the failure to prevent repeated API calls (429s and 5xx only briefly)
             if use_cache:
-                error_result = {
-                    "empty": True,
-                    "flight_number": flight_number,
-                    "cached_at": time.time(),
-                    "reason": "http_error",
-                    "error": str(http_err),
-                    "message": "HTTP error occurred when fetching historical data"
-                }
-                print(f"  ⓘ Caching HTTP error for {flight_number} to prevent repeated API calls")
-                save_historical_flight_data(flight_number, error_result)
+                error_result = make_negative_entry(flight_number, reason_for_exception(http_err),
+                                                   "HTTP error occurred when fetching historical data",
+                                                   previous=previous_negative, error=str(http_err))
+                print(f"  ⓘ Caching HTTP error for {flight_number} for {self._describe_negative(error_result)}")
+                await self._save_historical(flight_number, error_result)
                 
             return None
             
@@ -107,15 +288,11 @@ class FlightDataAPI:
             
             # Cache the failure to prevent repeated API calls
             if use_cache:
-                error_result = {
-                    "empty": True,
-                    "flight_number": flight_number,
-                    "cached_at": time.time(),
-                    "reason": "json_decode_error",
-                    "message": "Could not parse API response (empty or invalid JSON)"
-                }
-                print(f"  ⓘ Caching JSON error for {flight_number} to prevent repeated API calls")
-                save_historical_flight_data(flight_number, error_result)
+                error_result = make_negative_entry(flight_number, "parse_error",
+                                                   "Could not parse API response (empty or invalid JSON)",
+                                                   previous=previous_negative)
+                print(f"  ⓘ Caching JSON error for {flight_number} for {self._describe_negative(error_result)}")
+                await self._save_historical(flight_number, error_result)
                 
             return None
             
@@ -126,21 +303,27 @@ class FlightDataAPI:
             
             # Cache the failure to prevent repeated API calls
             if use_cache:
-                error_result = {
-                    "empty": True,
-                    "flight_number": flight_number,
-                    "cached_at": time.time(),
-                    "reason": "general_error",
-                    "error": str(e),
-                    "message": "General error occurred when fetching historical data"
-                }
-                print(f"  ⓘ Caching error for {flight_number} to prevent repeated API calls")
-                save_historical_flight_data(flight_number, error_result)
+                error_result = make_negative_entry(flight_number, reason_for_exception(e),
+                                                   "General error occurred when fetching historical data",
+                                                   previous=previous_negative, error=str(e))
+                print(f"  ⓘ Caching error for {flight_number} for {self._describe_negative(error_result)}")
+                await self._save_historical(flight_number, error_result)
                 
             return None
     
-    def get_recent_flights(self, flight_number, days_back=7, use_cache=True):
-        """Fetch recent flight data for the past days."""
+    async def get_recent_flights(self, flight_number, days_back=7, use_cache=True, prefetched=None, stale_entries=None):
+        """
+        Fetch recent flight data for the past days.
+        
+        If ``prefetched`` (a bulk lookup of the current week bucket keyed by flight
+        number) is given, it replaces the per-flight lookup of the current week.
+        Cached data older than RECENT_FRESH_TTL, or from a previous week, is still
+        returned, refreshed in the background and recorded in ``stale_entries`` (if given).
+        
+        Cached empty/error markers are served until they expire (unless an older
+        week has real data); after that the API is tried again and a repeated
+        failure is cached for longer.
+        """
         from datetime import datetime, timedelta
         
         end_date = datetime.now()
@@ -151,50 +334,56 @@ class FlightDataAPI:
         
         # Create a more stable cache key that only changes weekly
         # Use the year and week number of the end date to create a weekly bucket
-        end_year_week = end_date.strftime("%Y-%U")  # Format: YYYY-WW (year-week number)
+        end_year_week = week_bucket(end_date)  # Format: YYYY-WW (year-week number)
         
         # Track if we found any valid cache data - for potential fallback
         expired_cache_data = None
+        # Negative entry for the current week: still valid, or expired and being retried
+        cached_negative = None
+        previous_negative = None
         
-        # Check cache if enabled
-        if use_cache:
+        def refresh():
+            return self.get_recent_flights(flight_number, days_back=days_back)
+        
+        # Check cache if enabled (a background refresh always goes to the API)
+        if use_cache and not is_revalidating():
             # First try normal cache with our primary week-year key
-            cached_result = get_recent_flight_data(flight_number, end_year_week)
-            if cached_result:
-                return cached_result
+            if prefetched is not None:
+                entry = prefetched.get(flight_number)
+            else:
+                entry = await self._load_recent(flight_number, end_year_week)
+            if entry is not None and entry[0]:
+                cached_result, stored_at = entry
+                if not is_negative(cached_result):
+                    self._revalidate_if_stale("recent", flight_number, stored_at, RECENT_FRESH_TTL, refresh, stale_entries)
+                    return cached_result
+                if negative_cache_stats.record_lookup(cached_result):
+                    cached_negative = cached_result
+                else:
+                    print(f"  ⓘ Cached empty recent result for {flight_number} expired, retrying the API")
+                    previous_negative = cached_result
             
-            # Try a few different date ranges from recent weeks that might have cached data
-            backup_weeks = 5  # Try up to 5 previous weeks
-            for i in range(1, backup_weeks + 1):
-                backup_date = end_date - timedelta(days=i * 7)
-                backup_year_week = backup_date.strftime("%Y-%U")
-                backup_result = get_recent_flight_data(flight_number, backup_year_week)
-                if backup_result:
+            # Fall back to the newest of the previous few weeks that has cached data
+            backup_weeks = 5  # Look back up to 5 previous weeks
+            oldest_week = week_bucket(end_date - timedelta(days=backup_weeks * 7))
+            newest_week = week_bucket(end_date - timedelta(days=7))
+            backup = await self._load_latest_recent(flight_number, oldest_week, newest_week)
+            if backup is not None:
+                backup_year_week, backup_result = backup
+                if backup_result and not is_negative(backup_result):
                     print(f"  Using cached data from {backup_year_week} week for {flight_number}")
-                    # Save this to our current cache bucket too
-                    save_recent_flight_data(flight_number, end_year_week, backup_result)
+                    # Data from a previous week is always stale for the current bucket; a
+                    # cached negative result for this week means a refresh would fail anyway
+                    if cached_negative is None:
+                        self._revalidate_if_stale("recent", flight_number, 0, RECENT_FRESH_TTL, refresh, stale_entries)
                     return backup_result
-                elif backup_result is not None:
-                    # Keep track of any non-None result for potential fallback
+                # Keep track of any non-None result for potential fallback
+                if not is_negative(backup_result):
                     expired_cache_data = backup_result
-        
-        # Check if we're already rate limited - if so, don't even try API call
-        if hasattr(self, '_rate_limited') and self._rate_limited:
-            print(f"  ⚠️ API already rate limited, skipping API call for {flight_number}")
-            
-            # If we have expired cache data, use it instead of returning empty list
-            if expired_cache_data:
-                print(f"  ⚠️ Using expired cache data for {flight_number} due to rate limiting")
-                # Save this to prevent future API calls
-                save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
-                return expired_cache_data
-                
-            # Create an empty cached result to prevent future API calls
-            empty_result = []
-            if use_cache:
-                save_recent_flight_data(flight_number, end_year_week, empty_result)
-            return empty_result
             
+            if cached_negative is not None:
+                return self._negative_recent_result(flight_number, cached_negative)
+        
         # Visual indicator for API call start
         print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 MAKING API CALL FOR RECENT FLIGHTS: {flight_number} ({start_str} to {end_str}) 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
         
@@ -202,7 +391,7 @@ class FlightDataAPI:
         url = f"{self.base_url}/flights/number/{flight_number}/{start_str}/{end_str}?dateLocalRole=Both"
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = await upstream_request("GET", url, headers=self.headers, timeout=15)
             
             # Visual indicator for API call end
             print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 COMPLETED API CALL FOR RECENT FLIGHTS: {flight_number} 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
@@ -215,31 +404,16 @@ class FlightDataAPI:
                 if expired_cache_data:
                     print(f"  ⚠️ Using expired cache data for {flight_number} since API returned no content")
                     # Save this to prevent future API calls
-                    save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
+                    await self._save_recent(flight_number, end_year_week, expired_cache_data)
                     return expired_cache_data
                     
-                empty_result = []
                 if use_cache:
-                    save_recent_flight_data(flight_number, end_year_week, empty_result)
-                return empty_result
-            
-            # Special handling for rate limits - set a flag to prevent future calls
-            if response.status_code == 429:
-                print(f"  ⚠️ Rate limit hit for {flight_number}, will not retry")
-                # Set global rate limit flag for this session
-                self._rate_limited = True
-                
-                # If we have expired cache data, use it instead of returning empty list
-                if expired_cache_data:
-                    print(f"  ⚠️ Using expired cache data for {flight_number} due to rate limiting")
-                    # Save this to prevent future API calls
-                    save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
-                    return expired_cache_data
-                    
-                empty_result = []
-                if use_cache:
-                    save_recent_flight_data(flight_number, end_year_week, empty_result)
-                return empty_result
+                    empty_result = make_negative_entry(flight_number, "no_content",
+                                                       "No recent flights found for this flight",
+                                                       previous=previous_negative)
+                    print(f"  ⓘ Caching empty recent data result for {flight_number} for {self._describe_negative(empty_result)}")
+                    await self._save_recent(flight_number, end_year_week, empty_result)
+                return []
             
             response.raise_for_status()
             
@@ -252,58 +426,57 @@ class FlightDataAPI:
                 if expired_cache_data:
                     print(f"  ⚠️ Using expired cache data for {flight_number} since API returned empty list")
                     # Save this to prevent future API calls
-                    save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
+                    await self._save_recent(flight_number, end_year_week, expired_cache_data)
                     return expired_cache_data
                     
                 if use_cache:
-                    save_recent_flight_data(flight_number, end_year_week, data)
+                    empty_result = make_negative_entry(flight_number, "no_content",
+                                                       "No recent flights found for this flight",
+                                                       previous=previous_negative)
+                    print(f"  ⓘ Caching empty recent data result for {flight_number} for {self._describe_negative(empty_result)}")
+                    await self._save_recent(flight_number, end_year_week, empty_result)
                 return data
             
             print(f"  Successfully fetched recent data for {flight_number} ({start_str} to {end_str}) from API")
             
             if use_cache:
-                save_recent_flight_data(flight_number, end_year_week, data)
+                await self._save_recent(flight_number, end_year_week, data)
             return data
             
-        except requests.exceptions.HTTPError as http_err:
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            # No call slot within the allowed wait, or the upstream is failing and its
+            # circuit is open; nothing is cached so a later request retries
+            print(f"  ⚠️ {e}, skipping recent data for {flight_number}")
+            return self._skipped_recent_result(flight_number, expired_cache_data)
+            
+        except httpx.HTTPStatusError as http_err:
             # Visual indicator for API call end with error
             print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR RECENT FLIGHTS: {flight_number} 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
             
-            if "429" in str(http_err):
-                # Handle rate limiting exception - set flag to prevent future calls
-                print(f"  ⚠️ Rate limit error for {flight_number}, will not retry")
-                self._rate_limited = True
-                
-                # If we have expired cache data, use it instead of returning empty list
-                if expired_cache_data:
-                    print(f"  ⚠️ Using expired cache data for {flight_number} due to rate limiting")
-                    # Save this to prevent future API calls
-                    save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
-                    return expired_cache_data
-                    
-                empty_result = []
+            # Rate limited even after waiting: the shared limiter is paused for Retry-After
+            # and the failure is only cached briefly
+            if http_err.response.status_code == 429:
+                print(f"  ⚠️ Rate limit error for {flight_number}")
                 if use_cache:
-                    save_recent_flight_data(flight_number, end_year_week, empty_result)
-                return empty_result
+                    error_result = make_negative_entry(flight_number, "rate_limited",
+                                                       "Rate limited when fetching recent flight data",
+                                                       previous=previous_negative, error=str(http_err))
+                    await self._save_recent(flight_number, end_year_week, error_result)
+                return self._skipped_recent_result(flight_number, expired_cache_data)
             
             print(f"  ⚠️ HTTP error fetching recent data for {flight_number}: {http_err}")
             
             # If we have expired cache data, use it as a fallback on any HTTP error
             if expired_cache_data:
                 print(f"  ⚠️ Using expired cache data for {flight_number} due to HTTP error")
-                save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
+                await self._save_recent(flight_number, end_year_week, expired_cache_data)
                 return expired_cache_data
                 
-            error_result = {
-                "empty": True,
-                "flight_number": flight_number,
-                "cached_at": time.time(),
-                "reason": "http_error",
-                "error": str(http_err),
-                "message": "HTTP error occurred when fetching recent flight data"
-            }
             if use_cache:
-                save_recent_flight_data(flight_number, end_year_week, error_result)
+                error_result = make_negative_entry(flight_number, reason_for_exception(http_err),
+                                                   "HTTP error occurred when fetching recent flight data",
+                                                   previous=previous_negative, error=str(http_err))
+                await self._save_recent(flight_number, end_year_week, error_result)
             return None
             
         except json.JSONDecodeError:
@@ -314,18 +487,14 @@ class FlightDataAPI:
             # If we have expired cache data, use it as a fallback
             if expired_cache_data:
                 print(f"  ⚠️ Using expired cache data for {flight_number} due to JSON parsing error")
-                save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
+                await self._save_recent(flight_number, end_year_week, expired_cache_data)
                 return expired_cache_data
                 
-            error_result = {
-                "empty": True,
-                "flight_number": flight_number,
-                "cached_at": time.time(),
-                "reason": "json_decode_error",
-                "message": "Could not parse API response (empty or invalid JSON)"
-            }
             if use_cache:
-                save_recent_flight_data(flight_number, end_year_week, error_result)
+                error_result = make_negative_entry(flight_number, "parse_error",
+                                                   "Could not parse API response (empty or invalid JSON)",
+                                                   previous=previous_negative)
+                await self._save_recent(flight_number, end_year_week, error_result)
             return None
             
         except Exception as e:
@@ -336,17 +505,12 @@ class FlightDataAPI:
             # If we have expired cache data, use it as a fallback on any error
             if expired_cache_data:
                 print(f"  ⚠️ Using expired cache data for {flight_number} due to error: {e}")
-                save_recent_flight_data(flight_number, end_year_week, expired_cache_data)
+                await self._save_recent(flight_number, end_year_week, expired_cache_data)
                 return expired_cache_data
                 
-            error_result = {
-                "empty": True,
-                "flight_number": flight_number,
-                "cached_at": time.time(),
-                "reason": "general_error",
-                "error": str(e),
-                "message": "General error occurred when fetching recent flight data"
-            }
             if use_cache:
-                save_recent_flight_data(flight_number, end_year_week, error_result)
+                error_result = make_negative_entry(flight_number, reason_for_exception(e),
+                                                   "General error occurred when fetching recent flight data",
+                                                   previous=previous_negative, error=str(e))
+                await self._save_recent(flight_number, end_year_week, error_result)
             return None
\ No newline at end of file
@@ -7,15 +7,32 @@ import json
 import pickle
 from datetime import datetime, timedelta
 from pathlib import Path
-import requests
+import httpx
 import time
 from dotenv import load_dotenv
 
 # Replace pickle cache import with Supabase client import
-from ..utils.supabase_client import get_flight_route_data, save_flight_route_data, ROUTE_CACHE_EXPIRY
+from ..utils.supabase_client import (
+    get_flight_route_data, get_flight_route_entry, save_flight_route_data, ROUTE_CACHE_EXPIRY
+)
+from ..utils.http_client import upstream_request
+from ..utils.circuit_breaker import CircuitOpenError
+from ..utils.executor import run_blocking
+from ..utils.revalidation import revalidator, is_revalidating
+from ..utils.config import ROUTE_FRESH_TTL
+from .amadeus_auth import AMADEUS_BASE_URL, AmadeusAuthError, amadeus_token_manager
 
 
-def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, max_connections=2, use_cache=True):
+def _bearer_headers(access_token):
+    """Build the request headers for an authenticated Amadeus call."""
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
+
+
+
+async def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, max_connections=2, use_cache=True):
     """
     Find flight routes between two airports with configurable parameters.
     
@@ -26,6 +43,8 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
         max_routes (int, optional): Maximum number of unique routes to return. Defaults to 5.
         max_connections (int, optional): Maximum number of connections. Defaults to 2.
         use_cache (bool, optional): Whether to use cached results if available. Defaults to True.
+            Cached results older than ROUTE_FRESH_TTL are still returned (with
+            ``served_stale`` set) while a background search refreshes them.
         
     Returns:
         dict: Structured data containing the best unique flight routes
@@ -41,15 +60,29 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
     # Cache handling using Supabase
     cache_key = f"{origin.upper()}-{destination.upper()}-{target_date}"
     
-    # Check cache first if enabled
-    if use_cache:
-        cached_result = get_flight_route_data(origin.upper(), destination.upper(), target_date)
-        if cached_result:
+    # Check cache first if enabled (a background refresh always searches again)
+    if use_cache and not is_revalidating():
+        entry = await run_blocking("storage", get_flight_route_entry, origin.upper(), destination.upper(), target_date)
+        if entry is not None and entry[0]:
+            # Work on a copy: the cached entry is shared with other requests
+            cached_result, stored_at = dict(entry[0]), entry[1]
+            
             # If we have cached results, we can apply the max_routes filter here
             if 'routes' in cached_result and isinstance(cached_result['routes'], list):
                 cached_result['routes'] = cached_result['routes'][:max_routes]
                 if len(cached_result.get('query', {}).get('filters_applied', [])) >= 4:
+                    cached_result['query'] = dict(cached_result['query'])
+                    cached_result['query']['filters_applied'] = list(cached_result['query']['filters_applied'])
                     cached_result['query']['filters_applied'][-1] = f"Selected Top {max_routes}"
+            
+            # Serve stale results immediately and refresh them in the background
+            stale, refresh_now = revalidator.check("route", stored_at, ROUTE_FRESH_TTL)
+            if refresh_now:
+                revalidator.schedule(
+                    ("route", origin.upper(), destination.upper(), target_date),
+                    lambda: get_flight_numbers_for_route(origin, destination, target_date, max_routes, max_connections)
+                )
+            cached_result["served_stale"] = stale
             return cached_result
 
     # --- Helper Functions ---
@@ -119,60 +152,15 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
     
     # --- Amadeus API Authentication ---
     
-    # Get API credentials
-    load_dotenv()
-    api_key = os.environ.get("AMADUS_KEY")
-    api_secret = os.environ.get("AMADUS_SECRET")
-    
-    if not api_key or not api_secret:
-        print("Warning: API credentials not set correctly. Please check environment variables.")
-        return {"error": "API credentials not configured"}
-    
-    # Visual indicator for API call start
-    print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 MAKING API CALL FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
-    print(f"Requesting Amadeus Authentication Token...")
-    auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    auth_data = {
-        "grant_type": "client_credentials",
-        "client_id": api_key,
-        "client_secret": api_secret
-    }
-    
-    access_token = None
+    # The token is cached process-wide and refreshed before it expires,
+    # so a cold search normally skips the OAuth round trip entirely
     try:
-        auth_response = requests.post(auth_url, data=auth_data, timeout=10)
-        auth_response.raise_for_status()
-        access_token = auth_response.json().get("access_token")
-        print("Authentication Successful.")
-        # Visual indicator for API call end
-        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 COMPLETED API CALL FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
-    except requests.exceptions.RequestException as e:
-        # Visual indicator for API call end with error
-        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
-        print(f"Error during authentication: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                print(f"Response body: {e.response.json()}")
-            except json.JSONDecodeError:
-                print(f"Response body (non-JSON): {e.response.text}")
-        return {"error": f"Authentication failed: {str(e)}"}
-    except json.JSONDecodeError:
-        # Visual indicator for API call end with error
-        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS AUTHENTICATION 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
-        print("Error decoding authentication response.")
-        return {"error": "Authentication response decode error"}
-    
-    if not access_token:
-        print("Failed to retrieve access token.")
-        return {"error": "No access token received"}
+        access_token = await amadeus_token_manager.get_token()
+    except AmadeusAuthError as e:
+        return {"error": str(e)}
     
     # --- Flight Search API Call ---
     
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
     payload = {
         "currencyCode": "USD",
         "originDestinations": [
@@ -201,14 +189,22 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
     print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 MAKING API CALL FOR AMADEUS FLIGHT SEARCH 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
     print(f"Searching flights from {origin} to {destination} on {target_date}...")
     
-    search_url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+    search_url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
     try:
-        search_response = requests.post(search_url, json=payload, headers=headers, timeout=15)
+        search_response = await upstream_request("POST", search_url, json=payload, headers=_bearer_headers(access_token), timeout=15)
+        
+        # The cached token may have been revoked early: drop it and retry once
+        if search_response.status_code == 401:
+            print("⚠️ Amadeus rejected the access token (401), refreshing and retrying once")
+            amadeus_token_manager.invalidate(access_token)
+            access_token = await amadeus_token_manager.get_token()
+            search_response = await upstream_request("POST", search_url, json=payload, headers=_bearer_headers(access_token), timeout=15)
+        
         # Visual indicator for API call end
         print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 COMPLETED API CALL FOR AMADEUS FLIGHT SEARCH 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
         search_response.raise_for_status()
         search_data = search_response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Visual indicator for API call end with error
         print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS FLIGHT SEARCH 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
         print(f"Error during flight search: {e}")
@@ -226,6 +222,14 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
                 print(f"Response body (non-JSON): {e.response.text}")
         
         return {"error": f"Flight search failed: {str(e)}"}
+    except CircuitOpenError as e:
+        # Amadeus is failing: don't wait for another timeout
+        print(f"⚠️ Skipping Amadeus flight search: {e}")
+        return {"error": f"Flight search temporarily unavailable: {e}"}
+    except AmadeusAuthError as e:
+        # Token refresh after a 401 failed
+        print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS FLIGHT SEARCH 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
+        return {"error": str(e)}
     except json.JSONDecodeError:
         # Visual indicator for API call end with error
         print(f"🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢 API CALL FAILED FOR AMADEUS FLIGHT SEARCH 🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢🟢")
@@ -380,7 +384,7 @@ def get_flight_numbers_for_route(origin, destination, date=None, max_routes=5, m
     
     # Save to Supabase
     if top_routes:
-        save_flight_route_data(origin.upper(), destination.upper(), target_date, result)
+        await run_blocking("storage", save_flight_route_data, origin.upper(), destination.upper(), target_date, result)
     
     return result
 
@@ -1,19 +1,57 @@
 """
 Main controller module that integrates route search and flight reliability analysis.
 """
-from typing import List, Dict, Any, Optional
+import re
+import asyncio
+from typing import AsyncIterator, List, Dict, Any, Optional
 from .api.routes import get_flight_numbers_for_route
 from .api.reliability import FlightDataAPI
 from .models.reliability import FlightDataProcessor, FlightDataAnalyzer
+from .utils.config import FLIGHT_FETCH_CONCURRENCY
+from .utils.singleflight import SingleFlight
+from .utils.revalidation import revalidator
+from .utils.negative_cache import track_unavailable_data
+from .utils.deadline import Deadline, finish_in_background, get_deadline_stats
+
+IATA_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# What the "summary" view of a ranking keeps of each route and of each flight on it
+RANKING_SUMMARY_ROUTE_FIELDS = (
+    "rank", "smart_rank", "reliability_score", "price", "total_duration", "connections", "reliability_data",
+)
+RANKING_SUMMARY_FLIGHT_FIELDS = ("flight_number", "delay_percentage")
+
 
 class FlightAnalysisSystem:
     """Main controller class for the flight analysis system."""
     
-    def __init__(self, api_key=None):
-        """Initialize the flight analysis system."""
+    def __init__(self, api_key=None, max_concurrency: Optional[int] = None):
+        """
+        Initialize the flight analysis system.
+        
+        Args:
+            api_key: AeroDataBox API key (read from the environment if omitted)
+            max_concurrency: Maximum number of concurrent upstream fetches
+                (defaults to FLIGHT_FETCH_CONCURRENCY)
+        """
         self.reliability_api = FlightDataAPI(api_key)
+        self.max_concurrency = max_concurrency or FLIGHT_FETCH_CONCURRENCY
+        self._rankings_flight = SingleFlight("rankings")
+        self._dedup_totals = {"flight_references": 0, "unique_flights": 0}
+        self._derived_totals = {"hits": 0, "misses": 0, "written": 0}
     
-    def analyze_flight(self, flight_number: str, use_cache: bool = True) -> Dict[str, Any]:
+    def get_stats(self) -> Dict[str, Any]:
+        """Return runtime statistics for the analysis system."""
+        return {
+            "rankings_coalescing": self._rankings_flight.get_stats(),
+            "revalidation": revalidator.get_stats(),
+            "flight_dedup": dict(self._dedup_totals),
+            "derived_stats": dict(self._derived_totals),
+            "deadlines": get_deadline_stats(),
+        }
+    
+    async def analyze_flight(self, flight_number: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Analyze a single flight using both historical and recent data.
         
@@ -22,80 +60,303 @@ class FlightAnalysisSystem:
             use_cache: Whether to use cached results if available
             
         Returns:
-            dict: Combined flight analysis
+            dict: Combined flight analysis (``served_stale`` is True if any of it
+            came from a stale cache entry that is being refreshed)
         """
         print(f"\n--- Flight: {flight_number} ---")
         
-        # Fetch data
-        print(f"Historical data for {flight_number}:")
-        historical_data = self.reliability_api.get_historical_delay_stats(flight_number, use_cache=use_cache)
+        # Fetch historical and recent data concurrently
+        stale_entries = set()
+        historical_data, recent_data = await asyncio.gather(
+            self.reliability_api.get_historical_delay_stats(flight_number, use_cache=use_cache, stale_entries=stale_entries),
+            self.reliability_api.get_recent_flights(flight_number, use_cache=use_cache, stale_entries=stale_entries),
+        )
         # Show historical flight count if data exists
         FlightDataProcessor.show_historical_flight_count(historical_data)
         
-        print(f"Recent data for {flight_number}:")
-        recent_data = self.reliability_api.get_recent_flights(flight_number, use_cache=use_cache)
+        analysis = self._combine_flight_data(historical_data, recent_data)
+        analysis["served_stale"] = bool(stale_entries)
+        return analysis
+    
+    async def get_flight_summary(self, flight_number: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a flight's reliability summary without building its full analysis.
+        
+        Uses the persisted derived statistics when they are current, so the raw
+        historical and recent payloads are only processed on a miss.
+        
+        Args:
+            flight_number: Flight number to summarize
+            use_cache: Whether to use cached results if available
+            
+        Returns:
+            dict: Reliability score, delay percentage, data quality and flight counts
+            (None if the flight could not be analyzed)
+        """
+        stale_entries = set()
+        summaries = await self._summarize_flights([{"flight_number": flight_number}], use_cache=use_cache,
+                                                  stale_entries=stale_entries)
+        if summaries.get(flight_number) is None:
+            return None
+        summary = {key: value for key, value in summaries[flight_number].items() if key != "pending"}
+        summary["served_stale"] = bool(stale_entries)
+        return summary
+    
+    async def get_flight_history(self,
+                                 flight_number: str,
+                                 page: int = 1,
+                                 page_size: int = 20,
+                                 use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get one page of a flight's recent individual flights, newest first.
+        
+        Only the recent data is loaded and processed; historical statistics are
+        not needed for the history.
+        
+        Args:
+            flight_number: Flight number
+            page: Page number (1-based)
+            page_size: Flights per page
+            use_cache: Whether to use cached results if available
+            
+        Returns:
+            dict: The page of flights plus total, page and total_pages
+        """
+        stale_entries = set()
+        recent_data = await self.reliability_api.get_recent_flights(flight_number, use_cache=use_cache,
+                                                                    stale_entries=stale_entries)
+        processed = FlightDataProcessor.process_recent_flight_data(recent_data)
+        flights = processed["individual_flights"] if processed else []
+        # Newest first, flights without a known date last
+        flights = sorted(flights, key=lambda flight: (flight["date"] != "Unknown", flight["date"]), reverse=True)
         
+        start = (page - 1) * page_size
+        return {
+            "flight_number": flight_number,
+            "date_range": processed.get("date_range", "") if processed else "",
+            "flights": flights[start:start + page_size],
+            "total": len(flights),
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (len(flights) + page_size - 1) // page_size,
+            "served_stale": bool(stale_entries),
+        }
+    
+    @staticmethod
+    def project_ranking(result: Dict[str, Any],
+                        view: str = "full",
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Trim a ranking to what the client needs.
+        
+        Args:
+            result: Ranking as returned by get_ranked_flights_for_route
+            view: "full" (unchanged) or "summary" (RANKING_SUMMARY_ROUTE_FIELDS of each
+                route, with RANKING_SUMMARY_FLIGHT_FIELDS of each flight)
+            fields: Route fields to keep instead of the view's (e.g. ["rank", "price"])
+            
+        Returns:
+            dict: The ranking with projected routes (without the internal data_generation)
+        """
+        if view != "summary" and not fields:
+            return {key: value for key, value in result.items() if key != "data_generation"}
+        
+        route_fields = fields or RANKING_SUMMARY_ROUTE_FIELDS
+        routes = []
+        for route in result.get("routes", []):
+            projected = {field: route[field] for field in route_fields if field in route}
+            if view == "summary" and "reliability_data" in projected:
+                projected["reliability_data"] = [
+                    {field: entry[field] for field in RANKING_SUMMARY_FLIGHT_FIELDS if field in entry}
+                    for entry in projected["reliability_data"]
+                ]
+            routes.append(projected)
+        projected_result = dict(result, routes=routes)
+        projected_result.pop("data_generation", None)
+        return projected_result
+    
+    @staticmethod
+    def project_fields(data: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Keep only the given top-level fields of a response (plus flight_number)."""
+        if not fields:
+            return data
+        return {key: value for key, value in data.items() if key in fields or key == "flight_number"}
+    
+    @staticmethod
+    def _combine_flight_data(historical_data, recent_data) -> Dict[str, Any]:
+        """Process raw historical and recent data and combine them into one analysis."""
         # Process data
         processed_historical = FlightDataProcessor.process_historical_delay_stats(historical_data)
         processed_recent = FlightDataProcessor.process_recent_flight_data(recent_data)
         
         # Combine and analyze
-        combined_data = FlightDataAnalyzer.combine_statistics(processed_historical, processed_recent)
-        
-        return combined_data
+        return FlightDataAnalyzer.combine_statistics(processed_historical, processed_recent)
     
-    def analyze_multiple_flights(self, flight_list: List[Dict[str, str]], use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    async def analyze_multiple_flights(self,
+                                       flight_list: List[Dict[str, str]],
+                                       use_cache: bool = True,
+                                       concurrent: bool = True,
+                                       max_concurrency: Optional[int] = None,
+                                       stale_entries: Optional[set] = None,
+                                       deadline: Optional[Deadline] = None,
+                                       pending_flights: Optional[set] = None) -> Dict[str, Optional[Dict[str, Any]]]:
         """
         Analyze multiple flights.
         
+        In concurrent mode the historical and recent fetches of every flight are
+        started at once, with a semaphore capping how many are in flight, so the
+        upstream round trips overlap instead of running back to back.
+        
+        When the cache is enabled, cached data for all flights is loaded up front
+        with one bulk query per table, so a ranking costs two storage round trips
+        instead of two per flight.
+        
+        With a deadline, flights are analyzed from whatever data arrived in time.
+        Fetches still running at the deadline finish in the background (filling
+        the cache) and their flights are added to ``pending_flights``.
+        
         Args:
             flight_list: List of flight dictionaries with flight_number key
             use_cache: Whether to use cached results if available
+            concurrent: Whether to fetch flight data concurrently
+            max_concurrency: Maximum number of fetches in flight at once
+                (defaults to the system-wide limit)
+            stale_entries: Optional set that collects the cache entries served stale
+            deadline: Optional deadline for the whole analysis
+            pending_flights: Optional set that collects flights whose data is still being fetched
             
         Returns:
-            dict: Dictionary of flight analyses keyed by flight number
+            dict: Dictionary of flight analyses keyed by flight number (None for a
+            flight without any data by the deadline)
         """
-        results = {}
+        limit = max_concurrency or self.max_concurrency
+        deadline = deadline or Deadline(None)
+        if pending_flights is None:
+            pending_flights = set()
         
         print(f"\n===== Processing {len(flight_list)} flights =====")
         
-        # Process each flight sequentially 
-        for flight in flight_list:
-            flight_number = flight["flight_number"]
-            print(f"\n--- Flight: {flight_number} ({flight.get('airline', 'Unknown')}) ---")
+        # Keep the original flight order (and fetch each flight number once)
+        flight_numbers = list(dict.fromkeys(flight["flight_number"] for flight in flight_list))
+        
+        prefetch_task = None
+        if use_cache and len(flight_numbers) > 1:
+            prefetch_task = asyncio.ensure_future(self.reliability_api.prefetch_cached_data(flight_numbers))
+        
+        if not concurrent or limit <= 1:
+            return await self._analyze_flights_sequentially(flight_list, use_cache, prefetch_task, stale_entries,
+                                                            deadline, pending_flights)
+        
+        print(f"Fetching flight data concurrently (max {limit} requests in flight)")
+        semaphore = asyncio.Semaphore(limit)
+        
+        async def bounded(fetch, flight_number, table):
+            # Every fetch waits for the shared bulk cache lookup first
+            prefetched = (await prefetch_task)[table] if prefetch_task is not None else None
+            async with semaphore:
+                return await fetch(flight_number, use_cache=use_cache, prefetched=prefetched,
+                                   stale_entries=stale_entries)
+        
+        historical_tasks = {
+            fn: asyncio.ensure_future(bounded(self.reliability_api.get_historical_delay_stats, fn, 0))
+            for fn in flight_numbers
+        }
+        recent_tasks = {
+            fn: asyncio.ensure_future(bounded(self.reliability_api.get_recent_flights, fn, 1))
+            for fn in flight_numbers
+        }
+        await deadline.wait([*historical_tasks.values(), *recent_tasks.values()],
+                            label=f"reliability data of {len(flight_numbers)} flights")
+        
+        results = {}
+        for flight_number in flight_numbers:
+            historical_task, recent_task = historical_tasks[flight_number], recent_tasks[flight_number]
+            if not (historical_task.done() and recent_task.done()):
+                pending_flights.add(flight_number)
+                if not (historical_task.done() or recent_task.done()):
+                    results[flight_number] = None
+                    continue
             
-            # Get historical data
-            print(f"Historical data for {flight_number}:")
-            historical_data = self.reliability_api.get_historical_delay_stats(flight_number, use_cache=use_cache)
-            # Show historical flight count if data exists
+            historical_data = historical_task.result() if historical_task.done() else None
+            recent_data = recent_task.result() if recent_task.done() else None
+            print(f"\n--- Flight: {flight_number} ---")
             FlightDataProcessor.show_historical_flight_count(historical_data)
-            
-            # Get recent data
-            print(f"Recent data for {flight_number}:")
-            recent_data = self.reliability_api.get_recent_flights(flight_number, use_cache=use_cache)
-            
-            # Process data
-            processed_historical = FlightDataProcessor.process_historical_delay_stats(historical_data)
-            processed_recent = FlightDataProcessor.process_recent_flight_data(recent_data)
-            
-            # Combine and analyze
-            combined_data = FlightDataAnalyzer.combine_statistics(processed_historical, processed_recent)
-            
-            # Store results
-            results[flight_number] = combined_data
-            
+            results[flight_number] = self._combine_flight_data(historical_data, recent_data)
+        
         return results
     
-    def get_ranked_flights_for_route(self, 
+    async def _analyze_flights_sequentially(self,
+                                            flight_list: List[Dict[str, str]],
+                                            use_cache: bool = True,
+                                            prefetch_task: Optional[asyncio.Future] = None,
+                                            stale_entries: Optional[set] = None,
+                                            deadline: Optional[Deadline] = None,
+                                            pending_flights: Optional[set] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Analyze flights one after another (used when concurrency is disabled)."""
+        deadline = deadline or Deadline(None)
+        results = {}
+        
+        async def analyze_all():
+            historical_cache, recent_cache = (await prefetch_task) if prefetch_task is not None else (None, None)
+            
+            # Process each flight sequentially 
+            for flight in flight_list:
+                flight_number = flight["flight_number"]
+                print(f"\n--- Flight: {flight_number} ({flight.get('airline', 'Unknown')}) ---")
+                
+                # Get historical data
+                print(f"Historical data for {flight_number}:")
+                historical_data = await self.reliability_api.get_historical_delay_stats(
+                    flight_number, use_cache=use_cache, prefetched=historical_cache, stale_entries=stale_entries)
+                # Show historical flight count if data exists
+                FlightDataProcessor.show_historical_flight_count(historical_data)
+                
+                # Get recent data
+                print(f"Recent data for {flight_number}:")
+                recent_data = await self.reliability_api.get_recent_flights(
+                    flight_number, use_cache=use_cache, prefetched=recent_cache, stale_entries=stale_entries)
+                
+                # Store results
+                results[flight_number] = self._combine_flight_data(historical_data, recent_data)
+        
+        # Flights not analyzed by the deadline are finished in the background
+        task = asyncio.ensure_future(analyze_all())
+        done, _ = await deadline.wait([task], label=f"reliability data of {len(flight_list)} flights")
+        if done:
+            task.result()
+        
+        finished = dict(results)
+        for flight in flight_list:
+            if flight["flight_number"] not in finished:
+                finished[flight["flight_number"]] = None
+                if pending_flights is not None:
+                    pending_flights.add(flight["flight_number"])
+        return finished
+    
+    async def get_ranked_flights_for_route(self, 
                                     origin: str, 
                                     destination: str, 
                                     date: Optional[str] = None, 
                                     max_routes: int = 5, 
                                     max_connections: int = 2, 
-                                    use_cache: bool = True) -> Dict[str, Any]:
+                                    use_cache: bool = True,
+                                    deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
         """
         Find and analyze flights for a specific route, combining route and reliability data.
         
+        With ``deadline_seconds`` the ranking is returned once the deadline passes,
+        computed from the reliability data that has arrived by then: flights still
+        being fetched are listed in ``pending_flights`` and their fetches finish in
+        the background to fill the cache. If even the route search is still
+        running, the result has no routes and ``pending`` set.
+        
+        If any flight's data was answered by a negative cache entry or its upstream
+        call was skipped, ``unavailable_data_until`` is the earliest time (epoch
+        seconds) until which those answers hold, else None. ``data_generation`` is
+        the rewrite snapshot (revalidator.generation()) taken before any cached data
+        was read, for storing the ranking in the response cache; project_ranking
+        leaves it out of responses.
+        
         Args:
             origin: Origin airport IATA code (e.g., "AMS")
             destination: Destination airport IATA code (e.g., "LHE")
@@ -103,20 +364,61 @@ class FlightAnalysisSystem:
             max_routes: Maximum number of routes to return 
             max_connections: Maximum number of connections allowed
             use_cache: Whether to use cached results
+            deadline_seconds: Optional time budget for the whole request in seconds
             
         Returns:
-            dict: Dictionary with route options and their reliability analysis
+            dict: Dictionary with route options and their reliability analysis.
+                Identical concurrent queries share this object, so callers must
+                not mutate it.
         """
+        # Concurrent identical queries share one computation. max_routes and
+        # use_cache and the deadline change the result too, so they are part of the key.
+        key = (origin.upper(), destination.upper(), date, max_connections, max_routes, use_cache, deadline_seconds)
+        return await self._rankings_flight.do(
+            key,
+            lambda: self._compute_ranked_flights_for_route(
+                origin, destination, date, max_routes, max_connections, use_cache, deadline_seconds
+            ),
+        )
+    
+    async def _compute_ranked_flights_for_route(self,
+                                                origin: str,
+                                                destination: str,
+                                                date: Optional[str],
+                                                max_routes: int,
+                                                max_connections: int,
+                                                use_cache: bool,
+                                                deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Run the full route search and reliability ranking (see get_ranked_flights_for_route)."""
+        deadline = Deadline(deadline_seconds)
+        data_generation = revalidator.generation()
+        
         # Step 1: Get flight routes for the desired origin/destination
         print(f"Finding route options from {origin} to {destination}...")
-        route_results = get_flight_numbers_for_route(
+        route_task = asyncio.ensure_future(get_flight_numbers_for_route(
             origin=origin,
             destination=destination,
             date=date,
             max_routes=max_routes,
             max_connections=max_connections,
             use_cache=use_cache
-        )
+        ))
+        done, _ = await deadline.wait([route_task], label=f"route search {origin}-{destination}")
+        if not done:
+            # The search keeps running and caches its result for the next request
+            return {
+                "query": {
+                    "origin": origin.upper(),
+                    "destination": destination.upper(),
+                    "date": date,
+                    "max_connections": max_connections,
+                    "max_routes": max_routes
+                },
+                "routes": [],
+                "pending": True,
+                "message": "Route search is still running, please retry shortly."
+            }
+        route_results = route_task.result()
         
         # Handle errors or empty results
         if "error" in route_results:
@@ -129,81 +431,593 @@ class FlightAnalysisSystem:
                 "message": "No flights found for this route."
             }
         
-        # Step 2: Extract flight numbers and prepare for reliability analysis
-        flight_list = []
-        for route in route_results.get("routes", []):
-            for flight_number in route.get("operating_flight_numbers", []):
-                flight_list.append({
-                    "flight_number": flight_number,
-                    "airline": route.get("operating_airline", "Unknown"),
+        # Step 2: Build the unique work set of flight numbers. A flight shared by
+        # several itineraries (e.g. the first leg out of a hub) is analyzed once.
+        flight_list = self._unique_flight_list(route_results.get("routes", []))
+        analysis_stats = self._dedup_stats(route_results.get("routes", []), flight_list)
+        
+        # Step 3: Analyze reliability of each unique flight
+        print(f"Analyzing reliability for {analysis_stats['unique_flights']} unique flights "
+              f"({analysis_stats['flight_references']} references across routes, "
+              f"dedup ratio {analysis_stats['dedup_ratio']})...")
+        stale_entries = set()
+        pending_flights = set()
+        with track_unavailable_data() as unavailable_data:
+            flight_summaries = await self._summarize_flights(flight_list, use_cache=use_cache,
+                                                             stale_entries=stale_entries,
+                                                             deadline=deadline,
+                                                             pending_flights=pending_flights)
+        
+        # Step 4: Fan each flight's summary out to every route containing it
+        enhanced_routes = [self._apply_reliability(route, flight_summaries) for route in route_results.get("routes", [])]
+        
+        # Construct final response
+        return {
+            "query": route_results.get("query", {}),
+            "routes": self._rank_routes(enhanced_routes),
+            "analysis_stats": analysis_stats,
+            "served_stale": bool(route_results.get("served_stale")) or bool(stale_entries),
+            "partial": bool(pending_flights),
+            "pending_flights": [flight["flight_number"] for flight in flight_list
+                                if flight["flight_number"] in pending_flights],
+            "unavailable_data_until": min(unavailable_data.values()) if unavailable_data else None,
+            "data_generation": data_generation
+        }
+    
+    async def get_ranked_flights_for_routes(self,
+                                            queries: List[Dict[str, Optional[str]]],
+                                            max_routes: int = 5,
+                                            max_connections: int = 2,
+                                            use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Rank many origin/destination pairs in one call.
+        
+        The route searches run concurrently. The flights of all pairs are then
+        analyzed as one work set, so a flight that appears in several pairs (e.g.
+        a feeder leg out of a hub) is fetched once and its reliability summary is
+        shared by every pair containing it. A failed query gets an error entry
+        without failing the batch.
+        
+        Args:
+            queries: Dictionaries with origin, destination and optional date
+            max_routes: Maximum number of routes per query
+            max_connections: Maximum number of connections allowed
+            use_cache: Whether to use cached results
+            
+        Returns:
+            dict: ``results`` keyed by "ORIGIN-DESTINATION" (plus "-DATE" when a date
+            was given), each shaped like get_ranked_flights_for_route or an
+            ``{"error": ...}`` entry, and ``batch_stats``
+        """
+        # Identical queries are searched once; invalid ones only get an error entry
+        unique_queries = {}
+        results = {}
+        keys = []
+        for query in queries:
+            origin, destination, date = query["origin"].upper(), query["destination"].upper(), query.get("date")
+            key = f"{origin}-{destination}-{date}" if date else f"{origin}-{destination}"
+            if key not in keys:
+                keys.append(key)
+            if not (IATA_CODE_PATTERN.match(origin) and IATA_CODE_PATTERN.match(destination)):
+                results[key] = {"error": "Origin and destination must be 3-letter IATA codes"}
+            elif date and not DATE_PATTERN.match(date):
+                results[key] = {"error": "Date must be in YYYY-MM-DD format"}
+            else:
+                unique_queries.setdefault(key, (origin, destination, date))
+        
+        print(f"\n===== Batch ranking of {len(unique_queries)} route queries =====")
+        
+        # Step 1: Search all routes concurrently
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def search(origin, destination, date):
+            async with semaphore:
+                return await get_flight_numbers_for_route(
+                    origin=origin,
+                    destination=destination,
+                    date=date,
+                    max_routes=max_routes,
+                    max_connections=max_connections,
+                    use_cache=use_cache
+                )
+        
+        searches = await asyncio.gather(*(search(*query) for query in unique_queries.values()),
+                                        return_exceptions=True)
+        
+        found_routes = {}
+        for key, route_results in zip(unique_queries, searches):
+            if isinstance(route_results, Exception):
+                print(f"⚠️ Route search failed for {key}: {route_results}")
+                results[key] = {"error": f"Route search failed: {route_results}"}
+            elif "error" in route_results:
+                results[key] = {"error": route_results["error"]}
+            elif not route_results.get("routes"):
+                results[key] = {
+                    "query": route_results.get("query", {}),
+                    "routes": [],
+                    "message": "No flights found for this route."
+                }
+            else:
+                found_routes[key] = route_results
+        
+        # Step 2: Analyze every flight of the batch once
+        all_routes = [route for route_results in found_routes.values() for route in route_results["routes"]]
+        flight_list = self._unique_flight_list(all_routes)
+        batch_stats = self._dedup_stats(all_routes, flight_list)
+        print(f"Analyzing reliability for {batch_stats['unique_flights']} unique flights across "
+              f"{len(found_routes)} routes ({batch_stats['flight_references']} references, "
+              f"dedup ratio {batch_stats['dedup_ratio']})...")
+        
+        stale_entries = set()
+        flight_summaries = {}
+        if flight_list:
+            flight_summaries = await self._summarize_flights(flight_list, use_cache=use_cache,
+                                                             stale_entries=stale_entries)
+        
+        # Step 3: Rank every query from the shared flight summaries
+        stale_flights = {entry.split(":", 1)[1] for entry in stale_entries}
+        for key, route_results in found_routes.items():
+            routes = route_results["routes"]
+            query_flights = self._unique_flight_list(routes)
+            enhanced_routes = [self._apply_reliability(route, flight_summaries) for route in routes]
+            results[key] = {
+                "query": route_results.get("query", {}),
+                "routes": self._rank_routes(enhanced_routes),
+                "analysis_stats": self._dedup_stats(routes, query_flights, record=False),
+                "served_stale": bool(route_results.get("served_stale")) or any(
+                    flight["flight_number"] in stale_flights for flight in query_flights),
+                "partial": False,
+                "pending_flights": []
+            }
+        
+        return {
+            "results": {key: results[key] for key in keys},
+            "batch_stats": {
+                **batch_stats,
+                "queries": len(queries),
+                "unique_queries": len(keys),
+                "errors": sum(1 for result in results.values() if "error" in result),
+            }
+        }
+    
+    async def get_ranked_flights_for_date_range(self,
+                                                origin: str,
+                                                destination: str,
+                                                dates: List[str],
+                                                max_routes: int = 5,
+                                                max_connections: int = 2,
+                                                use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Rank a route on every date of a window and pick the best options overall.
+        
+        Runs as a batch (see get_ranked_flights_for_routes): the per-date searches
+        run concurrently and each flight number's reliability, which doesn't depend
+        on the date, is analyzed once for the whole window.
+        
+        Args:
+            origin: Origin airport IATA code (e.g., "AMS")
+            destination: Destination airport IATA code (e.g., "LHE")
+            dates: Dates in YYYY-MM-DD format
+            max_routes: Maximum number of routes per date and in the overall best list
+            max_connections: Maximum number of connections allowed
+            use_cache: Whether to use cached results
+            
+        Returns:
+            dict: ``dates`` (a summary per date), ``best_routes`` (the top routes of the
+            whole window, each with its ``date``), ``results`` (the full ranking per
+            date) and ``batch_stats``
+        """
+        batch = await self.get_ranked_flights_for_routes(
+            [{"origin": origin, "destination": destination, "date": date} for date in dates],
+            max_routes=max_routes,
+            max_connections=max_connections,
+            use_cache=use_cache
+        )
+        
+        date_summaries = []
+        window_routes = []
+        for date in dates:
+            result = batch["results"][f"{origin.upper()}-{destination.upper()}-{date}"]
+            summary = {"date": date, "routes_found": len(result.get("routes", []))}
+            if "error" in result:
+                summary["error"] = result["error"]
+            elif result.get("routes"):
+                best = result["routes"][0]
+                summary.update({
+                    "best_smart_rank": best.get("smart_rank"),
+                    "best_reliability_score": max((route["reliability_score"] for route in result["routes"]
+                                                   if route.get("reliability_score") is not None), default=None),
+                    "lowest_price": min(float(route.get("price", {}).get("amount", "9999")) for route in result["routes"]),
+                    "shortest_duration_minutes": min((route["total_duration"] for route in result["routes"]
+                                                      if route.get("total_duration") is not None), default=None),
                 })
+                window_routes.extend(dict(route, date=date) for route in result["routes"])
+            date_summaries.append(summary)
+        
+        # Re-rank across the window so price and duration are compared between dates too
+        best_routes = self._rank_routes(window_routes)[:max_routes]
         
-        # Step 3: Analyze reliability of each flight
-        print(f"Analyzing reliability for {len(flight_list)} flights...")
-        reliability_results = self.analyze_multiple_flights(flight_list, use_cache=use_cache)
+        best_date = best_routes[0]["date"] if best_routes else None
+        return {
+            "query": {
+                "origin": origin.upper(),
+                "destination": destination.upper(),
+                "start_date": dates[0] if dates else None,
+                "end_date": dates[-1] if dates else None,
+                "max_connections": max_connections,
+                "max_routes": max_routes
+            },
+            "best_date": best_date,
+            "best_routes": best_routes,
+            "dates": date_summaries,
+            "results": batch["results"],
+            "batch_stats": batch["batch_stats"]
+        }
+    
+    async def stream_ranked_flights_for_route(self,
+                                              origin: str,
+                                              destination: str,
+                                              date: Optional[str] = None,
+                                              max_routes: int = 5,
+                                              max_connections: int = 2,
+                                              use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Rank the flights of a route incrementally, yielding events as data arrives.
         
-        # Step 4: Combine route and reliability data
-        enhanced_routes = []
+        Events (dicts with "event" and "data"):
         
-        for route in route_results.get("routes", []):
-            enhanced_route = route.copy()
+        - ``routes``: the route options (price, duration, connections) as soon as the
+          route search returns, each with a ``route_id``
+        - ``flight``: the reliability entry of one flight once its data has arrived
+          (straight away for flights with persisted derived statistics)
+        - ``ranking``: the new order of the routes after that flight's update
+        - ``done``: the final result, shaped like get_ranked_flights_for_route
+        - ``error``: the route search failed
+        
+        Fetches still running when the client goes away finish in the background.
+        
+        Args:
+            origin: Origin airport IATA code (e.g., "AMS")
+            destination: Destination airport IATA code (e.g., "LHE")
+            date: Optional specific date in YYYY-MM-DD format
+            max_routes: Maximum number of routes to return
+            max_connections: Maximum number of connections allowed
+            use_cache: Whether to use cached results
             
-            # Calculate route reliability score (average of all flights in the route)
-            flight_scores = []
-            reliability_data = []
+        Yields:
+            dict: Stream events
+        """
+        print(f"Finding route options from {origin} to {destination} (streaming)...")
+        route_results = await get_flight_numbers_for_route(
+            origin=origin,
+            destination=destination,
+            date=date,
+            max_routes=max_routes,
+            max_connections=max_connections,
+            use_cache=use_cache
+        )
+        
+        if "error" in route_results:
+            yield {"event": "error", "data": {"error": route_results["error"]}}
+            return
+        
+        routes = [dict(route, route_id=index) for index, route in enumerate(route_results.get("routes", []))]
+        flight_list = self._unique_flight_list(routes)
+        analysis_stats = self._dedup_stats(routes, flight_list)
+        yield {"event": "routes", "data": {
+            "query": route_results.get("query", {}),
+            "routes": routes,
+            "analysis_stats": analysis_stats,
+        }}
+        
+        if not routes:
+            yield {"event": "done", "data": {
+                "query": route_results.get("query", {}),
+                "routes": [],
+                "message": "No flights found for this route."
+            }}
+            return
+        
+        flight_numbers = [flight["flight_number"] for flight in flight_list]
+        stale_entries = set()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        data_generation = revalidator.generation()
+        derived = await self._load_derived_stats(flight_numbers) if use_cache else {}
+        flight_numbers = [flight_number for flight_number in flight_numbers if flight_number not in derived]
+        historical_cache, recent_cache = None, None
+        if use_cache and len(flight_numbers) > 1:
+            historical_cache, recent_cache = await self.reliability_api.prefetch_cached_data(flight_numbers)
+        
+        async def bounded(fetch, flight_number, prefetched):
+            async with semaphore:
+                return await fetch(flight_number, use_cache=use_cache, prefetched=prefetched,
+                                   stale_entries=stale_entries)
+        
+        async def analyze(flight_number):
+            historical_data, recent_data = await asyncio.gather(
+                bounded(self.reliability_api.get_historical_delay_stats, flight_number, historical_cache),
+                bounded(self.reliability_api.get_recent_flights, flight_number, recent_cache),
+            )
+            return flight_number, self._combine_flight_data(historical_data, recent_data)
+        
+        # Until its data arrives every flight is shown as pending
+        flight_summaries = {
+            flight_number: self._summarize_flight_reliability(flight_number, None, pending=True)
+            for flight_number in flight_numbers
+        }
+        flight_summaries.update({
+            flight_number: self._derived_summary(flight_number, stats) for flight_number, stats in derived.items()
+        })
+        
+        def ranking_event():
+            return {"event": "ranking", "data": {"routes": [
+                {
+                    "route_id": route["route_id"],
+                    "rank": route["rank"],
+                    "smart_rank": route["smart_rank"],
+                    "reliability_score": route["reliability_score"],
+                    "reliability_pending": route["reliability_pending"],
+                }
+                for route in ranked_routes
+            ]}}
+        
+        # Flights with persisted derived statistics are known straight away
+        ranked_routes = []
+        if derived:
+            for flight_number in derived:
+                yield {"event": "flight", "data": flight_summaries[flight_number]}
+            ranked_routes = self._rank_routes([self._apply_reliability(route, flight_summaries) for route in routes])
+            yield ranking_event()
+        
+        tasks = [asyncio.ensure_future(analyze(flight_number)) for flight_number in flight_numbers]
+        computed = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                flight_number, flight_data = await next_done
+                computed[flight_number] = flight_data
+                flight_summaries[flight_number] = self._summarize_flight_reliability(flight_number, flight_data)
+                yield {"event": "flight", "data": flight_summaries[flight_number]}
+                
+                ranked_routes = self._rank_routes(
+                    [self._apply_reliability(route, flight_summaries) for route in routes]
+                )
+                yield ranking_event()
+        finally:
+            # The client may have disconnected: let the remaining fetches fill the cache
+            for task in tasks:
+                if not task.done():
+                    finish_in_background(task)
+        
+        if use_cache:
+            await self._save_derived_stats(computed, flight_summaries, stale_entries, set(), data_generation)
+        
+        yield {"event": "done", "data": {
+            "query": route_results.get("query", {}),
+            "routes": ranked_routes,
+            "analysis_stats": analysis_stats,
+            "served_stale": bool(route_results.get("served_stale")) or bool(stale_entries),
+            "partial": False,
+            "pending_flights": []
+        }}
+    
+    async def _summarize_flights(self,
+                                 flight_list: List[Dict[str, str]],
+                                 use_cache: bool = True,
+                                 stale_entries: Optional[set] = None,
+                                 deadline: Optional[Deadline] = None,
+                                 pending_flights: Optional[set] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Build the reliability entry of every flight, reusing persisted derived statistics.
+        
+        Flights with current derived statistics skip loading and reprocessing their
+        raw data. The others are analyzed with analyze_multiple_flights, and the
+        complete analyses of fresh data are persisted for the next request.
+        
+        Args:
+            flight_list: List of flight dictionaries with flight_number key
+            use_cache: Whether to use cached results if available
+            stale_entries: Optional set that collects the cache entries served stale
+            deadline: Optional deadline for the whole analysis
+            pending_flights: Optional set that collects flights whose data is still being fetched
             
+        Returns:
+            dict: Reliability entries keyed by flight number (see _summarize_flight_reliability)
+        """
+        if stale_entries is None:
+            stale_entries = set()
+        if pending_flights is None:
+            pending_flights = set()
+        
+        flight_numbers = [flight["flight_number"] for flight in flight_list]
+        data_generation = revalidator.generation()
+        derived = await self._load_derived_stats(flight_numbers) if use_cache else {}
+        flight_summaries = {
+            flight_number: self._derived_summary(flight_number, stats) for flight_number, stats in derived.items()
+        }
+        
+        remaining = [flight for flight in flight_list if flight["flight_number"] not in derived]
+        if remaining:
+            reliability_results = await self.analyze_multiple_flights(remaining, use_cache=use_cache,
+                                                                      stale_entries=stale_entries,
+                                                                      deadline=deadline,
+                                                                      pending_flights=pending_flights)
+            for flight_number, flight_data in reliability_results.items():
+                flight_summaries[flight_number] = self._summarize_flight_reliability(
+                    flight_number, flight_data, pending=flight_number in pending_flights)
+            if use_cache:
+                await self._save_derived_stats(reliability_results, flight_summaries, stale_entries, pending_flights,
+                                               data_generation)
+        
+        return {flight_number: flight_summaries.get(flight_number) for flight_number in flight_numbers}
+    
+    async def _load_derived_stats(self, flight_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Load the current derived statistics of flights and count hits and misses."""
+        derived = await self.reliability_api.load_derived_stats(flight_numbers)
+        self._derived_totals["hits"] += len(derived)
+        self._derived_totals["misses"] += len(flight_numbers) - len(derived)
+        if derived:
+            print(f"📊 Using persisted derived stats for {len(derived)}/{len(flight_numbers)} flights")
+        return derived
+    
+    async def _save_derived_stats(self,
+                                  reliability_results: Dict[str, Optional[Dict[str, Any]]],
+                                  flight_summaries: Dict[str, Optional[Dict[str, Any]]],
+                                  stale_entries: set,
+                                  pending_flights: set,
+                                  data_generation: int) -> None:
+        """
+        Persist the derived statistics of flights analyzed from fresh, complete data.
+        
+        Analyses missing a data source, built from stale cache entries or cut short
+        by the deadline are not persisted, so they are recomputed once better data
+        is in the cache. Neither are analyses whose raw data a background refresh
+        rewrote after ``data_generation`` (revalidator.generation() taken before the
+        raw data was read), so the refresh's invalidation stands.
+        """
+        stats_by_flight = {}
+        for flight_number, flight_data in reliability_results.items():
+            if (flight_data is None or flight_data.get("data_quality") != "complete"
+                    or flight_number in pending_flights
+                    or f"historical:{flight_number}" in stale_entries
+                    or f"recent:{flight_number}" in stale_entries):
+                continue
+            summary = flight_summaries[flight_number]
+            stats_by_flight[flight_number] = {
+                key: value for key, value in summary.items() if key not in ("flight_number", "pending")
+            }
+        
+        if stats_by_flight:
+            saved = await self.reliability_api.save_derived_stats(stats_by_flight, since=data_generation)
+            self._derived_totals["written"] += saved
+    
+    @staticmethod
+    def _derived_summary(flight_number: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a flight's reliability entry from its persisted derived statistics."""
+        return {"flight_number": flight_number, **stats, "pending": False}
+    
+    @staticmethod
+    def _unique_flight_list(routes: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Collect each operating flight number once, in first-seen order."""
+        unique_flights = {}
+        for route in routes:
             for flight_number in route.get("operating_flight_numbers", []):
-                if flight_number in reliability_results:
-                    flight_data = reliability_results[flight_number]
-                    
-                    # Skip if flight_data is None (could happen with API rate limiting)
-                    if flight_data is None:
-                        continue
-                        
-                    reliability_score = FlightDataAnalyzer.calculate_reliability_score(flight_data)
-                    flight_scores.append(reliability_score)
-                    
-                    # Get delay percentage
-                    if flight_data.get("data_quality") == "complete":
-                        delay_pct = flight_data.get("combined_statistics", {}).get("overall_delay_percentage")
-                        # Get flight counts from data_sources
-                        historical_count = flight_data.get("data_sources", {}).get("historical", {}).get("total_flights", 0)
-                        recent_count = flight_data.get("data_sources", {}).get("recent", {}).get("total_flights", 0)
-                    elif flight_data.get("data_quality") == "missing_historical":
-                        delay_stats = flight_data.get("delay_statistics", {}).get("arrival") or flight_data.get("delay_statistics", {}).get("departure", {})
-                        delay_pct = delay_stats.get("delayed_percentage")
-                        # For missing historical, get flights from total_flights
-                        historical_count = 0
-                        recent_count = flight_data.get("total_flights", 0)
-                    elif flight_data.get("data_quality") == "missing_recent":
-                        delay_pct = flight_data.get("overall", {}).get("overall_delayed_percentage")
-                        # For missing recent, get counts from overall
-                        historical_count = flight_data.get("overall", {}).get("total_flights_analyzed", 0)
-                        recent_count = 0
-                    else:
-                        delay_pct = None
-                        historical_count = 0
-                        recent_count = 0
-                    
-                    reliability_data.append({
+                if flight_number not in unique_flights:
+                    unique_flights[flight_number] = {
                         "flight_number": flight_number,
-                        "reliability_score": reliability_score,
-                        "delay_percentage": delay_pct,
-                        "data_quality": flight_data.get("data_quality", "unknown"),
-                        "historical_flight_count": historical_count,
-                        "recent_flight_count": recent_count
-                    })
-            
-            # Calculate average reliability score for the route
-            if flight_scores:
-                avg_reliability = sum(flight_scores) / len(flight_scores)
-                enhanced_route["reliability_score"] = round(avg_reliability)
-            else:
-                enhanced_route["reliability_score"] = None
+                        "airline": route.get("operating_airline", "Unknown"),
+                    }
+        return list(unique_flights.values())
+    
+    def _dedup_stats(self,
+                     routes: List[Dict[str, Any]],
+                     flight_list: List[Dict[str, str]],
+                     record: bool = True) -> Dict[str, Any]:
+        """Count flight references vs. unique flights for one request and (optionally) record the totals."""
+        references = sum(len(route.get("operating_flight_numbers", [])) for route in routes)
+        unique = len(flight_list)
+        
+        if record:
+            self._dedup_totals["flight_references"] += references
+            self._dedup_totals["unique_flights"] += unique
+        
+        return {
+            "flight_references": references,
+            "unique_flights": unique,
+            "dedup_ratio": round(1 - unique / references, 3) if references else 0.0
+        }
+    
+    @staticmethod
+    def _summarize_flight_reliability(flight_number: str,
+                                      flight_data: Optional[Dict[str, Any]],
+                                      pending: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Build the per-flight reliability entry shown on every route containing the flight.
+        
+        Args:
+            flight_number: Flight number
+            flight_data: Combined flight analysis (None if unavailable)
+            pending: Whether some of the flight's data was still being fetched at the deadline
             
-            enhanced_route["reliability_data"] = reliability_data
-            enhanced_routes.append(enhanced_route)
+        Returns:
+            dict: Reliability entry, or None when there is no analysis for the flight
+        """
+        # Data still on its way: show the flight as pending without a score
+        if flight_data is None and pending:
+            return {
+                "flight_number": flight_number,
+                "reliability_score": None,
+                "delay_percentage": None,
+                "data_quality": "pending",
+                "historical_flight_count": 0,
+                "recent_flight_count": 0,
+                "pending": True
+            }
         
+        # Skip if flight_data is None (could happen with API rate limiting)
+        if flight_data is None:
+            return None
+        
+        reliability_score = FlightDataAnalyzer.calculate_reliability_score(flight_data)
+        
+        # Get delay percentage
+        if flight_data.get("data_quality") == "complete":
+            delay_pct = flight_data.get("combined_statistics", {}).get("overall_delay_percentage")
+            # Get flight counts from data_sources
+            historical_count = flight_data.get("data_sources", {}).get("historical", {}).get("total_flights", 0)
+            recent_count = flight_data.get("data_sources", {}).get("recent", {}).get("total_flights", 0)
+        elif flight_data.get("data_quality") == "missing_historical":
+            delay_stats = flight_data.get("delay_statistics", {}).get("arrival") or flight_data.get("delay_statistics", {}).get("departure", {})
+            delay_pct = delay_stats.get("delayed_percentage")
+            # For missing historical, get flights from total_flights
+            historical_count = 0
+            recent_count = flight_data.get("total_flights", 0)
+        elif flight_data.get("data_quality") == "missing_recent":
+            delay_pct = flight_data.get("overall", {}).get("overall_delayed_percentage")
+            # For missing recent, get counts from overall
+            historical_count = flight_data.get("overall", {}).get("total_flights_analyzed", 0)
+            recent_count = 0
+        else:
+            delay_pct = None
+            historical_count = 0
+            recent_count = 0
+        
+        return {
+            "flight_number": flight_number,
+            "reliability_score": reliability_score,
+            "delay_percentage": delay_pct,
+            "data_quality": flight_data.get("data_quality", "unknown"),
+            "historical_flight_count": historical_count,
+            "recent_flight_count": recent_count,
+            "pending": pending
+        }
+    
+    @staticmethod
+    def _apply_reliability(route: Dict[str, Any], flight_summaries: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Copy a route and attach its flights' reliability entries and average score."""
+        enhanced_route = route.copy()
+        
+        reliability_data = [
+            dict(flight_summaries[flight_number])
+            for flight_number in route.get("operating_flight_numbers", [])
+            if flight_summaries.get(flight_number) is not None
+        ]
+        
+        # Calculate route reliability score (average of all flights in the route with a score)
+        flight_scores = [entry["reliability_score"] for entry in reliability_data
+                         if entry["reliability_score"] is not None]
+        if flight_scores:
+            avg_reliability = sum(flight_scores) / len(flight_scores)
+            enhanced_route["reliability_score"] = round(avg_reliability)
+        else:
+            enhanced_route["reliability_score"] = None
+        
+        enhanced_route["reliability_data"] = reliability_data
+        enhanced_route["reliability_pending"] = any(entry["pending"] for entry in reliability_data)
+        return enhanced_route
+    
+    @staticmethod
+    def _rank_routes(enhanced_routes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Compute the smart rank of each route and return them sorted best first."""
         # Calculate normalized scores for each factor to use in the smart ranking
         if enhanced_routes:
             # Find min/max values for normalization
@@ -249,14 +1063,10 @@ class FlightAnalysisSystem:
         for i, route in enumerate(sorted_routes):
             route["rank"] = i + 1
         
-        # Construct final response
-        return {
-            "query": route_results.get("query", {}),
-            "routes": sorted_routes
-        }
+        return sorted_routes
 
 
-def extract_flight_numbers_for_route(origin_iata: str, destination_iata: str) -> List[str]:
+async def extract_flight_numbers_for_route(origin_iata: str, destination_iata: str) -> List[str]:
     """
     Utility function to get flight numbers for a route, for use in FastAPI.
     This is a simple wrapper around the route search functionality.
@@ -270,7 +1080,7 @@ def extract_flight_numbers_for_route(origin_iata: str, destination_iata: str) ->
     """
     from .api.routes import get_flight_numbers_for_route as get_route_flights
     
-    route_results = get_route_flights(
+    route_results = await get_route_flights(
         origin=origin_iata, 
         destination=destination_iata,
         max_routes=10,  # Get more routes to have a larger sample
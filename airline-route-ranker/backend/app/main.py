@@ -3,7 +3,7 @@ FastAPI backend for the Airline Route Ranker application.
 """
 from fastapi import FastAPI, HTTPException, Path, Query, Body, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 import os
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
@@ -11,14 +11,25 @@ import glob
 from pathlib import Path as PathLib
 from pydantic import BaseModel, EmailStr, Field
 import uuid
+import time
 import json
 
 from .controller import FlightAnalysisSystem, extract_flight_numbers_for_route
 from .utils.email import send_contact_email
-from .utils.supabase_client import supabase, supabase_admin
-from .utils.payments import create_payment_link, handle_webhook_event, get_db_client
+from .utils.supabase_client import supabase, supabase_admin, write_buffer, close_write_buffer, get_memory_cache_stats
+from .utils.payments import create_payment_link, handle_webhook_event, confirm_manual_payment
 from .utils.paypal import create_paypal_payment_link, process_paypal_successful_payment
 from .utils.config import ACTIVE_PAYMENT_PROVIDER, FRONTEND_URL
+from .utils.http_client import close_upstream_clients, get_upstream_client_stats, get_circuit_breaker_stats
+from .utils.executor import run_blocking, get_pool_stats, shutdown_pools
+from .utils.negative_cache import negative_cache_stats
+from .utils.response_cache import rankings_cache, make_etag, etag_matches
+from .utils.json_response import FastJSONResponse, dumps_json
+from .utils.compression import CompressionMiddleware
+from .api.amadeus_auth import amadeus_token_manager
+from .prefetch import PrefetchScheduler
+from .utils.config import PREFETCH_ENABLED, RANKINGS_DEADLINE, BATCH_RANKINGS_MAX_QUERIES, DATE_RANGE_MAX_DAYS
+from .utils.config import RESPONSE_CACHE_MAX_AGE, COMPRESSION_ENABLED
 
 # Load environment variables
 load_dotenv()
@@ -30,7 +41,8 @@ API_KEY = os.getenv("API_KEY", "dev-api-key-change-in-production")
 app = FastAPI(
     title="Airline Route Ranker API",
     description="API for analyzing and ranking flights by reliability on specific routes",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS to allow requests from frontend
@@ -60,6 +72,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses for clients that accept gzip or brotli
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Simple API key middleware
 @app.middleware("http")
 async def verify_api_key(request: Request, call_next):
@@ -160,6 +176,41 @@ except ValueError as e:
     print(f"ERROR initializing FlightAnalysisSystem: {e}")
     flight_system = None
 
+# Background refresh of popular routes
+prefetch_scheduler = PrefetchScheduler(flight_system) if flight_system is not None else None
+
+
+@app.on_event("startup")
+async def start_prefetch_scheduler():
+    """Start the popular route prefetch loop if it is enabled."""
+    if PREFETCH_ENABLED and prefetch_scheduler is not None:
+        prefetch_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_prefetch_scheduler():
+    """Stop the popular route prefetch loop."""
+    if prefetch_scheduler is not None:
+        await prefetch_scheduler.stop()
+
+
+@app.on_event("shutdown")
+async def shutdown_upstream_clients():
+    """Close pooled upstream HTTP connections on shutdown."""
+    await close_upstream_clients()
+
+
+@app.on_event("shutdown")
+async def flush_write_buffer():
+    """Write any buffered cache rows to Supabase before the process exits."""
+    await run_blocking("storage", close_write_buffer)
+
+
+@app.on_event("shutdown")
+async def shutdown_blocking_pools():
+    """Let queued blocking work finish, then stop the worker threads."""
+    shutdown_pools()
+
 
 # Contact form model for validation
 class ContactForm(BaseModel):
@@ -171,8 +222,30 @@ class ContactForm(BaseModel):
 
 @app.get("/api/health")
 async def health_check():
-    """Simple health check endpoint."""
-    return {"status": "ok", "system_initialized": flight_system is not None}
+    """Simple health check endpoint, including the state of the upstream circuit breakers."""
+    upstreams = get_circuit_breaker_stats()
+    degraded = any(breaker["state"] != "closed" for breaker in upstreams.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "system_initialized": flight_system is not None,
+        "upstreams": upstreams,
+    }
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime metrics for the ranking pipeline and its upstream integrations."""
+    return {
+        "flight_system": flight_system.get_stats() if flight_system is not None else None,
+        "amadeus_token": amadeus_token_manager.get_stats(),
+        "upstream_clients": get_upstream_client_stats(),
+        "thread_pools": get_pool_stats(),
+        "write_buffer": write_buffer.get_stats(),
+        "memory_cache": get_memory_cache_stats(),
+        "negative_cache": negative_cache_stats.get_stats(),
+        "rankings_response_cache": rankings_cache.get_stats(),
+        "prefetch": prefetch_scheduler.get_stats() if prefetch_scheduler is not None else None,
+    }
 
 
 @app.post("/api/admin/initialize-db")
@@ -193,7 +266,7 @@ async def initialize_db(request: Request):
         from supabase.setup_script import main as setup_db
         
         # Run the setup
-        success = setup_db()
+        success = await run_blocking("storage", setup_db)
         
         if not success:
             raise HTTPException(status_code=500, detail="Database initialization failed. Check server logs.")
@@ -219,7 +292,9 @@ async def submit_contact_form(contact: ContactForm = Body(...)):
     """
     try:
         # Send email - using the imported function directly
-        success = send_contact_email(
+        success = await run_blocking(
+            "email",
+            send_contact_email,
             name=contact.name,
             email=contact.email,
             subject=contact.subject,
@@ -248,7 +323,10 @@ async def get_flight_rankings(
     date: Optional[str] = Query(None, regex="^\\d{4}-\\d{2}-\\d{2}$"),
     max_routes: int = Query(5, ge=1, le=10),
     max_connections: int = Query(2, ge=0, le=3),
-    use_cache: bool = Query(True, description="Whether to use cached results if available")
+    use_cache: bool = Query(True, description="Whether to use cached results if available"),
+    view: str = Query("full", regex="^(full|summary)$", description="full, or summary for the fields most views need"),
+    fields: Optional[str] = Query(None, regex="^[a-z_]+(,[a-z_]+)*$", description="Comma-separated route fields to return"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get ranked flight reliability data for a specific route.
@@ -260,9 +338,18 @@ async def get_flight_rankings(
         max_routes: Maximum number of routes to return (default: 5)
         max_connections: Maximum number of connections (default: 2)
         use_cache: Whether to use cached results (default: True)
+        view: "full" (default) or "summary" (rank, score, price, duration and each
+            flight's delay percentage only)
+        fields: Optional comma-separated route fields to return instead of the view's
+        if_none_match: ETag of the client's copy; answered with 304 if still current
         
     Returns:
-        List of ranked flights with reliability scores
+        List of ranked flights with reliability scores. The response is returned
+        after at most RANKINGS_DEADLINE seconds: flights whose data is still being
+        fetched are listed in ``pending_flights`` (``partial`` is True) and the
+        fetches finish in the background, so a retry gets the complete ranking.
+        Complete rankings carry an ETag and are served from the response cache
+        until one of their routes or flights is rewritten.
     """
     if flight_system is None:
         raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
@@ -275,6 +362,14 @@ async def get_flight_rankings(
     else:
         print("No date specified, will use default date")
 
+    # Repeated requests for the same ranking are answered from the response cache
+    cache_key = (origin_iata, destination_iata, date, max_routes, max_connections, view, fields)
+    if use_cache:
+        cached = rankings_cache.get(cache_key)
+        if cached is not None:
+            print(f"🟦 Serving cached ranking for {origin_iata} -> {destination_iata}")
+            return _rankings_response(cached["body"], cached["etag"], if_none_match)
+
     try:
         # Check if we have cached results for this route before making the API call
         if use_cache:
@@ -309,13 +404,14 @@ async def get_flight_rankings(
                         print(f"Will use cache with available dates: {', '.join(cache_dates)}")
         
         # Get flight rankings from the analysis system
-        result = flight_system.get_ranked_flights_for_route(
+        result = await flight_system.get_ranked_flights_for_route(
             origin=origin_iata,
             destination=destination_iata,
             date=date,
             max_routes=max_routes,
             max_connections=max_connections,
-            use_cache=use_cache
+            use_cache=use_cache,
+            deadline_seconds=RANKINGS_DEADLINE
         )
         
         # Log what date was actually used in the response
@@ -331,8 +427,27 @@ async def get_flight_rankings(
         # Handle errors
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
-            
-        return result
+        
+        body = dumps_json(flight_system.project_ranking(result, view, fields.split(",") if fields else None))
+        
+        # Data answered by negative cache entries is retried once they expire, and
+        # skipped upstream calls on the next request: don't cache the ranking longer
+        data_ttl = None
+        if result.get("unavailable_data_until") is not None:
+            data_ttl = result["unavailable_data_until"] - time.time()
+        
+        # Partial, pending or stale rankings change on the next request: don't cache them
+        if (result.get("partial") or result.get("pending") or result.get("served_stale")
+                or (data_ttl is not None and data_ttl <= 0)):
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        
+        entry = None
+        if use_cache:
+            flights = {flight_number for route in result.get("routes", [])
+                       for flight_number in route.get("operating_flight_numbers", [])}
+            entry = rankings_cache.set(cache_key, result, body, [(origin_iata, destination_iata)], flights,
+                                       ttl=data_ttl, since=result.get("data_generation"))
+        return _rankings_response(body, entry["etag"] if entry else make_etag(body), if_none_match)
 
     except Exception as e:
         print(f"Error processing route {origin_iata} -> {destination_iata}: {e}")
@@ -341,10 +456,196 @@ async def get_flight_rankings(
         raise HTTPException(status_code=500, detail=f"An error occurred processing the request: {e}")
 
 
+def _rankings_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """Answer with the serialized ranking, or 304 if the client's copy has the same ETag."""
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={RESPONSE_CACHE_MAX_AGE}, must-revalidate"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class RankingQuery(BaseModel):
+    origin: str = Field(..., min_length=3, max_length=3, description="Origin airport IATA code")
+    destination: str = Field(..., min_length=3, max_length=3, description="Destination airport IATA code")
+    date: Optional[str] = Field(None, description="Optional date in YYYY-MM-DD format")
+
+
+class BatchRankingsRequest(BaseModel):
+    queries: List[RankingQuery] = Field(..., description="Origin/destination pairs to rank")
+    max_routes: int = Field(5, ge=1, le=10)
+    max_connections: int = Field(2, ge=0, le=3)
+    use_cache: bool = Field(True, description="Whether to use cached results if available")
+
+
+@app.post("/api/rankings/batch")
+async def get_batch_flight_rankings(batch: BatchRankingsRequest = Body(...)):
+    """
+    Get ranked flight reliability data for many routes in one call.
+    
+    The route searches run concurrently and each flight number is analyzed once
+    for the whole batch, even if it appears on several routes.
+    
+    Args:
+        batch: The queries plus the max_routes/max_connections/use_cache options shared by all of them
+        
+    Returns:
+        Rankings keyed by "ORIGIN-DESTINATION[-DATE]" (failed queries get an
+        ``error`` entry) and batch statistics
+    """
+    if flight_system is None:
+        raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
+    
+    if not batch.queries:
+        raise HTTPException(status_code=400, detail="A batch needs at least one query")
+    if len(batch.queries) > BATCH_RANKINGS_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_RANKINGS_MAX_QUERIES} queries")
+    
+    print(f"Received batch ranking request for {len(batch.queries)} routes")
+    
+    try:
+        result = await flight_system.get_ranked_flights_for_routes(
+            [{"origin": query.origin, "destination": query.destination, "date": query.date} for query in batch.queries],
+            max_routes=batch.max_routes,
+            max_connections=batch.max_connections,
+            use_cache=batch.use_cache
+        )
+        return FastJSONResponse(content=result)
+    except Exception as e:
+        print(f"Error processing batch ranking request: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An error occurred processing the request: {e}")
+
+
+@app.get("/api/rankings/{origin_iata}/{destination_iata}/range")
+async def get_flight_rankings_for_date_range(
+    origin_iata: str = Path(..., min_length=3, max_length=3, regex="^[A-Z]{3}$"),
+    destination_iata: str = Path(..., min_length=3, max_length=3, regex="^[A-Z]{3}$"),
+    start_date: str = Query(..., regex="^\\d{4}-\\d{2}-\\d{2}$"),
+    end_date: str = Query(..., regex="^\\d{4}-\\d{2}-\\d{2}$"),
+    max_routes: int = Query(5, ge=1, le=10),
+    max_connections: int = Query(2, ge=0, le=3),
+    use_cache: bool = Query(True, description="Whether to use cached results if available")
+):
+    """
+    Get ranked flights for every date in a window (e.g. "best day next week").
+    
+    Args:
+        origin_iata: Origin airport IATA code (e.g., "LHR")
+        destination_iata: Destination airport IATA code (e.g., "JFK")
+        start_date: First date of the window (YYYY-MM-DD)
+        end_date: Last date of the window (YYYY-MM-DD, inclusive)
+        max_routes: Maximum number of routes per date and overall (default: 5)
+        max_connections: Maximum number of connections (default: 2)
+        use_cache: Whether to use cached results (default: True)
+        
+    Returns:
+        A summary per date, the best routes across the window and the full ranking per date
+    """
+    from datetime import datetime, timedelta
+    
+    if flight_system is None:
+        raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
+    
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    days = (end - start).days + 1
+    if days > DATE_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The date window can span at most {DATE_RANGE_MAX_DAYS} days")
+    
+    dates = [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)]
+    print(f"Received date-range request for route: {origin_iata} -> {destination_iata} ({start_date} to {end_date})")
+    
+    try:
+        result = await flight_system.get_ranked_flights_for_date_range(
+            origin=origin_iata,
+            destination=destination_iata,
+            dates=dates,
+            max_routes=max_routes,
+            max_connections=max_connections,
+            use_cache=use_cache
+        )
+        return FastJSONResponse(content=result)
+    except Exception as e:
+        print(f"Error processing date range {origin_iata} -> {destination_iata}: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An error occurred processing the request: {e}")
+
+
+@app.get("/api/rankings/{origin_iata}/{destination_iata}/stream")
+async def stream_flight_rankings(
+    origin_iata: str = Path(..., min_length=3, max_length=3, regex="^[A-Z]{3}$"),
+    destination_iata: str = Path(..., min_length=3, max_length=3, regex="^[A-Z]{3}$"),
+    date: Optional[str] = Query(None, regex="^\\d{4}-\\d{2}-\\d{2}$"),
+    max_routes: int = Query(5, ge=1, le=10),
+    max_connections: int = Query(2, ge=0, le=3),
+    use_cache: bool = Query(True, description="Whether to use cached results if available"),
+    format: str = Query("sse", regex="^(sse|ndjson)$", description="Server-Sent Events or newline-delimited JSON")
+):
+    """
+    Stream ranked flight reliability data for a route as it becomes available.
+    
+    The route options are sent as soon as the flight search returns, followed by a
+    "flight" event per analyzed flight and a "ranking" event with the updated
+    route order, and finally a "done" event with the complete ranking.
+    
+    Args:
+        origin_iata: Origin airport IATA code (e.g., "LHR")
+        destination_iata: Destination airport IATA code (e.g., "JFK")
+        date: Optional specific date in YYYY-MM-DD format
+        max_routes: Maximum number of routes to return (default: 5)
+        max_connections: Maximum number of connections (default: 2)
+        use_cache: Whether to use cached results (default: True)
+        format: "sse" (text/event-stream) or "ndjson" (application/x-ndjson)
+        
+    Returns:
+        A streaming response of ranking events
+    """
+    if flight_system is None:
+        raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
+    
+    print(f"Received streaming request for route: {origin_iata} -> {destination_iata}")
+    
+    async def event_stream():
+        try:
+            async for event in flight_system.stream_ranked_flights_for_route(
+                origin=origin_iata,
+                destination=destination_iata,
+                date=date,
+                max_routes=max_routes,
+                max_connections=max_connections,
+                use_cache=use_cache
+            ):
+                yield _format_stream_event(event, format)
+        except Exception as e:
+            print(f"Error streaming route {origin_iata} -> {destination_iata}: {e}")
+            yield _format_stream_event({"event": "error", "data": {"error": f"An error occurred processing the request: {e}"}}, format)
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # Disable proxy buffering so events reach the client as they are produced
+    return StreamingResponse(event_stream(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _format_stream_event(event: Dict[str, Any], format: str) -> str:
+    """Serialize a ranking stream event as an SSE message or an NDJSON line."""
+    if format == "sse":
+        return f"event: {event['event']}\ndata: {dumps_json(event['data']).decode('utf-8')}\n\n"
+    return dumps_json(event).decode("utf-8") + "\n"
+
+
 @app.get("/api/flight/{flight_number}")
 async def get_flight_reliability(
     flight_number: str = Path(..., regex="^[A-Z0-9]{2,8}$"),
-    use_cache: bool = Query(True, description="Whether to use cached results if available")
+    use_cache: bool = Query(True, description="Whether to use cached results if available"),
+    view: str = Query("full", regex="^(full|summary)$", description="full analysis, or summary statistics only"),
+    fields: Optional[str] = Query(None, regex="^[a-z_]+(,[a-z_]+)*$", description="Comma-separated fields to return")
 ):
     """
     Get reliability data for a specific flight number.
@@ -352,15 +653,27 @@ async def get_flight_reliability(
     Args:
         flight_number: The flight number to analyze (e.g., "BA123")
         use_cache: Whether to use cached results (default: True)
+        view: "full" (default) for the complete analysis, or "summary" for the score,
+            delay percentage, data quality and flight counts (built from the persisted
+            derived statistics when possible)
+        fields: Optional comma-separated top-level fields to return
         
     Returns:
-        Flight reliability data
+        Flight reliability data (individual flights are available page by page
+        from /api/flight/{flight_number}/history)
     """
     if flight_system is None:
         raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
 
+    field_list = fields.split(",") if fields else None
     try:
-        flight_data = flight_system.analyze_flight(flight_number, use_cache=use_cache)
+        if view == "summary":
+            summary = await flight_system.get_flight_summary(flight_number, use_cache=use_cache)
+            if not summary:
+                raise HTTPException(status_code=404, detail=f"No data found for flight {flight_number}")
+            return FastJSONResponse(content=flight_system.project_fields(summary, field_list))
+        
+        flight_data = await flight_system.analyze_flight(flight_number, use_cache=use_cache)
         
         if not flight_data:
             raise HTTPException(status_code=404, detail=f"No data found for flight {flight_number}")
@@ -370,8 +683,10 @@ async def get_flight_reliability(
         reliability_score = FlightDataAnalyzer.calculate_reliability_score(flight_data)
         flight_data["reliability_score"] = reliability_score
         
-        return flight_data
+        return FastJSONResponse(content=flight_system.project_fields(flight_data, field_list))
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error analyzing flight {flight_number}: {e}")
         import traceback
@@ -379,6 +694,39 @@ async def get_flight_reliability(
         raise HTTPException(status_code=500, detail=f"An error occurred processing the request: {e}")
 
 
+@app.get("/api/flight/{flight_number}/history")
+async def get_flight_history(
+    flight_number: str = Path(..., regex="^[A-Z0-9]{2,8}$"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    use_cache: bool = Query(True, description="Whether to use cached results if available")
+):
+    """
+    Get a flight's recent individual flights page by page, newest first.
+    
+    Args:
+        flight_number: The flight number (e.g., "BA123")
+        page: Page number, starting at 1 (default: 1)
+        page_size: Flights per page (default: 20, max 100)
+        use_cache: Whether to use cached results (default: True)
+        
+    Returns:
+        The requested page of flights with total, page and total_pages
+    """
+    if flight_system is None:
+        raise HTTPException(status_code=503, detail="Backend system not initialized (check API key)")
+
+    try:
+        history = await flight_system.get_flight_history(flight_number, page=page, page_size=page_size,
+                                                         use_cache=use_cache)
+        return FastJSONResponse(content=history)
+    except Exception as e:
+        print(f"Error getting history for flight {flight_number}: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An error occurred processing the request: {e}")
+
+
 @app.get("/api/cache/dates/{origin_iata}/{destination_iata}")
 async def get_available_cached_dates(
     origin_iata: str = Path(..., min_length=3, max_length=3, regex="^[A-Z]{3}$"),
@@ -466,7 +814,9 @@ async def create_payment(
         
         if provider == 'stripe':
             # Create Stripe payment link
-            payment_data = await create_payment_link(
+            payment_data = await run_blocking(
+                "payments",
+                create_payment_link,
                 package_id=payment.package_id,
                 user_id=payment.user_id,
                 success_url=payment.success_url,
@@ -474,7 +824,9 @@ async def create_payment(
             )
         else:
             # Default to PayPal
-            payment_data = await create_paypal_payment_link(
+            payment_data = await run_blocking(
+                "payments",
+                create_paypal_payment_link,
                 package_id=payment.package_id,
                 user_id=payment.user_id,
                 success_url=payment.success_url,
@@ -518,7 +870,7 @@ async def webhook(
         
         # Process the webhook
         print("⏳ Processing webhook event...")
-        result = await handle_webhook_event(payload, stripe_signature)
+        result = await run_blocking("payments", handle_webhook_event, payload, stripe_signature)
         print(f"✅ Webhook processed: {result}")
         
         return result
@@ -623,7 +975,7 @@ async def paypal_success_post(
         }
         
         print(f"💳 Processing PayPal payment with data: {payment_data}")
-        result = await process_paypal_successful_payment(payment_data)
+        result = await run_blocking("payments", process_paypal_successful_payment, payment_data)
         return result
     
     except Exception as e:
@@ -643,88 +995,4 @@ async def confirm_success(
     Manual confirmation endpoint for successful payments.
     Use this as a fallback if webhooks aren't triggering proper credit updates.
     """
-    try:
-        # Get admin client for database operations
-        db = get_db_client()
-        
-        print(f"🚨 MANUAL PAYMENT CONFIRMATION: User {user_id}, Session {session_id}, Credits {credits}")
-        
-        # 1. Check if payment was already processed
-        payment_result = db.table('user_payment_transactions').select('*').eq('provider_transaction_id', session_id).execute()
-        
-        if payment_result.data and len(payment_result.data) > 0:
-            # Payment already processed
-            return {
-                "status": "already_processed",
-                "message": "This payment was already processed",
-                "payment": payment_result.data[0]
-            }
-        
-        # 2. Get current credits
-        profile_result = db.table('user_profiles').select('credits, total_credits_purchased').eq('id', user_id).execute()
-        
-        if not profile_result.data or len(profile_result.data) == 0:
-            return {"status": "error", "message": f"User not found: {user_id}"}
-        
-        profile = profile_result.data[0]
-        current_credits = profile.get('credits', 0)
-        total_purchased = profile.get('total_credits_purchased', 0)
-        
-        print(f"💰 Current credits: {current_credits}, Adding: {credits}")
-        
-        # 3. Insert payment record
-        payment_data = {
-            'user_id': user_id,
-            'amount': credits * 0.40,  # Approximate dollar value
-            'currency': 'USD',
-            'status': 'completed',
-            'provider': 'stripe',
-            'provider_transaction_id': session_id,
-            'credits_purchased': credits,
-            'package_name': 'Manual confirmation'
-        }
-        
-        payment_result = db.table('user_payment_transactions').insert(payment_data).execute()
-        
-        if not payment_result.data:
-            return {"status": "error", "message": "Failed to record payment transaction"}
-            
-        payment_id = payment_result.data[0]['id']
-        
-        # 4. Insert credit transaction
-        credit_data = {
-            'user_id': user_id,
-            'amount': credits,
-            'transaction_type': 'purchase',
-            'description': f"Purchased {credits} credits (manual confirmation)",
-            'payment_id': payment_id
-        }
-        
-        credit_result = db.table('user_credit_transactions').insert(credit_data).execute()
-        
-        if not credit_result.data:
-            return {"status": "error", "message": "Failed to record credit transaction"}
-        
-        # 5. Update user's credit balance
-        update_data = {
-            'credits': current_credits + credits,
-            'total_credits_purchased': total_purchased + credits
-        }
-        
-        update_result = db.table('user_profiles').update(update_data).eq('id', user_id).execute()
-        
-        if not update_result.data:
-            return {"status": "error", "message": "Failed to update credit balance"}
-            
-        return {
-            "status": "success", 
-            "message": f"Manually added {credits} credits to user {user_id}",
-            "previous_credits": current_credits,
-            "new_credits": current_credits + credits
-        }
-        
-    except Exception as e:
-        print(f"🔧 MANUAL CONFIRMATION ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+    return await run_blocking("payments", confirm_manual_payment, user_id, session_id, credits)
@@ -2,13 +2,30 @@
 Data processing and analysis models for flight reliability data.
 """
 import re
-from datetime import datetime
+import math
 from functools import lru_cache
 
+from .timestamps import parse_time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Weighting constants for analysis
 HISTORICAL_WEIGHT = 0.6  # Weight for historical data
 RECENT_WEIGHT = 0.4      # Weight for recent data
 
+# Delay lists at least this long are summarized with NumPy (below it the plain
+# Python loop is faster than building an array)
+VECTORIZED_STATS_MIN_DELAYS = 64
+
+# Stored with persisted derived statistics; rows with another version are recomputed.
+# Bump SCORING_REVISION when the scoring logic changes (the weights are included).
+SCORING_REVISION = 1
+SCORING_VERSION = f"{SCORING_REVISION}:{HISTORICAL_WEIGHT}:{RECENT_WEIGHT}"
+
 
 class FlightDataProcessor:
     """Process raw API responses into structured data."""
@@ -416,10 +433,9 @@ class FlightDataProcessor:
         
         # Get scheduled departure time
         departure_scheduled = safe_get(flight, ['departure', 'scheduledTime', 'utc'])
-        if departure_scheduled:
-            scheduled_dt = FlightDataProcessor._parse_time(departure_scheduled)
-            if scheduled_dt:
-                result['scheduled_date'] = scheduled_dt.date()
+        departure_scheduled_dt = FlightDataProcessor._parse_time(departure_scheduled)
+        if departure_scheduled_dt:
+            result['scheduled_date'] = departure_scheduled_dt.date()
         
         # Get actual departure time
         actual_departure = None
@@ -429,11 +445,10 @@ class FlightDataProcessor:
             actual_departure = safe_get(flight, ['departure', 'revisedTime', 'utc'])
         
         # Calculate departure delay
-        if departure_scheduled and actual_departure:
-            scheduled_dt = FlightDataProcessor._parse_time(departure_scheduled)
+        if departure_scheduled_dt and actual_departure:
             actual_dt = FlightDataProcessor._parse_time(actual_departure)
-            if scheduled_dt and actual_dt:
-                departure_delay = actual_dt - scheduled_dt
+            if actual_dt:
+                departure_delay = actual_dt - departure_scheduled_dt
                 result['departure_delay_minutes'] = departure_delay.total_seconds() / 60
         
         # Extract arrival information
@@ -489,31 +504,70 @@ class FlightDataProcessor:
     
     @staticmethod
     def _parse_time(time_str):
-        """Parse a time string to a datetime object, handling different formats."""
-        if not time_str:
-            return None
+        """Parse a time string to a datetime object (see app.models.timestamps)."""
+        return parse_time(time_str)
+    
+    @staticmethod
+    def _calculate_delay_statistics(delays):
+        """
+        Calculate statistics for a list of delays.
         
-        # Remove Z suffix if present
-        if time_str.endswith('Z'):
-            time_str = time_str[:-1]
+        Long lists (VECTORIZED_STATS_MIN_DELAYS or more) go through the NumPy
+        path when NumPy is installed; both paths return the same dict.
+        """
+        if NUMPY_AVAILABLE and len(delays) >= VECTORIZED_STATS_MIN_DELAYS:
+            return FlightDataProcessor._calculate_delay_statistics_vectorized(delays)
+        return FlightDataProcessor._calculate_delay_statistics_python(delays)
+    
+    @staticmethod
+    def _calculate_delay_statistics_vectorized(delays):
+        """
+        Calculate statistics for a sequence or array of delays with NumPy.
         
-        # Try different datetime formats
-        formats = [
-            "%Y-%m-%d %H:%M",  # 2025-01-01 07:55
-            "%Y-%m-%d %H:%M:%S"  # 2025-01-01 07:55:00
-        ]
+        Sorts once, then reads the median and the on-time/bucket boundaries
+        (15, 30 and 60 minutes) off the sorted array with a single searchsorted.
+        """
+        if len(delays) == 0:
+            return FlightDataProcessor._calculate_delay_statistics_python([])
         
-        for fmt in formats:
-            try:
-                return datetime.strptime(time_str, fmt)
-            except ValueError:
-                continue
+        values = np.asarray(delays, dtype=np.float64)
+        sorted_delays = np.sort(values)
+        count = len(values)
+        
+        # Exact sum, as in the Python path (np.sum adds pairwise and sum() is only
+        # compensated on Python 3.12+, so either can differ in the last bits)
+        avg_delay = math.fsum(values.tolist()) / count
         
-        return None
+        middle = count // 2
+        if count % 2 == 0:
+            med_delay = (float(sorted_delays[middle-1]) + float(sorted_delays[middle])) / 2
+        else:
+            med_delay = float(sorted_delays[middle])
+        
+        # Number of delays below 15, 30 and 60 minutes
+        below_15, below_30, below_60 = (int(index) for index in np.searchsorted(sorted_delays, (15, 30, 60), side="left"))
+        
+        on_time_pct = below_15 / count * 100
+        delayed_pct = 100 - on_time_pct
+        slight_delay_pct = (below_30 - below_15) / count * 100
+        moderate_delay_pct = (below_60 - below_30) / count * 100
+        severe_delay_pct = (count - below_60) / count * 100
+        
+        return {
+            "average_delay_minutes": round(avg_delay, 1),
+            "median_delay_minutes": round(med_delay, 1),
+            "on_time_percentage": round(on_time_pct, 1),
+            "delayed_percentage": round(delayed_pct, 1),
+            "delay_buckets": {
+                "slight_delay_15_30min": round(slight_delay_pct, 1),
+                "moderate_delay_30_60min": round(moderate_delay_pct, 1),
+                "severe_delay_60min_plus": round(severe_delay_pct, 1)
+            }
+        }
     
     @staticmethod
-    def _calculate_delay_statistics(delays):
-        """Calculate statistics for a list of delays."""
+    def _calculate_delay_statistics_python(delays):
+        """Calculate statistics for a list of delays in plain Python."""
         if not delays:
             return {
                 "average_delay_minutes": 0,
@@ -531,7 +585,7 @@ class FlightDataProcessor:
         sorted_delays = sorted(delays)
         
         # Average delay
-        avg_delay = sum(delays) / len(delays)
+        avg_delay = math.fsum(delays) / len(delays)
         
         # Median delay
         middle = len(sorted_delays) // 2
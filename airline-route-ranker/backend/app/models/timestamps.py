@@ -0,0 +1,114 @@
+"""
+Timestamp parsing for AeroDataBox flight records.
+
+AeroDataBox UTC times come as "YYYY-MM-DD HH:MM" with an optional "Z" (and
+occasionally seconds). Strings of exactly that shape are parsed with
+``datetime.fromisoformat`` instead of trying ``strptime`` formats one by one;
+anything else falls back to the original ``strptime`` formats, so the accepted
+inputs and results are unchanged. Parsed strings are memoized: a payload repeats
+the same scheduled times across its flight records.
+
+``parse_time_column`` converts a whole column of timestamps to epoch minutes at
+once (with NumPy when it is installed).
+"""
+import re
+import math
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Formats accepted when the string doesn't have the AeroDataBox shape
+TIME_FORMATS = (
+    "%Y-%m-%d %H:%M",  # 2025-01-01 07:55
+    "%Y-%m-%d %H:%M:%S"  # 2025-01-01 07:55:00
+)
+
+# Distinct time strings kept parsed
+PARSE_CACHE_SIZE = 16384
+
+_AERODATABOX_TIME = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}(?::[0-9]{2})?")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_time_cached(time_str):
+    """Parse a time string without its Z suffix (memoized)."""
+    if _AERODATABOX_TIME.fullmatch(time_str):
+        try:
+            return datetime.fromisoformat(time_str)
+        except ValueError:
+            # Right shape, impossible date or time (e.g. month 13)
+            return None
+
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(time_str, fmt)
+        except ValueError:
+            continue
+
+    return None
+
+
+def parse_time(time_str):
+    """
+    Parse an AeroDataBox time string to a naive datetime.
+
+    Args:
+        time_str: e.g. "2025-01-01 07:55Z" or "2025-01-01 07:55:00"
+
+    Returns:
+        datetime, or None if the string is empty or can't be parsed
+    """
+    if not time_str:
+        return None
+
+    # Remove Z suffix if present
+    if time_str.endswith('Z'):
+        time_str = time_str[:-1]
+
+    return _parse_time_cached(time_str)
+
+
+def parse_time_column(time_strs):
+    """
+    Parse a column of time strings to minutes since the Unix epoch.
+
+    Naive times are taken as UTC. When every string has the AeroDataBox shape
+    the column is converted by NumPy in one call; otherwise (or without NumPy)
+    each string goes through parse_time.
+
+    Args:
+        time_strs: Sequence of time strings (None or empty for missing values)
+
+    Returns:
+        Float epoch minutes (NaN where a value is missing or unparseable), as a
+        NumPy array when NumPy is installed, otherwise as a list
+    """
+    stripped = [time_str[:-1] if time_str and time_str.endswith('Z') else time_str for time_str in time_strs]
+
+    if NUMPY_AVAILABLE:
+        if all(time_str and _AERODATABOX_TIME.fullmatch(time_str) for time_str in stripped):
+            try:
+                seconds = np.array(stripped, dtype="datetime64[s]").astype(np.int64)
+                return seconds / 60
+            except ValueError:
+                # An impossible date or time; parse one by one to mark it NaN
+                pass
+        return np.fromiter((_epoch_minutes(time_str) for time_str in stripped), dtype=np.float64, count=len(stripped))
+
+    return [_epoch_minutes(time_str) for time_str in stripped]
+
+
+def _epoch_minutes(time_str):
+    """Return minutes since the Unix epoch for a time string, NaN if it can't be parsed."""
+    parsed = _parse_time_cached(time_str) if time_str else None
+    if parsed is None:
+        return math.nan
+    return (parsed - _EPOCH).total_seconds() / 60
+
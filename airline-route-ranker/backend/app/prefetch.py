@@ -0,0 +1,215 @@
+"""
+Background prefetch of popular routes.
+
+Routes are ranked by how often they were searched recently (user_search_history)
+and how many users saved them (user_saved_routes). On every run the most
+popular ones are ranked through the normal pipeline with a look-ahead window,
+so route searches and flight reliability data that would go stale before the
+next run are refreshed now instead of on a user's request. Each run stops once
+its upstream call budget is used up.
+
+Upstream calls are counted in the prefetch task's context. Work a route shares
+with a user request (an in-flight ranking it joins, or a refresh that request
+already started) runs in the other task and is not charged to the run, so the
+budget can be undercounted for such routes.
+"""
+import time
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils.config import (
+    PREFETCH_INTERVAL,
+    PREFETCH_MAX_ROUTES,
+    PREFETCH_CALL_BUDGET,
+    PREFETCH_LOOKBACK_DAYS,
+    PREFETCH_SAVED_ROUTE_WEIGHT,
+)
+from .utils.executor import run_blocking
+from .utils.http_client import count_upstream_calls
+from .utils.revalidation import revalidator, refresh_ahead, track_refreshes
+from .utils.supabase_client import get_route_popularity
+
+
+class PrefetchScheduler:
+    """Periodically refreshes the cached data of the most popular routes."""
+
+    def __init__(self,
+                 flight_system,
+                 interval: float = PREFETCH_INTERVAL,
+                 max_routes: int = PREFETCH_MAX_ROUTES,
+                 call_budget: int = PREFETCH_CALL_BUDGET,
+                 lookback_days: int = PREFETCH_LOOKBACK_DAYS,
+                 saved_route_weight: float = PREFETCH_SAVED_ROUTE_WEIGHT):
+        """
+        Initialize the scheduler.
+
+        Args:
+            flight_system: FlightAnalysisSystem used to rank the routes
+            interval: Seconds between runs (also the refresh look-ahead window)
+            max_routes: Most popular routes considered per run
+            call_budget: Upstream API calls allowed per run
+            lookback_days: Search history window used for popularity
+            saved_route_weight: How many searches a saved route counts as
+        """
+        self.flight_system = flight_system
+        self.interval = interval
+        self.max_routes = max_routes
+        self.call_budget = call_budget
+        self.lookback_days = lookback_days
+        self.saved_route_weight = saved_route_weight
+
+        self._task: Optional[asyncio.Task] = None
+        self._queue: List[Dict[str, Any]] = []
+        self._running = False
+        self._runs = 0
+        self._last_run: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        """Start the periodic background loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            print(f"🔁 Route prefetch scheduler started (every {self.interval:.0f}s, "
+                  f"budget {self.call_budget} upstream calls per run)")
+
+    async def stop(self) -> None:
+        """Stop the background loop."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        """Run a prefetch pass, then sleep until the next one."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ Route prefetch run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def rank_routes(self, popularity: Dict[Tuple[str, str], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Order routes by popularity score, most popular first.
+
+        The score is the number of recent searches plus ``saved_route_weight`` for
+        every save (favorites count twice).
+
+        Args:
+            popularity: Output of get_route_popularity
+
+        Returns:
+            list: Route entries with origin, destination, date and score
+        """
+        ranked = []
+        for (origin, destination), stats in popularity.items():
+            score = stats["searches"] + self.saved_route_weight * (stats["saved"] + stats["favorites"])
+            ranked.append({
+                "origin": origin,
+                "destination": destination,
+                "date": self._pick_date(stats["search_dates"]),
+                "score": score,
+            })
+        ranked.sort(key=lambda item: item["score"], reverse=True)
+        return ranked
+
+    @staticmethod
+    def _pick_date(search_dates: Dict[str, int]) -> Optional[str]:
+        """Pick the most searched travel date that hasn't passed yet (None means the default date)."""
+        today = date.today().isoformat()
+        upcoming = [(count, search_date) for search_date, count in search_dates.items() if search_date >= today]
+        if not upcoming:
+            return None
+        # Most searches first, earliest date on ties
+        return min(upcoming, key=lambda item: (-item[0], item[1]))[1]
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Run one prefetch pass.
+
+        Returns:
+            dict: Statistics of the run (also kept as the last-run stats)
+        """
+        if self._running:
+            return {"skipped": "a prefetch run is already in progress"}
+
+        self._running = True
+        started_at = time.time()
+        run = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "routes_considered": 0,
+            "routes_refreshed": 0,
+            "routes_skipped_budget": 0,
+            "errors": 0,
+            "upstream_calls": 0,
+            "call_budget": self.call_budget,
+        }
+
+        try:
+            since = (datetime.now(timezone.utc) - timedelta(days=self.lookback_days)).isoformat()
+            popularity = await run_blocking("storage", get_route_popularity, since)
+            if not popularity:
+                print("🔁 Route prefetch: no popularity data, nothing to do")
+                return run
+
+            self._queue = self.rank_routes(popularity)[:self.max_routes]
+            run["routes_considered"] = len(self._queue)
+            print(f"🔁 Route prefetch: refreshing up to {len(self._queue)} popular routes")
+
+            route_costs: List[int] = []
+            with count_upstream_calls() as counter, refresh_ahead(self.interval), track_refreshes() as refreshes:
+                while self._queue:
+                    item = self._queue[0]
+
+                    # Don't start a route that would likely overrun the budget
+                    estimated_cost = max(1, round(sum(route_costs) / len(route_costs))) if route_costs else 1
+                    if counter.calls + estimated_cost > self.call_budget:
+                        run["routes_skipped_budget"] = len(self._queue)
+                        print(f"🔁 Route prefetch: call budget reached, skipping {len(self._queue)} routes")
+                        break
+
+                    calls_before = counter.calls
+                    try:
+                        result = await self.flight_system.get_ranked_flights_for_route(
+                            item["origin"], item["destination"], item["date"]
+                        )
+                        # Wait for the refreshes this route started so they count against the budget
+                        await revalidator.drain(refreshes)
+                        if "error" in result:
+                            run["errors"] += 1
+                        else:
+                            run["routes_refreshed"] += 1
+                    except Exception as e:
+                        run["errors"] += 1
+                        print(f"⚠️ Route prefetch failed for {item['origin']}-{item['destination']}: {e}")
+
+                    refreshes.clear()
+                    # A route served from cache or by another request's work costs nothing
+                    # here and says nothing about what a route costs, so it is not sampled
+                    route_cost = counter.calls - calls_before
+                    if route_cost > 0:
+                        route_costs.append(route_cost)
+                    self._queue.pop(0)
+
+                run["upstream_calls"] = counter.calls
+        finally:
+            self._queue = []
+            self._running = False
+            self._runs += 1
+            run["duration_seconds"] = round(time.time() - started_at, 2)
+            self._last_run = run
+
+        print(f"🔁 Route prefetch done: {run['routes_refreshed']} routes refreshed with "
+              f"{run['upstream_calls']} upstream calls in {run['duration_seconds']}s")
+        return run
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the current queue and the statistics of the last run."""
+        return {
+            "running": self._running,
+            "runs": self._runs,
+            "interval": self.interval,
+            "call_budget": self.call_budget,
+            "queue": [dict(item) for item in self._queue],
+            "last_run": self._last_run,
+        }
@@ -0,0 +1,203 @@
+"""
+Per-upstream circuit breakers.
+
+When AeroDataBox or Amadeus degrade, every call would otherwise wait out its
+full timeout. Each upstream host gets a breaker that watches the outcome and
+latency of its recent calls:
+
+- closed: calls go through. Once enough calls have been seen, the breaker opens
+  if too many of them failed (transport errors and 5xx) or were slow.
+- open: calls fail immediately with CircuitOpenError for CIRCUIT_BREAKER_OPEN_SECONDS.
+- half-open: a few probe calls are let through. If they all succeed the breaker
+  closes again, a single failure opens it for another period.
+
+Breakers are per process; their state is exposed through /api/health.
+"""
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .config import (
+    CIRCUIT_BREAKER_WINDOW_SIZE,
+    CIRCUIT_BREAKER_WINDOW_SECONDS,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_OPEN_SECONDS,
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Number of state transitions kept for the health endpoint
+MAX_TRANSITIONS = 20
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the upstream's circuit is open."""
+
+
+class CircuitBreaker:
+    """A closed/open/half-open circuit breaker driven by error rate and latency."""
+
+    def __init__(self,
+                 name: str,
+                 window_size: int = CIRCUIT_BREAKER_WINDOW_SIZE,
+                 window_seconds: float = CIRCUIT_BREAKER_WINDOW_SECONDS,
+                 min_calls: int = CIRCUIT_BREAKER_MIN_CALLS,
+                 failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+                 slow_call_seconds: float = CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+                 slow_call_rate: float = CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                 open_seconds: float = CIRCUIT_BREAKER_OPEN_SECONDS,
+                 half_open_calls: int = CIRCUIT_BREAKER_HALF_OPEN_CALLS):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Breaker name (the upstream host)
+            window_size: Number of recent calls considered
+            window_seconds: Calls older than this are no longer considered
+            min_calls: Calls needed in the window before the breaker can open
+            failure_rate: Fraction of failed calls that opens the breaker
+            slow_call_seconds: Calls taking longer than this count as slow
+            slow_call_rate: Fraction of slow calls that opens the breaker
+            open_seconds: How long the breaker stays open before probing
+            half_open_calls: Successful probe calls needed to close again
+        """
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+
+        self.state = CLOSED
+        # (finished at, failed, slow) for the most recent calls
+        self._window: Deque[Tuple[float, bool, bool]] = deque(maxlen=max(1, window_size))
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=MAX_TRANSITIONS)
+        self._stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "times_opened": 0}
+
+    def _transition(self, state: str, reason: str) -> None:
+        """Move to a new state and remember the transition."""
+        previous = self.state
+        self.state = state
+        self._transitions.append({
+            "from": previous,
+            "to": state,
+            "reason": reason,
+            "at": datetime.now(timezone.utc).isoformat(),
+        })
+
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._stats["times_opened"] += 1
+            print(f"🔴 Circuit for {self.name} opened ({reason}), failing fast for {self.open_seconds:.0f}s")
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            print(f"🟡 Circuit for {self.name} half-open, probing the upstream")
+        else:
+            self._window.clear()
+            print(f"🟢 Circuit for {self.name} closed ({reason})")
+
+    def check(self) -> None:
+        """
+        Fail fast if a call would be rejected right now, without reserving a probe slot.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or all probe slots are taken
+        """
+        if self.state == OPEN and time.monotonic() < self._opened_at + self.open_seconds:
+            self.before_call()
+        elif self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_calls:
+            self.before_call()
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may be made now.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or all probe slots are taken
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.name}: circuit open, retrying the upstream in {remaining:.0f}s")
+            self._transition(HALF_OPEN, "open period elapsed")
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_calls:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.name}: circuit half-open, waiting for probe calls to finish")
+            self._probes_in_flight += 1
+
+    def record(self, success: Optional[bool], elapsed: float) -> None:
+        """
+        Record the outcome of a call allowed by before_call().
+
+        Args:
+            success: True/False for a successful/failed call, None if the call was
+                abandoned without an upstream verdict (e.g. cancelled)
+            elapsed: Call duration in seconds
+        """
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+        if success is None:
+            return
+
+        slow = elapsed > self.slow_call_seconds
+        self._stats["calls"] += 1
+        if not success:
+            self._stats["failures"] += 1
+        if slow:
+            self._stats["slow_calls"] += 1
+
+        if self.state == HALF_OPEN:
+            if not success or slow:
+                self._transition(OPEN, "probe call failed" if not success else f"probe call took {elapsed:.1f}s")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED, f"{self._probe_successes} probe calls succeeded")
+            return
+
+        if self.state == OPEN:
+            # A call started before the circuit opened; it doesn't change the state
+            return
+
+        now = time.monotonic()
+        self._window.append((now, not success, slow))
+        while self._window and self._window[0][0] < now - self.window_seconds:
+            self._window.popleft()
+
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for _, failed, _ in self._window if failed)
+        slow_calls = sum(1 for _, _, was_slow in self._window if was_slow)
+        if failures / calls >= self.failure_rate:
+            self._transition(OPEN, f"{failures}/{calls} recent calls failed")
+        elif slow_calls / calls >= self.slow_call_rate:
+            self._transition(OPEN, f"{slow_calls}/{calls} recent calls slower than {self.slow_call_seconds:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the current state, counters and recent transitions."""
+        stats: Dict[str, Any] = {"state": self.state, **self._stats}
+        stats["window_calls"] = len(self._window)
+        stats["window_failures"] = sum(1 for _, failed, _ in self._window if failed)
+        stats["window_slow_calls"] = sum(1 for _, _, slow in self._window if slow)
+        if self.state == OPEN:
+            stats["retry_in_seconds"] = round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+        stats["transitions"] = list(self._transitions)
+        return stats
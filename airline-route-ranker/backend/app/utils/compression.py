@@ -0,0 +1,142 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Ranking payloads are large and highly repetitive JSON. Complete (non-streaming)
+responses above COMPRESSION_MIN_SIZE bytes are compressed with brotli when the
+client accepts it and the brotli package is installed, otherwise with gzip.
+Streaming responses (SSE/NDJSON rankings) are passed through untouched so every
+event still reaches the client as soon as it is sent.
+
+A compressed response gets a weak ETag (the strong one describes the
+uncompressed body), which If-None-Match still matches.
+"""
+import gzip
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+from .config import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+# Only these content types are worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br", "gzip" or None if the client accepts neither
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    def quality_of(encoding: str) -> float:
+        return accepted.get(encoding, accepted.get("*", 0.0))
+
+    supported = (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+    best = max(supported, key=quality_of)
+    return best if quality_of(best) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with "br" or "gzip"."""
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses complete responses above a size threshold."""
+
+    def __init__(self, app: Callable[..., Awaitable[None]], minimum_size: int = COMPRESSION_MIN_SIZE):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application
+            minimum_size: Smallest body (bytes) that gets compressed
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def send_compressed(message: Dict[str, Any]) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers: List[Tuple[bytes, bytes]] = list(start_message.get("headers", []))
+            if message.get("more_body") or not self._should_compress(response_headers, body):
+                # Streaming or small response: send it as is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            new_headers = []
+            for name, value in response_headers:
+                lower = name.lower()
+                if lower == b"content-length":
+                    continue
+                if lower == b"etag" and not value.startswith(b"W/"):
+                    value = b"W/" + value
+                new_headers.append((name, value))
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers: List[Tuple[bytes, bytes]], body: bytes) -> bool:
+        """Return True for a large enough, compressible and not yet encoded body."""
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in headers:
+            lower = name.lower()
+            if lower == b"content-encoding":
+                return False
+            if lower == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").split(";")[0].strip() in COMPRESSIBLE_TYPES
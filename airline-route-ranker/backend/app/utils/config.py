@@ -2,6 +2,7 @@
 Application configuration settings
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -22,4 +23,98 @@ PAYPAL_MODE = os.getenv("PAYPAL_MODE", "sandbox")  # sandbox or live
 
 # URLs
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173").rstrip('/')
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000").rstrip('/') 
\ No newline at end of file
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000").rstrip('/')
+
+# Flight analysis configuration
+# Maximum number of AeroDataBox fetches (historical + recent) in flight at once.
+# Tune this against the upstream quota.
+FLIGHT_FETCH_CONCURRENCY = int(os.getenv("FLIGHT_FETCH_CONCURRENCY", "8"))
+# Time budget of a /api/rankings request in seconds (0 disables it); data still being
+# fetched at the deadline is reported as pending and finishes in the background
+RANKINGS_DEADLINE = float(os.getenv("RANKINGS_DEADLINE", "3"))
+BATCH_RANKINGS_MAX_QUERIES = int(os.getenv("BATCH_RANKINGS_MAX_QUERIES", "50"))  # Queries per /api/rankings/batch call
+DATE_RANGE_MAX_DAYS = int(os.getenv("DATE_RANGE_MAX_DAYS", "14"))  # Longest window for date-range rankings
+
+# Final-response cache of complete /api/rankings results (per worker, dropped when an
+# underlying route or flight entry is rewritten)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(10 * 60)))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))  # Cache-Control max-age sent to clients
+
+# Response compression (brotli if installed and accepted, otherwise gzip)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes; smaller bodies are sent as is
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Upstream HTTP client configuration (AeroDataBox, Amadeus)
+UPSTREAM_MAX_CONNECTIONS_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONNECTIONS_PER_HOST", "20"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))  # seconds
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))  # seconds
+UPSTREAM_DEFAULT_TIMEOUT = float(os.getenv("UPSTREAM_DEFAULT_TIMEOUT", "15"))  # seconds
+
+# Amadeus configuration
+AMADEUS_TOKEN_REFRESH_MARGIN = float(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN", "120"))  # seconds before expiry
+
+# Thread pools for blocking work (Supabase, payments, SMTP)
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "16"))
+PAYMENTS_POOL_SIZE = int(os.getenv("PAYMENTS_POOL_SIZE", "4"))
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+
+# Write-behind buffer for Supabase cache upserts
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))  # rows that trigger an early flush
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))  # seconds
+
+# In-process cache in front of Supabase (limits apply to each table's cache)
+MEMORY_CACHE_ENABLED = os.getenv("MEMORY_CACHE_ENABLED", "true").lower() == "true"
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "2000"))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 32 MB
+
+# Stale-while-revalidate: entries older than these are served and refreshed in the background
+ROUTE_FRESH_TTL = float(os.getenv("ROUTE_FRESH_TTL", str(24 * 60 * 60)))  # seconds
+HISTORICAL_FRESH_TTL = float(os.getenv("HISTORICAL_FRESH_TTL", str(7 * 24 * 60 * 60)))  # seconds
+RECENT_FRESH_TTL = float(os.getenv("RECENT_FRESH_TTL", str(24 * 60 * 60)))  # seconds
+SWR_EARLY_REFRESH_BETA = float(os.getenv("SWR_EARLY_REFRESH_BETA", "1.0"))  # 0 disables early refresh
+
+# Persisted derived statistics (score and delay summary per flight) are reused for this long
+DERIVED_STATS_TTL = float(os.getenv("DERIVED_STATS_TTL", str(min(HISTORICAL_FRESH_TTL, RECENT_FRESH_TTL))))  # seconds
+
+# Background prefetch of popular routes (enable on a single worker)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", str(60 * 60)))  # seconds between runs
+PREFETCH_MAX_ROUTES = int(os.getenv("PREFETCH_MAX_ROUTES", "20"))  # most popular routes considered per run
+PREFETCH_CALL_BUDGET = int(os.getenv("PREFETCH_CALL_BUDGET", "100"))  # upstream API calls allowed per run
+PREFETCH_LOOKBACK_DAYS = int(os.getenv("PREFETCH_LOOKBACK_DAYS", "7"))  # search history window
+PREFETCH_SAVED_ROUTE_WEIGHT = float(os.getenv("PREFETCH_SAVED_ROUTE_WEIGHT", "3"))  # a saved route counts as this many searches
+
+# Upstream rate limiting (token bucket shared by all workers on the host)
+AERODATABOX_RATE_PER_SECOND = float(os.getenv("AERODATABOX_RATE_PER_SECOND", "5"))
+AERODATABOX_BURST = float(os.getenv("AERODATABOX_BURST", "10"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))  # seconds a call may wait for a slot
+RATE_LIMIT_DEFAULT_RETRY_AFTER = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "30"))  # seconds, if a 429 has no Retry-After
+RATE_LIMIT_STATE_DIR = os.getenv("RATE_LIMIT_STATE_DIR", os.path.join(tempfile.gettempdir(), "airline-route-ranker"))
+
+# Negative cache entries (no data / upstream failures): base TTL per reason in seconds,
+# multiplied by NEGATIVE_CACHE_BACKOFF_FACTOR for each repeated failure
+NEGATIVE_TTL_NO_CONTENT = float(os.getenv("NEGATIVE_TTL_NO_CONTENT", str(12 * 60 * 60)))
+NEGATIVE_TTL_CLIENT_ERROR = float(os.getenv("NEGATIVE_TTL_CLIENT_ERROR", str(6 * 60 * 60)))
+NEGATIVE_TTL_SERVER_ERROR = float(os.getenv("NEGATIVE_TTL_SERVER_ERROR", str(5 * 60)))
+NEGATIVE_TTL_RATE_LIMITED = float(os.getenv("NEGATIVE_TTL_RATE_LIMITED", "60"))
+NEGATIVE_TTL_TIMEOUT = float(os.getenv("NEGATIVE_TTL_TIMEOUT", str(2 * 60)))
+NEGATIVE_TTL_PARSE_ERROR = float(os.getenv("NEGATIVE_TTL_PARSE_ERROR", str(30 * 60)))
+NEGATIVE_TTL_GENERAL_ERROR = float(os.getenv("NEGATIVE_TTL_GENERAL_ERROR", str(5 * 60)))
+NEGATIVE_CACHE_BACKOFF_FACTOR = float(os.getenv("NEGATIVE_CACHE_BACKOFF_FACTOR", "2"))
+NEGATIVE_CACHE_MAX_TTL = float(os.getenv("NEGATIVE_CACHE_MAX_TTL", str(7 * 24 * 60 * 60)))
+
+# Circuit breakers for upstream APIs (per host, per process)
+CIRCUIT_BREAKER_WINDOW_SIZE = int(os.getenv("CIRCUIT_BREAKER_WINDOW_SIZE", "20"))  # recent calls considered
+CIRCUIT_BREAKER_WINDOW_SECONDS = float(os.getenv("CIRCUIT_BREAKER_WINDOW_SECONDS", "60"))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5"))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "8"))
+CIRCUIT_BREAKER_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "2"))
@@ -0,0 +1,103 @@
+"""
+Request deadlines with background completion.
+
+A ranking request waits for its upstream and storage work only until its
+deadline. Work that is still running at that point is not cancelled: it keeps
+running in the background so its results still reach the cache, and the
+request answers with whatever has arrived.
+"""
+import time
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+# Unfinished work handed over to the background (referenced so it isn't garbage collected)
+_background_tasks: Set[asyncio.Task] = set()
+
+_stats = {
+    "deadlines_expired": 0,
+    "background_started": 0,
+    "background_completed": 0,
+    "background_failed": 0,
+}
+
+
+class Deadline:
+    """An absolute point in time by which a request must answer."""
+
+    def __init__(self, seconds: Optional[float]):
+        """
+        Start the deadline clock.
+
+        Args:
+            seconds: Time budget in seconds (None or <= 0 means no deadline)
+        """
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self._expires_at = time.monotonic() + self.seconds if self.seconds else None
+        self._reported = False
+
+    def remaining(self) -> Optional[float]:
+        """Return the seconds left (never negative), or None if there is no deadline."""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Return True once the deadline has passed."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    async def wait(self, tasks: Iterable[asyncio.Task], label: str = "request") -> Tuple[Set[asyncio.Task], Set[asyncio.Task]]:
+        """
+        Wait for tasks until they are all done or the deadline passes.
+
+        Tasks still running at the deadline keep running in the background.
+
+        Args:
+            tasks: Tasks to wait for
+            label: Description used in logs
+
+        Returns:
+            tuple: (done, pending) sets of tasks
+        """
+        tasks = set(tasks)
+        if not tasks:
+            return set(), set()
+
+        done, pending = await asyncio.wait(tasks, timeout=self.remaining())
+        if pending:
+            if not self._reported:
+                self._reported = True
+                _stats["deadlines_expired"] += 1
+            print(f"⏱️ Deadline of {self.seconds:.1f}s reached for {label}, "
+                  f"finishing {len(pending)} tasks in the background")
+            for task in pending:
+                finish_in_background(task)
+        return done, pending
+
+
+def finish_in_background(task: asyncio.Task) -> None:
+    """Keep a task running after its request answered, and log how it ends."""
+    if task in _background_tasks:
+        return
+    _background_tasks.add(task)
+    _stats["background_started"] += 1
+    task.add_done_callback(_background_done)
+
+
+def _background_done(task: asyncio.Task) -> None:
+    """Record the outcome of a background task and drop the reference to it."""
+    _background_tasks.discard(task)
+    if task.cancelled():
+        _stats["background_failed"] += 1
+        return
+    error = task.exception()
+    if error is not None:
+        _stats["background_failed"] += 1
+        print(f"⚠️ Background completion failed: {error}")
+    else:
+        _stats["background_completed"] += 1
+
+
+def get_deadline_stats() -> Dict[str, Any]:
+    """Return deadline and background completion counters."""
+    return {**_stats, "background_in_flight": len(_background_tasks)}
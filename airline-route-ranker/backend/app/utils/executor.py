@@ -0,0 +1,140 @@
+"""
+Bounded, named thread pools for blocking work called from async handlers.
+
+Supabase (supabase-py), Stripe, PayPal bookkeeping and SMTP are synchronous
+libraries. Calling them directly inside an ``async def`` handler freezes the
+whole worker, so they run on dedicated pools instead. Each area of the app
+gets its own pool, which means a backlog of ranking storage calls can never
+delay a payment webhook, and the event loop stays free for health checks.
+"""
+import time
+import asyncio
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from .config import STORAGE_POOL_SIZE, PAYMENTS_POOL_SIZE, EMAIL_POOL_SIZE
+
+T = TypeVar("T")
+
+
+class BlockingPool:
+    """A bounded thread pool that records how long work waits in its queue."""
+    
+    def __init__(self, name: str, max_workers: int):
+        """
+        Initialize the pool.
+        
+        Args:
+            name: Pool name (also used as the worker thread name prefix)
+            max_workers: Maximum number of worker threads
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "queued": 0,
+            "active": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+    
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking function on this pool and await its result.
+        
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+            
+        Returns:
+            The return value of func
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        submitted_at = time.perf_counter()
+        
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+        
+        def tracked_call():
+            wait_ms = (time.perf_counter() - submitted_at) * 1000
+            with self._lock:
+                self._stats["queued"] -= 1
+                self._stats["active"] += 1
+                self._stats["total_wait_ms"] += wait_ms
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            
+            succeeded = False
+            try:
+                result = context.run(functools.partial(func, *args, **kwargs))
+                succeeded = True
+                return result
+            finally:
+                with self._lock:
+                    self._stats["active"] -= 1
+                    self._stats["completed" if succeeded else "failed"] += 1
+        
+        return await loop.run_in_executor(self._executor, tracked_call)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pool size, queue depth and queue wait statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+        
+        started = stats["completed"] + stats["failed"] + stats["active"]
+        stats["avg_wait_ms"] = round(stats["total_wait_ms"] / started, 2) if started else 0.0
+        stats["total_wait_ms"] = round(stats["total_wait_ms"], 2)
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 2)
+        stats["max_workers"] = self.max_workers
+        return stats
+    
+    def shutdown(self) -> None:
+        """Wait for queued work to finish and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+
+# Named pools:
+#   storage  - Supabase reads/writes on the ranking and flight paths
+#   payments - Stripe, PayPal bookkeeping and credit updates
+#   email    - SMTP delivery for the contact form
+_pools: Dict[str, BlockingPool] = {
+    "storage": BlockingPool("storage", STORAGE_POOL_SIZE),
+    "payments": BlockingPool("payments", PAYMENTS_POOL_SIZE),
+    "email": BlockingPool("email", EMAIL_POOL_SIZE),
+}
+
+
+async def run_blocking(pool: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on one of the named pools.
+    
+    Args:
+        pool: Pool name ("storage", "payments" or "email")
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        The return value of func
+    """
+    return await _pools[pool].run(func, *args, **kwargs)
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Return statistics for every named pool."""
+    return {name: pool.get_stats() for name, pool in _pools.items()}
+
+
+def shutdown_pools() -> None:
+    """Shut down all named pools (called on application shutdown)."""
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,207 @@
+"""
+Shared async HTTP client layer for upstream APIs (AeroDataBox, Amadeus).
+
+One pooled httpx.AsyncClient is kept per upstream host, so DNS, TCP and TLS
+setup are paid once per connection instead of once per call, and upstream
+calls never block the event loop. Hosts with a rate limiter (AeroDataBox) take
+a token before each call and pause for Retry-After when they answer 429.
+Every host also has a circuit breaker, so a degraded upstream fails fast
+instead of making each call wait out its timeout.
+"""
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import (
+    UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_DEFAULT_TIMEOUT,
+    AERODATABOX_RATE_PER_SECOND,
+    AERODATABOX_BURST,
+    RATE_LIMIT_MAX_WAIT,
+)
+from .rate_limiter import SharedTokenBucket, parse_retry_after
+from .circuit_breaker import CircuitBreaker
+
+# HTTP/2 is only available when the optional "h2" package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# Pooled clients keyed by upstream host (so the pool limits apply per host)
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+# Number of requests sent to each upstream host
+_request_counts: Dict[str, int] = {}
+
+# Rate limiters keyed by upstream host
+_rate_limiters: Dict[str, SharedTokenBucket] = {
+    "aerodatabox.p.rapidapi.com": SharedTokenBucket("aerodatabox", AERODATABOX_RATE_PER_SECOND, AERODATABOX_BURST),
+}
+
+# Circuit breakers keyed by upstream host (created on first use)
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+class UpstreamCallCounter:
+    """Counts the upstream requests made inside a count_upstream_calls() block."""
+    
+    def __init__(self):
+        self.calls = 0
+
+
+_call_counter: contextvars.ContextVar = contextvars.ContextVar("upstream_call_counter", default=None)
+
+
+@contextmanager
+def count_upstream_calls() -> Iterator[UpstreamCallCounter]:
+    """
+    Count the upstream requests made by the current task (and tasks it starts).
+    
+    Yields:
+        An UpstreamCallCounter whose ``calls`` attribute grows with each request
+    """
+    counter = UpstreamCallCounter()
+    token = _call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _call_counter.reset(token)
+
+
+def get_upstream_client(url: str) -> httpx.AsyncClient:
+    """
+    Get the shared client for the host of the given URL, creating it on first use.
+    
+    Args:
+        url: Any URL on the upstream host
+        
+    Returns:
+        The pooled AsyncClient for that host
+    """
+    host = urlsplit(url).netloc
+    client = _clients.get(host)
+    
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(UPSTREAM_DEFAULT_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        )
+        _clients[host] = client
+        print(f"🔌 Created pooled upstream client for {host} (HTTP/2: {HTTP2_ENABLED})")
+    
+    return client
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """Get the circuit breaker for an upstream host, creating it on first use."""
+    breaker = _circuit_breakers.get(host)
+    if breaker is None:
+        breaker = CircuitBreaker(host)
+        _circuit_breakers[host] = breaker
+    return breaker
+
+
+async def upstream_request(method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+    """
+    Send a request to an upstream API through the shared connection pool.
+    
+    For rate limited hosts the call first waits (up to RATE_LIMIT_MAX_WAIT seconds)
+    for a token. A 429 pauses the host's bucket for Retry-After and, if that fits
+    in the remaining wait, the call is retried once. Transport errors, 5xx
+    responses and slow calls are recorded by the host's circuit breaker; while it
+    is open, calls fail immediately.
+    
+    Args:
+        method: HTTP method (e.g. "GET", "POST")
+        url: Full request URL
+        timeout: Per-call timeout in seconds (client default if omitted)
+        **kwargs: Extra arguments passed to httpx (headers, json, data, ...)
+        
+    Returns:
+        The httpx response (status is not checked here)
+        
+    Raises:
+        RateLimitExceeded: If no call slot became available in time
+        CircuitOpenError: If the host's circuit breaker is open
+    """
+    client = get_upstream_client(url)
+    host = urlsplit(url).netloc
+    limiter = _rate_limiters.get(host)
+    breaker = get_circuit_breaker(host)
+    deadline = time.monotonic() + RATE_LIMIT_MAX_WAIT
+    
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    
+    retried = False
+    while True:
+        # Don't wait for a token if the call would be rejected anyway
+        if limiter is not None:
+            breaker.check()
+            await limiter.acquire(max(0.0, deadline - time.monotonic()))
+        breaker.before_call()
+        
+        _request_counts[host] = _request_counts.get(host, 0) + 1
+        counter = _call_counter.get()
+        if counter is not None:
+            counter.calls += 1
+        
+        started = time.monotonic()
+        success = None
+        try:
+            response = await client.request(method, url, **kwargs)
+            # Rate limits (429) are handled by the limiter, not counted as failures
+            success = response.status_code < 500
+        except httpx.TransportError:
+            success = False
+            raise
+        finally:
+            breaker.record(success, time.monotonic() - started)
+        
+        if response.status_code != 429 or limiter is None:
+            return response
+        
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        await limiter.pause(retry_after)
+        if retried or time.monotonic() + retry_after > deadline:
+            return response
+        retried = True
+
+
+async def close_upstream_clients() -> None:
+    """Close all pooled upstream clients (called on application shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+def get_upstream_client_stats() -> Dict[str, Any]:
+    """Return basic information about the pooled upstream clients."""
+    return {
+        "http2_enabled": HTTP2_ENABLED,
+        "max_connections_per_host": UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+        "hosts": sorted(_clients.keys()),
+        "requests": dict(_request_counts),
+        "rate_limits": {host: limiter.get_stats() for host, limiter in _rate_limiters.items()},
+        "circuit_breakers": get_circuit_breaker_stats(),
+    }
+
+
+def get_circuit_breaker_stats() -> Dict[str, Any]:
+    """Return the state and recent transitions of every upstream circuit breaker."""
+    return {host: breaker.get_stats() for host, breaker in _circuit_breakers.items()}
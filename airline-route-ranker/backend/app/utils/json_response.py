@@ -0,0 +1,76 @@
+"""
+Fast JSON serialization for API responses.
+
+FastAPI's default path runs every response through ``jsonable_encoder`` and then
+the stdlib ``json`` module, walking large ranking and flight payloads twice in
+Python. When orjson is installed, responses are serialized by it directly
+(dates, datetimes and dict keys that aren't strings included). Without orjson
+the stdlib path is used and NaN/Infinity are written as null like orjson does,
+so the output is the same either way.
+
+Endpoints that return ``FastJSONResponse`` (or bytes from ``dumps_json``)
+skip ``jsonable_encoder`` entirely.
+"""
+import json
+import math
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _encode_fallback(value: Any) -> Any:
+    """Convert values orjson doesn't handle natively (sets, Decimals, pydantic models, ...)."""
+    return jsonable_encoder(value)
+
+
+def _replace_non_finite(value: Any) -> Any:
+    """Replace NaN and infinite floats with None, as orjson serializes them."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace_non_finite(item) for item in value]
+    return value
+
+
+def _dumps_stdlib(content: Any) -> str:
+    """Serialize jsonable_encoder output compactly, refusing NaN/Infinity."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def dumps_json(content: Any) -> bytes:
+    """
+    Serialize a response payload to compact UTF-8 JSON.
+
+    Args:
+        content: JSON-like payload (dicts, lists, scalars, dates)
+
+    Returns:
+        The serialized payload
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_encode_fallback, option=_ORJSON_OPTIONS)
+    encoded = jsonable_encoder(content)
+    try:
+        return _dumps_stdlib(encoded).encode("utf-8")
+    except ValueError:
+        # Non-finite floats are rare, so only walk the payload when one is present
+        return _dumps_stdlib(_replace_non_finite(encoded)).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """A JSONResponse rendered with orjson when it is available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
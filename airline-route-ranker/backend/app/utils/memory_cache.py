@@ -0,0 +1,143 @@
+"""
+In-process TTL/LRU cache used in front of Supabase.
+
+Route, historical and recent flight data change at most weekly, so each worker
+keeps a bounded copy of what it has already read or written and only goes to
+Supabase on a miss. Entries expire after a per-table TTL and the least recently
+used ones are evicted once the entry or byte limit is reached.
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the memory footprint of a JSON-like value in bytes (its serialized length)."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class TTLCache:
+    """A thread-safe LRU cache with a TTL and limits on entries and bytes."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Cache name (used in stats)
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum number of entries
+            max_bytes: Maximum estimated size of all entries in bytes
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "sets": 0,
+            "rejected": 0,
+        }
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries if the cache is full.
+
+        Args:
+            key: Cache key
+            value: Value to cache (None is not cached)
+            ttl: Optional TTL override in seconds
+        """
+        if value is None:
+            return
+
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            if size > self.max_bytes:
+                # Never let a single oversized value flush the whole cache
+                self._stats["rejected"] += 1
+                return
+
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            self._stats["sets"] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats["evictions"] += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry (caller holds the lock)."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["ttl"] = self.ttl
+        stats["max_entries"] = self.max_entries
+        stats["max_bytes"] = self.max_bytes
+        return stats
@@ -0,0 +1,214 @@
+"""
+Time-bounded negative cache entries for failed or empty upstream lookups.
+
+When AeroDataBox has no data for a flight, or a call fails, an
+``{"empty": True, "reason": ...}`` marker is cached so the next request does not
+repeat the call straight away. Each marker now carries its own expiry: a
+reason-specific base TTL that doubles (by NEGATIVE_CACHE_BACKOFF_FACTOR) with
+each consecutive failure for the same entry, capped at NEGATIVE_CACHE_MAX_TTL.
+An expired marker is treated as a cache miss, so a transient timeout no longer
+hides a flight's data for the whole 35-day cache lifetime.
+
+Lookups answered by a negative entry, or by nothing because the upstream call was
+skipped, are also collected inside track_unavailable_data(), so results built
+from them are not cached for longer than those answers hold.
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+
+from .config import (
+    NEGATIVE_TTL_NO_CONTENT,
+    NEGATIVE_TTL_CLIENT_ERROR,
+    NEGATIVE_TTL_SERVER_ERROR,
+    NEGATIVE_TTL_RATE_LIMITED,
+    NEGATIVE_TTL_TIMEOUT,
+    NEGATIVE_TTL_PARSE_ERROR,
+    NEGATIVE_TTL_GENERAL_ERROR,
+    NEGATIVE_CACHE_BACKOFF_FACTOR,
+    NEGATIVE_CACHE_MAX_TTL,
+)
+from .revalidation import is_revalidating
+
+# Base TTL (seconds) of a negative entry, by reason
+NEGATIVE_TTLS = {
+    "no_content": NEGATIVE_TTL_NO_CONTENT,        # 204 or empty list: the flight has no data
+    "client_error": NEGATIVE_TTL_CLIENT_ERROR,    # other 4xx, e.g. unknown flight number
+    "server_error": NEGATIVE_TTL_SERVER_ERROR,    # 5xx
+    "rate_limited": NEGATIVE_TTL_RATE_LIMITED,    # 429
+    "timeout": NEGATIVE_TTL_TIMEOUT,              # connect/read timeouts
+    "parse_error": NEGATIVE_TTL_PARSE_ERROR,      # invalid JSON
+    "general_error": NEGATIVE_TTL_GENERAL_ERROR,  # anything else
+}
+
+# Reasons written by older versions (which had no expiry), mapped to current ones
+LEGACY_REASONS = {
+    "204_No_Content": "no_content",
+    "http_error": "server_error",
+    "json_decode_error": "parse_error",
+}
+
+
+def is_negative(data: Any) -> bool:
+    """Return True if cached data is a negative (empty/error) marker."""
+    return isinstance(data, dict) and data.get("empty") is True
+
+
+def _reason_of(entry: Dict[str, Any]) -> str:
+    """Return the current reason name of a negative entry."""
+    reason = entry.get("reason", "general_error")
+    return LEGACY_REASONS.get(reason, reason if reason in NEGATIVE_TTLS else "general_error")
+
+
+def expires_at(entry: Dict[str, Any]) -> float:
+    """Return when a negative entry expires (legacy entries get their reason's base TTL)."""
+    if "expires_at" in entry:
+        return entry["expires_at"]
+    return entry.get("cached_at", 0) + NEGATIVE_TTLS[_reason_of(entry)]
+
+
+def is_expired(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """Return True if a negative entry should be treated as a cache miss."""
+    return (time.time() if now is None else now) >= expires_at(entry)
+
+
+def reason_for_exception(error: Exception) -> str:
+    """Classify an upstream exception as a negative cache reason."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status == 429:
+            return "rate_limited"
+        if status >= 500:
+            return "server_error"
+        return "client_error"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, ValueError):
+        # json.JSONDecodeError is a ValueError
+        return "parse_error"
+    return "general_error"
+
+
+# Inside track_unavailable_data(), lookups answered without upstream data are collected here
+_unavailable_data: contextvars.ContextVar = contextvars.ContextVar("unavailable_data", default=None)
+
+
+@contextmanager
+def track_unavailable_data() -> Iterator[Dict[str, float]]:
+    """
+    Collect the lookups of the current task (and tasks it starts) that got no upstream data.
+
+    Yields:
+        A dict mapping "<kind>:<flight>" to the time (epoch seconds) until which
+        that answer holds: the negative entry's expiry, or the time of a skipped call
+    """
+    collected: Dict[str, float] = {}
+    token = _unavailable_data.set(collected)
+    try:
+        yield collected
+    finally:
+        _unavailable_data.reset(token)
+
+
+def note_unavailable_data(kind: str, flight_number: str, entry: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Record a lookup answered by a negative entry, or skipped (entry None), in the current tracking block.
+
+    Args:
+        kind: "historical" or "recent"
+        flight_number: Flight number of the lookup
+        entry: The negative entry served or written, None if the upstream call was skipped
+    """
+    collected = _unavailable_data.get()
+    # A background refresh doesn't change the data the tracked result was built from
+    if collected is None or is_revalidating():
+        return
+    until = expires_at(entry) if entry is not None else time.time()
+    key = f"{kind}:{flight_number}"
+    collected[key] = min(until, collected.get(key, until))
+
+
+def make_negative_entry(flight_number: str,
+                        reason: str,
+                        message: str,
+                        previous: Optional[Dict[str, Any]] = None,
+                        error: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a negative cache entry with a TTL that grows with repeated failures.
+
+    Args:
+        flight_number: Flight number the entry is for
+        reason: One of NEGATIVE_TTLS
+        message: Human readable explanation
+        previous: The expired negative entry this one replaces, if any
+        error: Optional error text
+
+    Returns:
+        dict: The negative entry
+    """
+    failures = 1
+    if previous is not None and is_negative(previous) and _reason_of(previous) == reason:
+        failures = previous.get("failures", 1) + 1
+
+    ttl = min(NEGATIVE_TTLS[reason] * NEGATIVE_CACHE_BACKOFF_FACTOR ** (failures - 1), NEGATIVE_CACHE_MAX_TTL)
+    now = time.time()
+    entry = {
+        "empty": True,
+        "flight_number": flight_number,
+        "cached_at": now,
+        "expires_at": now + ttl,
+        "ttl": ttl,
+        "failures": failures,
+        "reason": reason,
+        "message": message,
+    }
+    if error is not None:
+        entry["error"] = error
+
+    return entry
+
+
+class NegativeCacheStats:
+    """Process-wide counters of negative cache entries, by reason."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {"written": {}, "served": {}, "expired": {}}
+
+    def record(self, event: str, reason: str) -> None:
+        """Count a negative entry event ("written", "served" or "expired")."""
+        with self._lock:
+            counts = self._counts[event]
+            counts[reason] = counts.get(reason, 0) + 1
+
+    def record_write(self, entry: Dict[str, Any]) -> None:
+        """Count a negative entry being saved to the cache."""
+        self.record("written", _reason_of(entry))
+
+    def record_lookup(self, entry: Dict[str, Any]) -> bool:
+        """
+        Count a lookup that found a negative entry.
+
+        Returns:
+            True if the entry is still valid, False if it expired
+        """
+        expired = is_expired(entry)
+        self.record("expired" if expired else "served", _reason_of(entry))
+        return not expired
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the counters plus the configured base TTLs."""
+        with self._lock:
+            stats = {event: dict(counts) for event, counts in self._counts.items()}
+        for event in list(stats):
+            stats[f"{event}_total"] = sum(stats[event].values())
+        stats["base_ttls"] = dict(NEGATIVE_TTLS)
+        stats["max_ttl"] = NEGATIVE_CACHE_MAX_TTL
+        return stats
+
+
+negative_cache_stats = NegativeCacheStats()
@@ -26,7 +26,7 @@ def get_db_client():
         print("⚠️ Warning: Using regular client for operations that may require admin privileges")
         return supabase
 
-async def create_payment_link(
+def create_payment_link(
     package_id: str, 
     user_id: str,
     success_url: Optional[str] = None,
@@ -48,7 +48,7 @@ async def create_payment_link(
     db = get_db_client()
     
     # Get the package details from Supabase
-    package_data = await get_package_details(package_id)
+    package_data = get_package_details(package_id)
     
     if not package_data:
         raise ValueError(f"Package with ID {package_id} not found")
@@ -101,7 +101,7 @@ async def create_payment_link(
         "metadata": metadata
     }
 
-async def get_package_details(package_id: str) -> Dict[str, Any]:
+def get_package_details(package_id: str) -> Dict[str, Any]:
     """
     Get credit package details from Supabase.
     
@@ -122,7 +122,7 @@ async def get_package_details(package_id: str) -> Dict[str, Any]:
         
     return response.data[0]
 
-async def handle_webhook_event(payload: Dict[str, Any], signature: str) -> Dict[str, Any]:
+def handle_webhook_event(payload: Dict[str, Any], signature: str) -> Dict[str, Any]:
     """
     Process a Stripe webhook event.
     
@@ -181,7 +181,7 @@ async def handle_webhook_event(payload: Dict[str, Any], signature: str) -> Dict[
                     print(f"🔍 Found client_reference_id: {client_reference_id}")
             
             # Process the successful payment
-            await process_successful_payment(session)
+            process_successful_payment(session)
             
             return {"status": "success", "message": "Payment processed successfully"}
             
@@ -198,7 +198,7 @@ async def handle_webhook_event(payload: Dict[str, Any], signature: str) -> Dict[
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
-async def process_successful_payment(session: Dict[str, Any]) -> None:
+def process_successful_payment(session: Dict[str, Any]) -> None:
     """
     Process a successful payment from a completed checkout session.
     
@@ -356,4 +356,104 @@ async def process_successful_payment(session: Dict[str, Any]) -> None:
         print(f"❌ Error processing payment: {e}")
         import traceback
         traceback.print_exc()
-        raise 
\ No newline at end of file
+        raise 
+
+def confirm_manual_payment(user_id: str, session_id: str, credits: int) -> Dict[str, Any]:
+    """
+    Manually record a successful payment and add its credits.
+    
+    Used as a fallback if webhooks aren't triggering proper credit updates.
+    
+    Args:
+        user_id: User ID to update credits for
+        session_id: Stripe session ID from the successful payment
+        credits: Number of credits to add
+        
+    Returns:
+        dict: Processing result
+    """
+    try:
+        # Get admin client for database operations
+        db = get_db_client()
+        
+        print(f"🚨 MANUAL PAYMENT CONFIRMATION: User {user_id}, Session {session_id}, Credits {credits}")
+        
+        # 1. Check if payment was already processed
+        payment_result = db.table('user_payment_transactions').select('*').eq('provider_transaction_id', session_id).execute()
+        
+        if payment_result.data and len(payment_result.data) > 0:
+            # Payment already processed
+            return {
+                "status": "already_processed",
+                "message": "This payment was already processed",
+                "payment": payment_result.data[0]
+            }
+        
+        # 2. Get current credits
+        profile_result = db.table('user_profiles').select('credits, total_credits_purchased').eq('id', user_id).execute()
+        
+        if not profile_result.data or len(profile_result.data) == 0:
+            return {"status": "error", "message": f"User not found: {user_id}"}
+        
+        profile = profile_result.data[0]
+        current_credits = profile.get('credits', 0)
+        total_purchased = profile.get('total_credits_purchased', 0)
+        
+        print(f"💰 Current credits: {current_credits}, Adding: {credits}")
+        
+        # 3. Insert payment record
+        payment_data = {
+            'user_id': user_id,
+            'amount': credits * 0.40,  # Approximate dollar value
+            'currency': 'USD',
+            'status': 'completed',
+            'provider': 'stripe',
+            'provider_transaction_id': session_id,
+            'credits_purchased': credits,
+            'package_name': 'Manual confirmation'
+        }
+        
+        payment_result = db.table('user_payment_transactions').insert(payment_data).execute()
+        
+        if not payment_result.data:
+            return {"status": "error", "message": "Failed to record payment transaction"}
+            
+        payment_id = payment_result.data[0]['id']
+        
+        # 4. Insert credit transaction
+        credit_data = {
+            'user_id': user_id,
+            'amount': credits,
+            'transaction_type': 'purchase',
+            'description': f"Purchased {credits} credits (manual confirmation)",
+            'payment_id': payment_id
+        }
+        
+        credit_result = db.table('user_credit_transactions').insert(credit_data).execute()
+        
+        if not credit_result.data:
+            return {"status": "error", "message": "Failed to record credit transaction"}
+        
+        # 5. Update user's credit balance
+        update_data = {
+            'credits': current_credits + credits,
+            'total_credits_purchased': total_purchased + credits
+        }
+        
+        update_result = db.table('user_profiles').update(update_data).eq('id', user_id).execute()
+        
+        if not update_result.data:
+            return {"status": "error", "message": "Failed to update credit balance"}
+            
+        return {
+            "status": "success", 
+            "message": f"Manually added {credits} credits to user {user_id}",
+            "previous_credits": current_credits,
+            "new_credits": current_credits + credits
+        }
+        
+    except Exception as e:
+        print(f"🔧 MANUAL CONFIRMATION ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return {"status": "error", "message": str(e)}
@@ -19,7 +19,7 @@ def get_db_client():
         print("⚠️ Warning: Using regular client for operations that may require admin privileges")
         return supabase
 
-async def create_paypal_payment_link(
+def create_paypal_payment_link(
     package_id: str,
     user_id: str,
     success_url: Optional[str] = None,
@@ -129,7 +129,7 @@ async def create_paypal_payment_link(
         }
     }
 
-async def process_paypal_successful_payment(data: Dict[str, Any]) -> Dict[str, Any]:
+def process_paypal_successful_payment(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Process a successful PayPal payment.
     
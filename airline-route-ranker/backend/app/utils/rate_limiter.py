@@ -0,0 +1,234 @@
+"""
+Token-bucket rate limiting for upstream APIs, shared by all workers on a host.
+
+The bucket state (available tokens, last refill time and a "blocked until" time
+set from Retry-After) lives in a small file under RATE_LIMIT_STATE_DIR and is
+updated under an exclusive fcntl lock. Every uvicorn worker on the host therefore
+draws from the same budget. Callers wait for a token for a bounded time instead of
+giving up immediately, and a 429 only pauses the bucket for as long as the
+upstream asked. Async callers don't block the event loop on the lock: while
+another worker holds it they sleep briefly and try again.
+
+On platforms without fcntl (Windows development machines) the bucket falls back
+to per-process state.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+    FILE_LOCKING_AVAILABLE = True
+except ImportError:
+    FILE_LOCKING_AVAILABLE = False
+
+from .config import RATE_LIMIT_STATE_DIR, RATE_LIMIT_DEFAULT_RETRY_AFTER
+
+# Seconds an async caller sleeps before retrying a lock held by another worker
+LOCK_RETRY_INTERVAL = 0.002
+
+# Returned by _update when the lock was busy and blocking=False
+_LOCK_BUSY = object()
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no upstream call slot became available within the allowed wait."""
+
+
+def parse_retry_after(value: Optional[str], default: float = RATE_LIMIT_DEFAULT_RETRY_AFTER) -> float:
+    """
+    Parse a Retry-After header (delay in seconds or an HTTP date).
+
+    Args:
+        value: Header value, or None if the header was missing
+        default: Delay to use when the header is missing or invalid
+
+    Returns:
+        Delay in seconds
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class SharedTokenBucket:
+    """A token bucket whose state is shared between processes through a locked file."""
+
+    def __init__(self, name: str, rate: float, capacity: float, state_dir: str = RATE_LIMIT_STATE_DIR):
+        """
+        Initialize the bucket.
+
+        Args:
+            name: Bucket name (also the state file name)
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+            state_dir: Directory for the shared state file
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.path = os.path.join(state_dir, f"{name}.bucket")
+        self._local_state = {"tokens": capacity, "updated": time.time(), "blocked_until": 0.0}
+        self._lock = threading.Lock()
+        self._shared = FILE_LOCKING_AVAILABLE
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "total_wait_ms": 0.0,
+            "timeouts": 0,
+            "retry_after_pauses": 0,
+        }
+
+        if self._shared:
+            try:
+                os.makedirs(state_dir, exist_ok=True)
+            except OSError as e:
+                print(f"⚠️ Warning: Cannot create rate limit state directory {state_dir} ({e}), using per-process limits")
+                self._shared = False
+
+    def _update(self, mutate, blocking: bool = True) -> Any:
+        """
+        Apply mutate(state, now) to the bucket state under the (cross-process) lock.
+
+        Args:
+            mutate: Function changing the state in place; its result is returned
+            blocking: If False, return _LOCK_BUSY instead of waiting for the lock
+        """
+        if not self._lock.acquire(blocking=blocking):
+            return _LOCK_BUSY
+        try:
+            if not self._shared:
+                return mutate(self._local_state, time.time())
+
+            with open(self.path, "a+") as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return _LOCK_BUSY
+                try:
+                    handle.seek(0)
+                    raw = handle.read()
+                    try:
+                        state = json.loads(raw) if raw else None
+                    except ValueError:
+                        state = None
+                    if not state:
+                        state = {"tokens": self.capacity, "updated": time.time(), "blocked_until": 0.0}
+
+                    result = mutate(state, time.time())
+
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.write(json.dumps(state))
+                    handle.flush()
+                    return result
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    async def _update_async(self, mutate) -> Any:
+        """Like _update, but sleeps instead of blocking the event loop while the lock is held."""
+        while True:
+            result = self._update(mutate, blocking=False)
+            if result is not _LOCK_BUSY:
+                return result
+            await asyncio.sleep(LOCK_RETRY_INTERVAL)
+
+    def _refill(self, state: Dict[str, float], now: float) -> None:
+        """Add the tokens earned since the last update."""
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(self.capacity, state["tokens"] + elapsed * self.rate)
+        state["updated"] = now
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise the number of seconds to wait before retrying
+        """
+        return self._update(self._take)
+
+    def _take(self, state: Dict[str, float], now: float) -> float:
+        """Take a token from the state, or return the seconds until one is available."""
+        self._refill(state, now)
+        if now < state["blocked_until"]:
+            return state["blocked_until"] - now
+        if state["tokens"] >= 1:
+            state["tokens"] -= 1
+            return 0.0
+        return (1 - state["tokens"]) / self.rate
+
+    async def acquire(self, max_wait: float) -> None:
+        """
+        Wait (up to max_wait seconds) for a token.
+
+        Args:
+            max_wait: Maximum seconds to wait
+
+        Raises:
+            RateLimitExceeded: If no token became available in time
+        """
+        started = time.monotonic()
+        waited = False
+        while True:
+            wait = await self._update_async(self._take)
+            elapsed = time.monotonic() - started
+            if wait <= 0:
+                self._stats["acquired"] += 1
+                if waited:
+                    self._stats["waited"] += 1
+                    self._stats["total_wait_ms"] += elapsed * 1000
+                return
+            if elapsed + wait > max_wait:
+                self._stats["timeouts"] += 1
+                raise RateLimitExceeded(
+                    f"{self.name}: no upstream call slot available within {max_wait:.0f}s (next in {wait:.1f}s)"
+                )
+            waited = True
+            await asyncio.sleep(wait)
+
+    async def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while (after a 429 with Retry-After).
+
+        Args:
+            seconds: Pause duration in seconds
+        """
+        def block(state, now):
+            self._refill(state, now)
+            state["blocked_until"] = max(state["blocked_until"], now + seconds)
+            state["tokens"] = 0.0
+
+        self._stats["retry_after_pauses"] += 1
+        await self._update_async(block)
+        print(f"⏸️ {self.name}: upstream rate limit hit, pausing calls for {seconds:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return this process's counters plus the shared bucket state."""
+        def snapshot(state, now):
+            self._refill(state, now)
+            return {
+                "tokens": round(state["tokens"], 2),
+                "blocked_for_seconds": round(max(0.0, state["blocked_until"] - now), 1),
+            }
+
+        stats = dict(self._stats)
+        stats["total_wait_ms"] = round(stats["total_wait_ms"], 2)
+        stats.update(self._update(snapshot))
+        stats["rate_per_second"] = self.rate
+        stats["capacity"] = self.capacity
+        stats["shared_across_workers"] = self._shared
+        return stats
@@ -0,0 +1,208 @@
+"""
+Final-response cache for route rankings.
+
+The frontend asks for the same ranking over and over while users adjust the UI.
+Each worker keeps the serialized body of recent complete rankings, keyed on all
+query parameters, together with an ETag so clients can revalidate with
+If-None-Match and get a 304 instead of the body.
+
+Every entry remembers the route pair and flight numbers it was built from.
+Rewriting any of those cache rows (a new route search, or fresh historical or
+recent flight data) drops the entries that depend on it. A response whose
+computation overlapped a background refresh of one of its entries is not stored
+at all (see ``since`` in set()), since it may have been built from the old data
+that the refresh's invalidation found nothing to drop for. Invalidation is per
+worker, so entries also expire after RESPONSE_CACHE_TTL, or sooner when a
+response was built from answers that hold for less time (see ``ttl`` in set()).
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from .config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
+from .revalidation import revalidator
+
+
+def make_etag(body: bytes) -> str:
+    """Return a strong ETag for a response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Args:
+        if_none_match: Header value (a list of ETags or "*"), None if missing
+        etag: Current ETag of the response
+
+    Returns:
+        True if the client's copy is current (answer with 304)
+    """
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or any(value.replace("W/", "", 1) == etag for value in candidates)
+
+
+class ResponseCache:
+    """An LRU cache of serialized responses, invalidated by the route and flight entries they depend on."""
+
+    def __init__(self,
+                 ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 enabled: bool = RESPONSE_CACHE_ENABLED):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds a response stays valid
+            max_entries: Maximum number of cached responses
+            enabled: If False, nothing is cached
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        # key -> (expires at, entry); entries hold result, body, etag, routes and flights
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._by_route: Dict[Tuple[str, str], Set[Hashable]] = {}
+        self._by_flight: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "invalidations": 0,
+            "evictions": 0,
+            "outdated_stores_refused": 0,
+        }
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for a key.
+
+        Args:
+            key: Cache key (all query parameters)
+
+        Returns:
+            dict with result, body and etag, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return item[1]
+
+    def set(self,
+            key: Hashable,
+            result: Dict[str, Any],
+            body: bytes,
+            routes: Iterable[Tuple[str, str]],
+            flights: Iterable[str],
+            ttl: Optional[float] = None,
+            since: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Store a response.
+
+        Args:
+            key: Cache key (all query parameters)
+            result: The response content
+            body: The serialized response body
+            routes: (origin, destination) pairs the response was built from
+            flights: Flight numbers the response was built from
+            ttl: Optional shorter lifetime in seconds (capped at the cache TTL)
+            since: Rewrite generation (revalidator.generation()) taken before the
+                response's data was read; the response is refused if a background
+                refresh rewrote any of its routes or flights after it
+
+        Returns:
+            The stored entry, or None if the cache is disabled, ttl has run out or
+            the response is outdated
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if not self.enabled or ttl <= 0:
+            return None
+        routes = {(origin.upper(), destination.upper()) for origin, destination in routes}
+        flights = set(flights)
+        with self._lock:
+            # Checked under the lock: invalidate_* records the rewrite and drops
+            # entries atomically, so an outdated response is either refused or dropped
+            if since is not None and revalidator.rewritten_since(
+                    since, [("route",) + route for route in routes] + [("flight", flight) for flight in flights]):
+                self._stats["outdated_stores_refused"] += 1
+                return None
+            if key in self._entries:
+                self._remove(key)
+            entry = {"result": result, "body": body, "etag": make_etag(body), "routes": routes, "flights": flights}
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            for route in routes:
+                self._by_route.setdefault(route, set()).add(key)
+            for flight in flights:
+                self._by_flight.setdefault(flight, set()).add(key)
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+            return entry
+
+    def invalidate_route(self, origin: str, destination: str) -> None:
+        """Drop every response built from a route pair's search results."""
+        route = (origin.upper(), destination.upper())
+        with self._lock:
+            revalidator.note_rewrite(("route",) + route)
+            for key in list(self._by_route.get(route, ())):
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def invalidate_flight(self, flight_number: str) -> None:
+        """Drop every response that includes a flight's reliability data."""
+        with self._lock:
+            revalidator.note_rewrite(("flight", flight_number))
+            for key in list(self._by_flight.get(flight_number, ())):
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and its dependency links (caller holds the lock)."""
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        entry = item[1]
+        for route in entry["routes"]:
+            keys = self._by_route.get(route)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_route[route]
+        for flight in entry["flights"]:
+            keys = self._by_flight.get(flight)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_flight[flight]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/invalidation counters and the current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = sum(len(entry["body"]) for _, entry in self._entries.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["ttl"] = self.ttl
+        return stats
+
+
+rankings_cache = ResponseCache()
@@ -0,0 +1,256 @@
+"""
+Stale-while-revalidate support for cached route searches and flight data.
+
+A cached entry older than its freshness TTL is still served straight away, and
+a background task refreshes it so the next request gets new data. At most one
+refresh runs per key. To keep entries written at the same time from all going
+stale together, entries are also refreshed early with a probability that grows
+as they approach their TTL (the "XFetch" scheme: refresh once
+``now - delta * beta * ln(random()) >= stored_at + ttl``, where delta is how
+long a refresh usually takes).
+
+Results computed from cached entries (rankings, derived statistics) must not be
+stored once a background refresh has rewritten one of those entries under them.
+Rewrites are numbered: take generation() before reading, and check
+rewritten_since() before storing what was computed.
+"""
+import math
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .config import SWR_EARLY_REFRESH_BETA
+
+# True inside a background refresh. Fetchers use it to skip the cache lookup and
+# to avoid replacing a good stale entry with an error marker if the refresh fails.
+_revalidating: contextvars.ContextVar = contextvars.ContextVar("revalidating", default=False)
+
+# Entries that expire within this many seconds are refreshed now (see refresh_ahead)
+_refresh_horizon: contextvars.ContextVar = contextvars.ContextVar("refresh_horizon", default=0.0)
+
+# Inside track_refreshes(), refresh tasks started by the current task are collected here
+_started_refreshes: contextvars.ContextVar = contextvars.ContextVar("started_refreshes", default=None)
+
+# Assumed refresh duration (seconds) until one has been measured
+DEFAULT_REFRESH_SECONDS = 5.0
+
+# Rewritten keys remembered before older snapshots are refused wholesale
+MAX_TRACKED_REWRITES = 10000
+
+
+def is_revalidating() -> bool:
+    """Return True when running inside a background refresh."""
+    return _revalidating.get()
+
+
+def refresh_horizon() -> float:
+    """Return how far ahead (seconds) entries are currently treated as due for refresh."""
+    return _refresh_horizon.get()
+
+
+@contextmanager
+def refresh_ahead(seconds: float) -> Iterator[None]:
+    """
+    Treat entries that will expire within the given time as due for refresh.
+
+    Used by the prefetch scheduler to renew entries before users hit them stale.
+
+    Args:
+        seconds: Look-ahead window in seconds
+    """
+    token = _refresh_horizon.set(seconds)
+    try:
+        yield
+    finally:
+        _refresh_horizon.reset(token)
+
+
+@contextmanager
+def track_refreshes() -> Iterator[List[asyncio.Task]]:
+    """
+    Collect the background refreshes started by the current task (and tasks it starts).
+
+    Refreshes that were already running for another caller are not included.
+
+    Yields:
+        A list that grows with each refresh task started inside the block
+    """
+    started: List[asyncio.Task] = []
+    token = _started_refreshes.set(started)
+    try:
+        yield started
+    finally:
+        _started_refreshes.reset(token)
+
+
+class Revalidator:
+    """Decides when cached entries are stale and runs one background refresh per key."""
+
+    def __init__(self, beta: float = SWR_EARLY_REFRESH_BETA):
+        """
+        Initialize the revalidator.
+
+        Args:
+            beta: Early refresh aggressiveness (0 disables early refresh, >1 refreshes earlier)
+        """
+        self.beta = beta
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._refresh_seconds: Dict[str, float] = {}
+        # Rewrites are recorded from storage threads, so they have their own lock
+        self._rewrite_lock = threading.Lock()
+        self._generation = 0
+        self._rewritten: Dict[Hashable, int] = {}
+        # Snapshots older than this are refused, because their rewrites were forgotten
+        self._oldest_tracked = 0
+        self._stats = {
+            "fresh": 0,
+            "stale": 0,
+            "early": 0,
+            "refreshes_started": 0,
+            "refreshes_deduplicated": 0,
+            "refreshes_failed": 0,
+        }
+
+    def check(self, kind: str, stored_at: Optional[float], ttl: float) -> Tuple[bool, bool]:
+        """
+        Check whether a cached entry should be refreshed.
+
+        Args:
+            kind: Entry kind ("route", "historical", "recent"), used for refresh timing
+            stored_at: When the entry was stored (epoch seconds), None if unknown
+            ttl: Freshness TTL in seconds
+
+        Returns:
+            tuple: (stale, refresh) - stale if the entry is past its TTL, refresh if
+            a background refresh should be started (stale or picked for early refresh)
+        """
+        if stored_at is None:
+            self._stats["fresh"] += 1
+            return False, False
+
+        now = time.time()
+        expires_at = stored_at + ttl
+        if now >= expires_at:
+            self._stats["stale"] += 1
+            return True, True
+
+        if now + _refresh_horizon.get() >= expires_at:
+            self._stats["early"] += 1
+            return False, True
+
+        delta = self._refresh_seconds.get(kind, DEFAULT_REFRESH_SECONDS)
+        if self.beta > 0 and now - delta * self.beta * math.log(1.0 - random.random()) >= expires_at:
+            self._stats["early"] += 1
+            return False, True
+
+        self._stats["fresh"] += 1
+        return False, False
+
+    def schedule(self, key: Tuple[str, ...], refresh: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Start a background refresh for a key unless one is already running.
+
+        Args:
+            key: Entry key; its first element is the entry kind
+            refresh: Coroutine function that fetches and stores a fresh value
+
+        Returns:
+            True if a refresh was started, False if one was already running
+        """
+        if key in self._tasks:
+            self._stats["refreshes_deduplicated"] += 1
+            return False
+
+        self._stats["refreshes_started"] += 1
+        task = asyncio.create_task(self._run(key, refresh))
+        self._tasks[key] = task
+        started = _started_refreshes.get()
+        if started is not None:
+            started.append(task)
+        return True
+
+    async def _run(self, key: Tuple[str, ...], refresh: Callable[[], Awaitable[Any]]) -> None:
+        """Run a refresh, record how long it took and forget the key when done."""
+        _revalidating.set(True)
+        started = time.perf_counter()
+        try:
+            print(f"🔄 Refreshing stale cache entry in the background: {key}")
+            await refresh()
+            elapsed = time.perf_counter() - started
+            kind = key[0]
+            previous = self._refresh_seconds.get(kind)
+            self._refresh_seconds[kind] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        except Exception as e:
+            self._stats["refreshes_failed"] += 1
+            print(f"⚠️ Background refresh failed for {key}: {e}")
+        finally:
+            self._tasks.pop(key, None)
+
+    async def drain(self, tasks: Optional[List[asyncio.Task]] = None) -> None:
+        """
+        Wait for background refreshes to finish.
+
+        Args:
+            tasks: Refresh tasks to wait for (e.g. from track_refreshes); all
+                currently running refreshes if None
+        """
+        if tasks is None:
+            tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def generation(self) -> int:
+        """Return a snapshot of the rewrites so far, taken before reading cached entries."""
+        with self._rewrite_lock:
+            return self._generation
+
+    def note_rewrite(self, key: Hashable) -> None:
+        """
+        Record that a background refresh rewrote a cached entry.
+
+        Writes made outside a background refresh are ignored: they come from the
+        request pipeline itself, so the result being computed already includes them.
+
+        Args:
+            key: Dependency key, ("route", origin, destination) or ("flight", flight_number)
+        """
+        if not is_revalidating():
+            return
+        with self._rewrite_lock:
+            self._generation += 1
+            if len(self._rewritten) >= MAX_TRACKED_REWRITES:
+                self._rewritten.clear()
+                self._oldest_tracked = self._generation
+            self._rewritten[key] = self._generation
+
+    def rewritten_since(self, generation: int, keys: Iterable[Hashable]) -> bool:
+        """
+        Check whether a background refresh rewrote any of the keys after a snapshot.
+
+        Args:
+            generation: Snapshot from generation()
+            keys: Dependency keys (see note_rewrite)
+
+        Returns:
+            True if a result computed since the snapshot may be outdated
+        """
+        with self._rewrite_lock:
+            if generation < self._oldest_tracked:
+                return True
+            return any(self._rewritten.get(key, 0) > generation for key in keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return freshness and background refresh counters."""
+        stats = dict(self._stats)
+        stats["refreshes_in_flight"] = len(self._tasks)
+        stats["refresh_seconds"] = {kind: round(seconds, 3) for kind, seconds in self._refresh_seconds.items()}
+        stats["beta"] = self.beta
+        return stats
+
+
+# Process-wide revalidator shared by the route search and flight data fetchers
+revalidator = Revalidator()
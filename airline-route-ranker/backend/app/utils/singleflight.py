@@ -0,0 +1,78 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one in-flight computation and all
+receive its result (or its exception), instead of each repeating the work.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent identical async computations by key."""
+    
+    def __init__(self, name: str):
+        """
+        Initialize the coalescing group.
+        
+        Args:
+            name: Name used in logs and metrics
+        """
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "max_waiters": 0}
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func for the key, or join the run already in flight for it.
+        
+        The computation runs in its own task, so a caller that disconnects does
+        not cancel it for the others. The result object is shared between all
+        callers and must not be mutated.
+        
+        Args:
+            key: Identity of the computation
+            func: Zero-argument coroutine function producing the result
+            
+        Returns:
+            The shared result
+        """
+        self._stats["calls"] += 1
+        
+        task = self._in_flight.get(key)
+        if task is None:
+            self._stats["executions"] += 1
+            task = asyncio.create_task(func())
+            self._in_flight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        else:
+            self._stats["coalesced"] += 1
+            print(f"🔗 Coalescing request into in-flight {self.name} computation for {key}")
+        
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        self._stats["max_waiters"] = max(self._stats["max_waiters"], self._waiters[key])
+        
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """Remove a finished computation so the next call starts a new one."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            self._waiters.pop(key, None)
+        
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return coalescing counters."""
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self._stats["coalesced"] / calls, 3) if calls else 0.0,
+        }
@@ -5,10 +5,16 @@ This replaces the pickle cache system with Supabase database storage.
 import os
 import time
 import json
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from dotenv import load_dotenv
 from supabase import create_client
+from .write_behind import WriteBehindBuffer, register_shutdown_flush
+from .memory_cache import TTLCache
+from .response_cache import rankings_cache
+from .revalidation import revalidator
+from .config import MEMORY_CACHE_ENABLED, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES
 
 # Load environment variables
 load_dotenv()
@@ -35,9 +41,62 @@ else:
 ROUTE_CACHE_EXPIRY = 35 * 24 * 60 * 60  # 35 days in seconds
 FLIGHT_CACHE_EXPIRY = 35 * 24 * 60 * 60  # 35 days in seconds
 
-def get_flight_route_data(origin: str, destination: str, date: str) -> Optional[Dict[str, Any]]:
+# In-process cache in front of Supabase, one per table (TTLs follow the table expiries)
+memory_caches = {
+    "flight_routes": TTLCache("flight_routes", ROUTE_CACHE_EXPIRY, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES),
+    "flight_delay_historical": TTLCache("flight_delay_historical", FLIGHT_CACHE_EXPIRY, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES),
+    "flight_delay_recent": TTLCache("flight_delay_recent", FLIGHT_CACHE_EXPIRY, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES),
+    "flight_reliability_stats": TTLCache("flight_reliability_stats", FLIGHT_CACHE_EXPIRY, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES),
+}
+
+
+def _memory_get(table: str, key: tuple) -> Optional[Any]:
+    """Look up a row's data in the in-process cache."""
+    if not MEMORY_CACHE_ENABLED:
+        return None
+    return memory_caches[table].get(key)
+
+
+def _memory_set(table: str, key: tuple, data: Any) -> None:
+    """Store a row's data in the in-process cache."""
+    if MEMORY_CACHE_ENABLED:
+        memory_caches[table].set(key, data)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Convert a Supabase timestamp to epoch seconds (None if missing or unparseable)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def get_memory_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return hit/miss/eviction statistics for the in-process caches."""
+    return {table: cache.get_stats() for table, cache in memory_caches.items()}
+
+# Serializes derived statistics writes with their invalidation (see save_reliability_stats_bulk)
+_stats_lock = threading.Lock()
+
+# How long an in-process note that a flight has no current stats row is trusted when
+# invalidating (another worker may have created one since)
+STATS_ROW_ABSENT_TTL = 60
+
+# Cache writes are buffered and flushed in batches off the request path
+write_buffer = WriteBehindBuffer(supabase)
+register_shutdown_flush(write_buffer)
+
+
+def close_write_buffer() -> None:
+    """Stop the write-behind thread and write all buffered cache rows (called on shutdown)."""
+    write_buffer.close()
+
+
+def get_flight_route_entry(origin: str, destination: str, date: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
     """
-    Get flight route data from Supabase database.
+    Get flight route data and when it was stored from Supabase database.
     
     Args:
         origin: Origin airport IATA code (e.g., "AMS")
@@ -45,16 +104,28 @@ def get_flight_route_data(origin: str, destination: str, date: str) -> Optional[
         date: Specific date in YYYY-MM-DD format
         
     Returns:
-        Route data if found, None otherwise
+        Tuple of (route data, stored-at epoch seconds) if found, None otherwise
     """
     if not supabase:
         print("❌ Supabase client not initialized.")
         return None
     
+    route_key = (origin.upper(), destination.upper(), date)
+    cached = _memory_get("flight_routes", route_key)
+    if cached is not None:
+        print(f"🟦 Using in-memory route data for {origin}-{destination} ({date})")
+        return cached
+    
+    # A write for this route may still be waiting in the write-behind buffer
+    pending = write_buffer.get_pending("flight_routes", route_key)
+    if pending is not None:
+        print(f"🟦 Using route data for {origin}-{destination} ({date}) from the write buffer")
+        return pending["route_data"], time.time()
+    
     try:
         # Get data from Supabase
         response = (supabase.table("flight_routes")
-                   .select("route_data, created_at")
+                   .select("route_data, created_at, updated_at")
                    .eq("origin_iata", origin.upper())
                    .eq("destination_iata", destination.upper())
                    .eq("route_date", date)
@@ -77,12 +148,30 @@ def get_flight_route_data(origin: str, destination: str, date: str) -> Optional[
             print(f"  ⚠️ Warning: Error processing timestamp: {e}")
         
         # Return the route data
-        return response.data[0]["route_data"]
+        entry = (response.data[0]["route_data"], _parse_timestamp(response.data[0].get("updated_at") or cache_timestamp))
+        _memory_set("flight_routes", route_key, entry)
+        return entry
     except Exception as e:
         print(f"❌ Error getting route data from Supabase: {e}")
         return None
 
 
+def get_flight_route_data(origin: str, destination: str, date: str) -> Optional[Dict[str, Any]]:
+    """
+    Get flight route data from Supabase database.
+    
+    Args:
+        origin: Origin airport IATA code (e.g., "AMS")
+        destination: Destination airport IATA code (e.g., "LHE")
+        date: Specific date in YYYY-MM-DD format
+        
+    Returns:
+        Route data if found, None otherwise
+    """
+    entry = get_flight_route_entry(origin, destination, date)
+    return entry[0] if entry is not None else None
+
+
 def save_flight_route_data(origin: str, destination: str, date: str, data: Dict[str, Any]) -> bool:
     """
     Save flight route data to Supabase database.
@@ -101,41 +190,51 @@ def save_flight_route_data(origin: str, destination: str, date: str, data: Dict[
         return False
     
     try:
-        # Create new record (or update if exists)
-        response = (supabase.table("flight_routes")
-                   .upsert({
-                       "origin_iata": origin.upper(),
-                       "destination_iata": destination.upper(),
-                       "route_date": date,
-                       "route_data": data
-                   })
-                   .execute())
+        # Queue the upsert; the write-behind buffer creates or updates the record
+        _memory_set("flight_routes", (origin.upper(), destination.upper(), date), (data, time.time()))
+        write_buffer.enqueue("flight_routes", {
+            "origin_iata": origin.upper(),
+            "destination_iata": destination.upper(),
+            "route_date": date,
+            "route_data": data
+        })
+        rankings_cache.invalidate_route(origin, destination)
         
-        print(f"✅ Successfully saved route data for {origin}-{destination} on {date}")
+        print(f"✅ Queued route data for {origin}-{destination} on {date}")
         return True
     except Exception as e:
         print(f"❌ Error saving route data to Supabase: {e}")
         return False
 
 
-def get_historical_flight_data(flight_number: str) -> Optional[Dict[str, Any]]:
+def get_historical_flight_entry(flight_number: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
     """
-    Get historical flight data from Supabase database.
+    Get historical flight data and when it was stored from Supabase database.
     
     Args:
         flight_number: Flight number (e.g., "EK622")
         
     Returns:
-        Historical flight data if found, None otherwise
+        Tuple of (historical flight data, stored-at epoch seconds) if found, None otherwise
     """
     if not supabase:
         print("❌ Supabase client not initialized.")
         return None
     
+    cached = _memory_get("flight_delay_historical", (flight_number,))
+    if cached is not None:
+        print(f"🟦 Using in-memory historical data for flight {flight_number}")
+        return cached
+    
+    pending = write_buffer.get_pending("flight_delay_historical", (flight_number,))
+    if pending is not None:
+        print(f"🟦 Using historical data for flight {flight_number} from the write buffer")
+        return pending["delay_data"], time.time()
+    
     try:
         # Get data from Supabase
         response = (supabase.table("flight_delay_historical")
-                   .select("delay_data, created_at")
+                   .select("delay_data, created_at, updated_at")
                    .eq("flight_number", flight_number)
                    .execute())
         
@@ -156,12 +255,76 @@ def get_historical_flight_data(flight_number: str) -> Optional[Dict[str, Any]]:
             print(f"  ⚠️ Warning: Error processing timestamp: {e}")
         
         # Return the historical data
-        return response.data[0]["delay_data"]
+        entry = (response.data[0]["delay_data"], _parse_timestamp(response.data[0].get("updated_at") or cache_timestamp))
+        _memory_set("flight_delay_historical", (flight_number,), entry)
+        return entry
     except Exception as e:
         print(f"❌ Error getting historical data from Supabase: {e}")
         return None
 
 
+def get_historical_flight_data(flight_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Get historical flight data from Supabase database.
+    
+    Args:
+        flight_number: Flight number (e.g., "EK622")
+        
+    Returns:
+        Historical flight data if found, None otherwise
+    """
+    entry = get_historical_flight_entry(flight_number)
+    return entry[0] if entry is not None else None
+
+
+def get_historical_flight_data_bulk(flight_numbers: List[str]) -> Optional[Dict[str, Tuple[Dict[str, Any], Optional[float]]]]:
+    """
+    Get historical flight data for many flights with a single query.
+    
+    Args:
+        flight_numbers: Flight numbers (e.g., ["EK622", "BA123"])
+        
+    Returns:
+        (data, stored-at epoch seconds) entries keyed by flight number (flights without
+        data are left out), or None if the query failed
+    """
+    if not supabase:
+        print("❌ Supabase client not initialized.")
+        return None
+    
+    unique_flight_numbers = list(dict.fromkeys(flight_numbers))
+    if not unique_flight_numbers:
+        return {}
+    
+    # Serve what we can from memory and the write buffer, query Supabase for the rest
+    results = {}
+    for fn in unique_flight_numbers:
+        cached = _memory_get("flight_delay_historical", (fn,))
+        if cached is None:
+            pending = write_buffer.get_pending("flight_delay_historical", (fn,))
+            cached = (pending["delay_data"], time.time()) if pending is not None else None
+        if cached is not None:
+            results[fn] = cached
+    remaining = [fn for fn in unique_flight_numbers if fn not in results]
+    
+    try:
+        if remaining:
+            response = (supabase.table("flight_delay_historical")
+                       .select("flight_number, delay_data, created_at, updated_at")
+                       .in_("flight_number", remaining)
+                       .execute())
+            
+            for row in response.data:
+                entry = (row["delay_data"], _parse_timestamp(row.get("updated_at") or row.get("created_at")))
+                results[row["flight_number"]] = entry
+                _memory_set("flight_delay_historical", (row["flight_number"],), entry)
+        print(f"🟦 Bulk historical cache lookup: {len(results)}/{len(unique_flight_numbers)} flights found")
+        return results
+    except Exception as e:
+        print(f"❌ Error getting bulk historical data from Supabase: {e}")
+        return None
+
+
 def save_historical_flight_data(flight_number: str, data: Dict[str, Any]) -> bool:
     """
     Save historical flight data to Supabase database.
@@ -178,40 +341,51 @@ def save_historical_flight_data(flight_number: str, data: Dict[str, Any]) -> boo
         return False
     
     try:
-        # Create new record (or update if exists)
-        response = (supabase.table("flight_delay_historical")
-                   .upsert({
-                       "flight_number": flight_number,
-                       "delay_data": data
-                   })
-                   .execute())
+        # Queue the upsert; the write-behind buffer creates or updates the record
+        _memory_set("flight_delay_historical", (flight_number,), (data, time.time()))
+        write_buffer.enqueue("flight_delay_historical", {
+            "flight_number": flight_number,
+            "delay_data": data
+        })
+        invalidate_reliability_stats(flight_number)
+        rankings_cache.invalidate_flight(flight_number)
         
-        print(f"✅ Successfully saved historical data for flight {flight_number}")
+        print(f"✅ Queued historical data for flight {flight_number}")
         return True
     except Exception as e:
         print(f"❌ Error saving historical data to Supabase: {e}")
         return False
 
 
-def get_recent_flight_data(flight_number: str, week_year: str) -> Optional[Dict[str, Any]]:
+def get_recent_flight_entry(flight_number: str, week_year: str) -> Optional[Tuple[Any, Optional[float]]]:
     """
-    Get recent flight data from Supabase database.
+    Get recent flight data and when it was stored from Supabase database.
     
     Args:
         flight_number: Flight number (e.g., "EK622")
         week_year: Year and week number in the format YYYY-WW
         
     Returns:
-        Recent flight data if found, None otherwise
+        Tuple of (recent flight data, stored-at epoch seconds) if found, None otherwise
     """
     if not supabase:
         print("❌ Supabase client not initialized.")
         return None
     
+    cached = _memory_get("flight_delay_recent", (flight_number, week_year))
+    if cached is not None:
+        print(f"🟦 Using in-memory recent data for flight {flight_number} (week {week_year})")
+        return cached
+    
+    pending = write_buffer.get_pending("flight_delay_recent", (flight_number, week_year))
+    if pending is not None:
+        print(f"🟦 Using recent data for flight {flight_number} (week {week_year}) from the write buffer")
+        return pending["flight_data"], time.time()
+    
     try:
         # Get data from Supabase
         response = (supabase.table("flight_delay_recent")
-                   .select("flight_data, created_at")
+                   .select("flight_data, created_at, updated_at")
                    .eq("flight_number", flight_number)
                    .eq("week_year", week_year)
                    .execute())
@@ -233,12 +407,126 @@ def get_recent_flight_data(flight_number: str, week_year: str) -> Optional[Dict[
             print(f"  ⚠️ Warning: Error processing timestamp: {e}")
         
         # Return the recent flight data
-        return response.data[0]["flight_data"]
+        entry = (response.data[0]["flight_data"], _parse_timestamp(response.data[0].get("updated_at") or cache_timestamp))
+        _memory_set("flight_delay_recent", (flight_number, week_year), entry)
+        return entry
     except Exception as e:
         print(f"❌ Error getting recent flight data from Supabase: {e}")
         return None
 
 
+def get_recent_flight_data(flight_number: str, week_year: str) -> Optional[Dict[str, Any]]:
+    """
+    Get recent flight data from Supabase database.
+    
+    Args:
+        flight_number: Flight number (e.g., "EK622")
+        week_year: Year and week number in the format YYYY-WW
+        
+    Returns:
+        Recent flight data if found, None otherwise
+    """
+    entry = get_recent_flight_entry(flight_number, week_year)
+    return entry[0] if entry is not None else None
+
+
+def get_recent_flight_data_bulk(flight_numbers: List[str], week_year: str) -> Optional[Dict[str, Tuple[Any, Optional[float]]]]:
+    """
+    Get recent flight data for many flights in one week bucket with a single query.
+    
+    Args:
+        flight_numbers: Flight numbers (e.g., ["EK622", "BA123"])
+        week_year: Year and week number in the format YYYY-WW
+        
+    Returns:
+        (data, stored-at epoch seconds) entries keyed by flight number (flights without
+        data are left out), or None if the query failed
+    """
+    if not supabase:
+        print("❌ Supabase client not initialized.")
+        return None
+    
+    unique_flight_numbers = list(dict.fromkeys(flight_numbers))
+    if not unique_flight_numbers:
+        return {}
+    
+    # Serve what we can from memory and the write buffer, query Supabase for the rest
+    results = {}
+    for fn in unique_flight_numbers:
+        cached = _memory_get("flight_delay_recent", (fn, week_year))
+        if cached is None:
+            pending = write_buffer.get_pending("flight_delay_recent", (fn, week_year))
+            cached = (pending["flight_data"], time.time()) if pending is not None else None
+        if cached is not None:
+            results[fn] = cached
+    remaining = [fn for fn in unique_flight_numbers if fn not in results]
+    
+    try:
+        if remaining:
+            response = (supabase.table("flight_delay_recent")
+                       .select("flight_number, flight_data, created_at, updated_at")
+                       .in_("flight_number", remaining)
+                       .eq("week_year", week_year)
+                       .execute())
+            
+            for row in response.data:
+                entry = (row["flight_data"], _parse_timestamp(row.get("updated_at") or row.get("created_at")))
+                results[row["flight_number"]] = entry
+                _memory_set("flight_delay_recent", (row["flight_number"], week_year), entry)
+        print(f"🟦 Bulk recent cache lookup (week {week_year}): {len(results)}/{len(unique_flight_numbers)} flights found")
+        return results
+    except Exception as e:
+        print(f"❌ Error getting bulk recent flight data from Supabase: {e}")
+        return None
+
+
+def get_latest_recent_flight_data(flight_number: str, oldest_week: str, newest_week: str) -> Optional[Tuple[str, Any]]:
+    """
+    Get the newest recent flight data for a flight within a range of week buckets.
+    
+    Uses a single ordered query (newest week first, limit 1) instead of probing
+    each week bucket separately.
+    
+    Args:
+        flight_number: Flight number (e.g., "EK622")
+        oldest_week: Oldest week bucket to consider (YYYY-WW, inclusive)
+        newest_week: Newest week bucket to consider (YYYY-WW, inclusive)
+        
+    Returns:
+        Tuple of (week_year, flight data) for the newest week found, None otherwise
+    """
+    if not supabase:
+        print("❌ Supabase client not initialized.")
+        return None
+    
+    # Rows still waiting in the write buffer are newer than anything stored
+    pending_weeks = [row for row in write_buffer.get_pending_rows("flight_delay_recent")
+                     if row["flight_number"] == flight_number and oldest_week <= row["week_year"] <= newest_week]
+    
+    try:
+        response = (supabase.table("flight_delay_recent")
+                   .select("week_year, flight_data, created_at, updated_at")
+                   .eq("flight_number", flight_number)
+                   .gte("week_year", oldest_week)
+                   .lte("week_year", newest_week)
+                   .order("week_year", desc=True)
+                   .limit(1)
+                   .execute())
+        
+        candidates = pending_weeks + list(response.data)
+        if not candidates:
+            print(f"No recent data found for flight {flight_number} between weeks {oldest_week} and {newest_week}")
+            return None
+        
+        newest = max(candidates, key=lambda row: row["week_year"])
+        stored_at = _parse_timestamp(newest.get("updated_at") or newest.get("created_at")) or time.time()
+        _memory_set("flight_delay_recent", (flight_number, newest["week_year"]), (newest["flight_data"], stored_at))
+        return newest["week_year"], newest["flight_data"]
+    except Exception as e:
+        print(f"❌ Error getting latest recent flight data from Supabase: {e}")
+        return None
+
+
 def save_recent_flight_data(flight_number: str, week_year: str, data: Dict[str, Any]) -> bool:
     """
     Save recent flight data to Supabase database.
@@ -256,22 +544,176 @@ def save_recent_flight_data(flight_number: str, week_year: str, data: Dict[str,
         return False
     
     try:
-        # Create new record (or update if exists)
-        response = (supabase.table("flight_delay_recent")
-                   .upsert({
-                       "flight_number": flight_number,
-                       "week_year": week_year,
-                       "flight_data": data
-                   })
-                   .execute())
+        # Queue the upsert; the write-behind buffer creates or updates the record
+        _memory_set("flight_delay_recent", (flight_number, week_year), (data, time.time()))
+        write_buffer.enqueue("flight_delay_recent", {
+            "flight_number": flight_number,
+            "week_year": week_year,
+            "flight_data": data
+        })
+        invalidate_reliability_stats(flight_number)
+        rankings_cache.invalidate_flight(flight_number)
         
-        print(f"✅ Successfully saved recent data for flight {flight_number} in week {week_year}")
+        print(f"✅ Queued recent data for flight {flight_number} in week {week_year}")
         return True
     except Exception as e:
         print(f"❌ Error saving recent flight data to Supabase: {e}")
         return False
 
 
+def get_reliability_stats_bulk(flight_numbers: List[str]) -> Optional[Dict[str, Tuple[Dict[str, Any], Optional[float]]]]:
+    """
+    Get derived reliability statistics for many flights with a single query.
+    
+    Args:
+        flight_numbers: Flight numbers (e.g., ["EK622", "BA123"])
+        
+    Returns:
+        (row, stored-at epoch seconds) entries keyed by flight number, where row has
+        scoring_version, data_version and stats (None once invalidated, or if the
+        flight has no row). None if the query failed
+    """
+    if not supabase:
+        print("❌ Supabase client not initialized.")
+        return None
+    
+    unique_flight_numbers = list(dict.fromkeys(flight_numbers))
+    if not unique_flight_numbers:
+        return {}
+    
+    # Serve what we can from memory and the write buffer, query Supabase for the rest
+    results = {}
+    for fn in unique_flight_numbers:
+        cached = _memory_get("flight_reliability_stats", (fn,))
+        if cached is None:
+            pending = write_buffer.get_pending("flight_reliability_stats", (fn,))
+            cached = (pending, time.time()) if pending is not None else None
+        if cached is not None:
+            results[fn] = cached
+    remaining = [fn for fn in unique_flight_numbers if fn not in results]
+    
+    try:
+        if remaining:
+            response = (supabase.table("flight_reliability_stats")
+                       .select("flight_number, scoring_version, data_version, stats, created_at, updated_at")
+                       .in_("flight_number", remaining)
+                       .execute())
+            
+            for row in response.data:
+                entry = ({
+                    "flight_number": row["flight_number"],
+                    "scoring_version": row.get("scoring_version"),
+                    "data_version": row.get("data_version"),
+                    "stats": row.get("stats"),
+                }, _parse_timestamp(row.get("updated_at") or row.get("created_at")))
+                results[row["flight_number"]] = entry
+                _memory_set("flight_reliability_stats", (row["flight_number"],), entry)
+            # Remember flights without a row so invalidating them needs no write
+            for fn in remaining:
+                if fn not in results:
+                    entry = (_empty_stats_row(fn), time.time())
+                    results[fn] = entry
+                    _memory_set("flight_reliability_stats", (fn,), entry)
+        print(f"🟦 Bulk derived stats lookup: {len(results)}/{len(unique_flight_numbers)} flights found")
+        return results
+    except Exception as e:
+        print(f"❌ Error getting bulk derived stats from Supabase: {e}")
+        return None
+
+
+def save_reliability_stats_bulk(stats_by_flight: Dict[str, Dict[str, Any]],
+                                scoring_version: str,
+                                data_version: str,
+                                since: Optional[int] = None) -> int:
+    """
+    Save derived reliability statistics for many flights to Supabase database.
+    
+    Args:
+        stats_by_flight: Derived statistics (reliability score, delay percentage,
+            flight counts) keyed by flight number
+        scoring_version: Version of the scoring logic and weights used
+        data_version: Week bucket (YYYY-WW) of the recent data used
+        since: Rewrite generation (revalidator.generation()) taken before the raw
+            data was read; flights whose raw data a background refresh rewrote
+            after it are skipped, so their invalidation is not overwritten
+        
+    Returns:
+        Number of flights saved
+    """
+    if not supabase:
+        print("❌ Supabase client not initialized.")
+        return 0
+    
+    try:
+        saved = 0
+        # Queue the upserts; the write-behind buffer creates or updates the records
+        for flight_number, stats in stats_by_flight.items():
+            with _stats_lock:
+                if since is not None and revalidator.rewritten_since(since, [("flight", flight_number)]):
+                    print(f"  ⓘ Raw data of {flight_number} was refreshed meanwhile, not saving its derived stats")
+                    continue
+                row = {
+                    "flight_number": flight_number,
+                    "scoring_version": scoring_version,
+                    "data_version": data_version,
+                    "stats": stats
+                }
+                _memory_set("flight_reliability_stats", (flight_number,), (row, time.time()))
+                write_buffer.enqueue("flight_reliability_stats", row)
+            saved += 1
+        
+        print(f"✅ Queued derived stats for {saved} flights")
+        return saved
+    except Exception as e:
+        print(f"❌ Error saving derived stats to Supabase: {e}")
+        return 0
+
+
+def _empty_stats_row(flight_number: str) -> Dict[str, Any]:
+    """Return a derived statistics row without statistics (invalidated, or no row stored)."""
+    return {
+        "flight_number": flight_number,
+        "scoring_version": None,
+        "data_version": None,
+        "stats": None
+    }
+
+
+def invalidate_reliability_stats(flight_number: str) -> None:
+    """
+    Mark a flight's derived statistics as outdated after its raw data changed.
+    
+    Only a row that exists is cleared: a row known in this process is cleared
+    through the write buffer, and an unknown one with an UPDATE that matches
+    nothing if the flight has no row. Flights recently seen without a current row
+    need no write at all.
+    
+    Args:
+        flight_number: Flight number (e.g., "EK622")
+    """
+    row = _empty_stats_row(flight_number)
+    with _stats_lock:
+        revalidator.note_rewrite(("flight", flight_number))
+        cached = _memory_get("flight_reliability_stats", (flight_number,))
+        pending = write_buffer.get_pending("flight_reliability_stats", (flight_number,))
+        _memory_set("flight_reliability_stats", (flight_number,), (row, time.time()))
+        
+        if pending is not None or (cached is not None and cached[0].get("stats") is not None):
+            # A row exists or is about to be written
+            write_buffer.enqueue("flight_reliability_stats", row)
+            return
+        if cached is not None and cached[1] is not None and time.time() - cached[1] < STATS_ROW_ABSENT_TTL:
+            return
+    
+    try:
+        (supabase.table("flight_reliability_stats")
+         .update({"scoring_version": None, "data_version": None, "stats": None})
+         .eq("flight_number", flight_number)
+         .execute())
+    except Exception as e:
+        print(f"❌ Error invalidating derived stats of {flight_number} in Supabase: {e}")
+
+
 def get_cached_dates_for_route(origin: str, destination: str) -> list:
     """
     Get a list of dates for which we have cached route data.
@@ -299,9 +741,74 @@ def get_cached_dates_for_route(origin: str, destination: str) -> list:
         dates = []
         for item in response.data:
             dates.append(item["route_date"])
+        
+        # Include routes that are still waiting in the write buffer
+        for row in write_buffer.get_pending_rows("flight_routes"):
+            if (row["origin_iata"] == origin.upper() and row["destination_iata"] == destination.upper()
+                    and row["route_date"] not in dates):
+                dates.append(row["route_date"])
             
         print(f"  ✅ Found {len(dates)} cached dates for {origin}-{destination}")
         return dates
     except Exception as e:
         print(f"❌ Error getting cached dates from Supabase: {e}")
-        return [] 
\ No newline at end of file
+        return [] 
+
+
+def get_route_popularity(since: str, max_rows: int = 5000) -> Optional[Dict[Tuple[str, str], Dict[str, Any]]]:
+    """
+    Count recent searches and saved routes per origin-destination pair.
+    
+    Reads user_search_history and user_saved_routes across all users, so it needs
+    the admin (service role) client to get past row level security.
+    
+    Args:
+        since: Only count searches created at or after this ISO timestamp
+        max_rows: Maximum number of rows to read from each table
+        
+    Returns:
+        Dict keyed by (origin, destination) with "searches", "saved", "favorites"
+        and "search_dates" (search date -> count), or None if the query failed
+    """
+    if not supabase_admin:
+        print("⚠️ Supabase admin client not initialized, cannot read route popularity.")
+        return None
+    
+    try:
+        searches = (supabase_admin.table("user_search_history")
+                   .select("origin_iata, destination_iata, search_date")
+                   .gte("created_at", since)
+                   .order("created_at", desc=True)
+                   .limit(max_rows)
+                   .execute())
+        saved = (supabase_admin.table("user_saved_routes")
+                .select("origin_iata, destination_iata, is_favorite")
+                .limit(max_rows)
+                .execute())
+    except Exception as e:
+        print(f"❌ Error reading route popularity from Supabase: {e}")
+        return None
+    
+    popularity: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    
+    def stats_for(row):
+        key = (row["origin_iata"].upper(), row["destination_iata"].upper())
+        if key not in popularity:
+            popularity[key] = {"searches": 0, "saved": 0, "favorites": 0, "search_dates": {}}
+        return popularity[key]
+    
+    for row in searches.data:
+        stats = stats_for(row)
+        stats["searches"] += 1
+        if row.get("search_date"):
+            stats["search_dates"][row["search_date"]] = stats["search_dates"].get(row["search_date"], 0) + 1
+    
+    for row in saved.data:
+        stats = stats_for(row)
+        stats["saved"] += 1
+        if row.get("is_favorite"):
+            stats["favorites"] += 1
+    
+    print(f"✅ Read route popularity: {len(searches.data)} searches and {len(saved.data)} saved routes "
+          f"across {len(popularity)} routes")
+    return popularity
@@ -0,0 +1,209 @@
+"""
+Write-behind buffer for Supabase cache upserts.
+
+Cache writes (route searches, historical and recent flight data) used to be
+single-row upserts on the request path. They are now queued here, keyed by each
+table's unique constraint, and flushed by a background thread as one multi-row
+upsert per table whenever the buffer fills up or the flush interval passes.
+Repeated writes to the same key before a flush collapse into the latest one.
+Pending rows (including rows in the middle of a flush) stay readable through
+get_pending() so a read straight after a write still sees it.
+"""
+import time
+import atexit
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import WRITE_BEHIND_ENABLED, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL
+
+# Unique constraint of each buffered table (see supabase/supabase_schema.sql)
+TABLE_CONFLICT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "flight_routes": ("origin_iata", "destination_iata", "route_date"),
+    "flight_delay_historical": ("flight_number",),
+    "flight_delay_recent": ("flight_number", "week_year"),
+    "flight_reliability_stats": ("flight_number",),
+}
+
+# Give up on a row after this many failed flushes
+MAX_FLUSH_ATTEMPTS = 3
+
+
+class WriteBehindBuffer:
+    """Collects upserts per table and writes them to Supabase in batches."""
+
+    def __init__(self,
+                 client: Any,
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 enabled: bool = WRITE_BEHIND_ENABLED):
+        """
+        Initialize the buffer.
+
+        Args:
+            client: Supabase client used for the upserts
+            batch_size: Number of pending rows that triggers an immediate flush
+            flush_interval: Maximum seconds a row waits before being flushed
+            enabled: If False, every write is flushed synchronously by the caller
+        """
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[tuple, Dict[str, Any]]] = {table: {} for table in TABLE_CONFLICT_KEYS}
+        self._inflight: Dict[str, Dict[tuple, Dict[str, Any]]] = {table: {} for table in TABLE_CONFLICT_KEYS}
+        self._attempts: Dict[Tuple[str, tuple], int] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "failed_flushes": 0,
+            "rows_dropped": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @staticmethod
+    def row_key(table: str, row: Dict[str, Any]) -> tuple:
+        """Return the conflict key of a row for its table."""
+        return tuple(row[column] for column in TABLE_CONFLICT_KEYS[table])
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> None:
+        """
+        Queue an upsert.
+
+        Args:
+            table: Table name (one of TABLE_CONFLICT_KEYS)
+            row: Full row to upsert
+        """
+        key = self.row_key(table, row)
+
+        with self._lock:
+            pending = self._pending[table]
+            if key in pending:
+                self._stats["coalesced"] += 1
+            pending[key] = row
+            self._attempts.pop((table, key), None)
+            self._stats["enqueued"] += 1
+            pending_count = sum(len(rows) for rows in self._pending.values())
+
+        if not self.enabled or self._closed:
+            self.flush()
+            return
+
+        self._ensure_worker()
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    def get_pending(self, table: str, key: tuple) -> Optional[Dict[str, Any]]:
+        """Return the queued row for a key, or None if nothing is waiting to be written."""
+        with self._lock:
+            row = self._pending[table].get(key)
+            return row if row is not None else self._inflight[table].get(key)
+
+    def get_pending_rows(self, table: str) -> List[Dict[str, Any]]:
+        """Return all queued rows for a table."""
+        with self._lock:
+            rows = dict(self._inflight[table])
+            rows.update(self._pending[table])
+            return list(rows.values())
+
+    def flush(self) -> int:
+        """
+        Write every queued row now.
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batches = {table: rows for table, rows in self._pending.items() if rows}
+                self._inflight = self._pending
+                self._pending = {table: {} for table in TABLE_CONFLICT_KEYS}
+
+            if not batches:
+                return 0
+
+            started = time.perf_counter()
+            written = 0
+            for table, rows in batches.items():
+                written += self._upsert_batch(table, rows)
+
+            with self._lock:
+                self._inflight = {table: {} for table in TABLE_CONFLICT_KEYS}
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += written
+                self._stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return written
+
+    def _upsert_batch(self, table: str, rows: Dict[tuple, Dict[str, Any]]) -> int:
+        """Upsert one table's batch, re-queueing the rows if the write fails."""
+        on_conflict = ",".join(TABLE_CONFLICT_KEYS[table])
+        try:
+            self.client.table(table).upsert(list(rows.values()), on_conflict=on_conflict).execute()
+            print(f"✅ Flushed {len(rows)} buffered rows to {table}")
+            return len(rows)
+        except Exception as e:
+            print(f"❌ Error flushing {len(rows)} buffered rows to {table}: {e}")
+            with self._lock:
+                self._stats["failed_flushes"] += 1
+                for key, row in rows.items():
+                    attempt_key = (table, key)
+                    attempts = self._attempts.get(attempt_key, 0) + 1
+                    if key in self._pending[table]:
+                        # A newer write for this key is already queued
+                        self._attempts.pop(attempt_key, None)
+                    elif attempts >= MAX_FLUSH_ATTEMPTS:
+                        self._attempts.pop(attempt_key, None)
+                        self._stats["rows_dropped"] += 1
+                    else:
+                        self._attempts[attempt_key] = attempts
+                        self._pending[table][key] = row
+            return 0
+
+    def _ensure_worker(self) -> None:
+        """Start the background flush thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Flush on every interval tick, or earlier when the batch size is reached."""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Write-behind flush failed: {e}")
+
+    def close(self) -> None:
+        """Stop the background thread and write everything still queued."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth and flush statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = {table: len(rows) for table, rows in self._pending.items()}
+        stats["enabled"] = self.enabled
+        stats["batch_size"] = self.batch_size
+        stats["flush_interval"] = self.flush_interval
+        return stats
+
+
+def register_shutdown_flush(buffer: WriteBehindBuffer) -> None:
+    """Flush the buffer when the interpreter exits (covers exits without a FastAPI shutdown event)."""
+    atexit.register(buffer.close)
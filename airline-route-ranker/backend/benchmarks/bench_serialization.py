@@ -0,0 +1,194 @@
+"""
+Benchmark response serialization and compression for a 10-route ranking.
+
+Compares FastAPI's default path (jsonable_encoder + stdlib json) with
+dumps_json (orjson when installed), and the bytes on the wire without
+compression, with gzip and with brotli (when installed).
+
+Two payloads are measured:
+
+- ranking: the /api/rankings response shape (10 routes, per-flight summaries)
+- ranking+analyses: the same routes with each flight's full combined analysis
+  (including individual_flights) attached, as returned by /api/flight
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py [--repeat 200] [--recent-flights 14]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.reliability import FlightDataProcessor, FlightDataAnalyzer
+from app.utils.json_response import dumps_json, ORJSON_AVAILABLE
+from app.utils.compression import compress, BROTLI_AVAILABLE
+
+
+def historical_payload(flight_number):
+    """Build an AeroDataBox /delays response for a flight."""
+    return {
+        "number": flight_number,
+        "origins": [],
+        "destinations": [{
+            "airportIcao": "EGLL",
+            "scheduledHourUtc": 15,
+            "numConsideredFlights": 60,
+            "fromUtc": "2026-01-01",
+            "toUtc": "2026-09-30",
+            "numFlightsDelayedBrackets": [
+                {"delayedFrom": "-00:15:00", "delayedTo": "00:15:00", "percentage": 0.7},
+                {"delayedFrom": "00:15:00", "delayedTo": "00:30:00", "percentage": 0.15},
+                {"delayedFrom": "00:30:00", "delayedTo": "01:00:00", "percentage": 0.1},
+                {"delayedFrom": "01:00:00", "delayedTo": "02:00:00", "percentage": 0.05},
+            ],
+            "medianDelay": "00:06:00",
+            "delayPercentiles": [{"percentile": 90, "delay": "00:45:00"}],
+        }],
+    }
+
+
+def recent_payload(flight_number, count):
+    """Build an AeroDataBox flight-number search response with `count` flights."""
+    base = datetime(2026, 10, 1, 10, 0)
+    flights = []
+    for day in range(count):
+        scheduled = base + timedelta(days=day)
+        departure_delay = timedelta(minutes=(day * 7) % 50)
+        arrival_delay = timedelta(minutes=(day * 11) % 70)
+        flights.append({
+            "number": flight_number,
+            "status": "Arrived",
+            "airline": {"name": "Example Air"},
+            "aircraft": {"model": "Airbus A320", "reg": f"G-EX{day:02d}"},
+            "departure": {
+                "airport": {"iata": "AMS", "name": "Amsterdam Schiphol"},
+                "scheduledTime": {"utc": scheduled.strftime("%Y-%m-%d %H:%MZ"), "local": scheduled.strftime("%Y-%m-%d %H:%M+02:00")},
+                "revisedTime": {"utc": (scheduled + departure_delay).strftime("%Y-%m-%d %H:%MZ"),
+                                "local": (scheduled + departure_delay).strftime("%Y-%m-%d %H:%M+02:00")},
+                "terminal": "1",
+                "gate": f"D{day}",
+            },
+            "arrival": {
+                "airport": {"iata": "LHR", "name": "London Heathrow"},
+                "scheduledTime": {"utc": (scheduled + timedelta(hours=1)).strftime("%Y-%m-%d %H:%MZ"),
+                                  "local": (scheduled + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M+01:00")},
+                "revisedTime": {"utc": (scheduled + timedelta(hours=1) + arrival_delay).strftime("%Y-%m-%d %H:%MZ"),
+                                "local": (scheduled + timedelta(hours=1) + arrival_delay).strftime("%Y-%m-%d %H:%M+01:00")},
+                "terminal": "5",
+            },
+        })
+    return flights
+
+
+def build_payloads(recent_flights):
+    """Build the ranking and ranking+analyses payloads for 10 two-leg routes."""
+    flight_numbers = [f"EX{100 + index}" for index in range(11)]
+    analyses = {}
+    # The models log every step; keep the benchmark output readable
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        for flight_number in flight_numbers:
+            historical = FlightDataProcessor.process_historical_delay_stats(historical_payload(flight_number))
+            recent = FlightDataProcessor.process_recent_flight_data(recent_payload(flight_number, recent_flights))
+            analysis = FlightDataAnalyzer.combine_statistics(historical, recent)
+            analysis["reliability_score"] = FlightDataAnalyzer.calculate_reliability_score(analysis)
+            analyses[flight_number] = analysis
+
+    routes = []
+    for index in range(10):
+        legs = [flight_numbers[index], flight_numbers[index + 1]]
+        routes.append({
+            "total_duration": 480 + index * 15,
+            "formatted_duration": f"{8 + index // 4}h {(index * 15) % 60}m",
+            "segments": 2,
+            "connections": 1,
+            "connection_airports": ["LHR"],
+            "operating_airlines": ["EX"],
+            "operating_flight_numbers": legs,
+            "departure_time": "2026-11-01T10:00",
+            "arrival_time": "2026-11-01T18:00",
+            "price": {"amount": f"{450 + index * 20:.2f}", "currency": "EUR"},
+            "first_departure_airport": "AMS",
+            "last_arrival_airport": "LHE",
+            "connection_string": "LHR",
+            "operating_airline": "EX",
+            "reliability_score": 72,
+            "reliability_data": [{
+                "flight_number": flight_number,
+                "reliability_score": analyses[flight_number]["reliability_score"],
+                "delay_percentage": analyses[flight_number].get("combined_statistics", {}).get("overall_delay_percentage"),
+                "data_quality": analyses[flight_number].get("data_quality"),
+                "historical_flight_count": 60,
+                "recent_flight_count": recent_flights,
+                "pending": False,
+            } for flight_number in legs],
+            "reliability_pending": False,
+            "smart_rank": 90.0 - index,
+            "rank": index + 1,
+        })
+
+    ranking = {
+        "query": {"origin": "AMS", "destination": "LHE", "date": "2026-11-01", "max_connections": 2, "max_routes": 10},
+        "routes": routes,
+        "analysis_stats": {"flight_references": 20, "unique_flights": 11, "dedup_ratio": 0.45},
+        "served_stale": False,
+        "partial": False,
+        "pending_flights": [],
+    }
+    with_analyses = dict(ranking, routes=[
+        dict(route, reliability_data=[dict(entry, analysis=analyses[entry["flight_number"]])
+                                      for entry in route["reliability_data"]])
+        for route in routes
+    ])
+    return {"ranking": ranking, "ranking+analyses": with_analyses}
+
+
+def default_render(payload):
+    """Serialize the way FastAPI does by default (jsonable_encoder + JSONResponse.render)."""
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def best_ms(func, repeat):
+    """Best time of one call in milliseconds."""
+    timer = timeit.Timer(func)
+    loops = max(1, repeat // 5)
+    return min(timer.repeat(repeat=5, number=loops)) / loops * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Serializations per measurement")
+    parser.add_argument("--recent-flights", type=int, default=14, help="Recent flights per flight number")
+    args = parser.parse_args()
+
+    print(f"orjson available: {ORJSON_AVAILABLE}, brotli available: {BROTLI_AVAILABLE}")
+    for name, payload in build_payloads(args.recent_flights).items():
+        before = default_render(payload)
+        after = dumps_json(payload)
+        assert json.loads(before) == json.loads(after), "serializers disagree"
+
+        before_ms = best_ms(lambda: default_render(payload), args.repeat)
+        after_ms = best_ms(lambda: dumps_json(payload), args.repeat)
+        gzip_ms = best_ms(lambda: compress(after, "gzip"), args.repeat)
+
+        print(f"\n{name} (10 routes)")
+        print(f"  serialize  jsonable_encoder + json: {before_ms:8.3f} ms   dumps_json: {after_ms:8.3f} ms   "
+              f"({before_ms / after_ms:.1f}x faster)")
+        print(f"  wire bytes identity: {len(after):8d}   gzip: {len(compress(after, 'gzip')):8d} "
+              f"({gzip_ms:.3f} ms)", end="")
+        if BROTLI_AVAILABLE:
+            br_ms = best_ms(lambda: compress(after, "br"), args.repeat)
+            print(f"   br: {len(compress(after, 'br')):8d} ({br_ms:.3f} ms)")
+        else:
+            print("   br: n/a (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark timestamp parsing of AeroDataBox flight records.
+
+Measures the per-record cost of FlightDataProcessor._extract_flight_info (four
+time strings per record) with the original strptime loop and with
+app.models.timestamps, cold (parse cache cleared before every payload) and warm
+(the same payload again), and the per-timestamp cost of parsing a whole column
+to epoch minutes with parse_time_column.
+
+Usage (from the backend directory):
+    python benchmarks/bench_timestamps.py [--repeat 20] [--records 1000]
+"""
+import os
+import sys
+import timeit
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import recent_payload
+from app.models import timestamps
+from app.models.reliability import FlightDataProcessor
+
+
+def strptime_parse_time(time_str):
+    """The original _parse_time: strip Z, then try each strptime format."""
+    if not time_str:
+        return None
+    if time_str.endswith('Z'):
+        time_str = time_str[:-1]
+    for fmt in timestamps.TIME_FORMATS:
+        try:
+            return datetime.strptime(time_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def extract_all(records):
+    """Run _extract_flight_info over every record of a payload."""
+    return [FlightDataProcessor._extract_flight_info(record) for record in records]
+
+
+def best_ms(func, repeat, setup=None):
+    """Best time of one call in milliseconds (setup runs untimed before each call)."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per measurement")
+    parser.add_argument("--records", type=int, default=1000, help="Flight records per payload")
+    args = parser.parse_args()
+
+    records = recent_payload("EX100", args.records)
+    clear_cache = timestamps._parse_time_cached.cache_clear
+
+    original = FlightDataProcessor._parse_time
+    FlightDataProcessor._parse_time = staticmethod(strptime_parse_time)
+    try:
+        expected = extract_all(records)
+        strptime_ms = best_ms(lambda: extract_all(records), args.repeat)
+    finally:
+        FlightDataProcessor._parse_time = original
+
+    assert extract_all(records) == expected, "parsers disagree"
+    cold_ms = best_ms(lambda: extract_all(records), args.repeat, setup=clear_cache)
+    warm_ms = best_ms(lambda: extract_all(records), args.repeat)
+
+    per_record = 1000 / args.records
+    print(f"_extract_flight_info over {args.records} records (per record)")
+    print(f"  strptime loop:        {strptime_ms * per_record:8.2f} us")
+    print(f"  fast path, cold:      {cold_ms * per_record:8.2f} us   ({strptime_ms / cold_ms:.1f}x faster)")
+    print(f"  fast path, memoized:  {warm_ms * per_record:8.2f} us   ({strptime_ms / warm_ms:.1f}x faster)")
+
+    column = [record["departure"]["revisedTime"]["utc"] for record in records]
+    per_string = 1000 / len(column)
+    strptime_column_ms = best_ms(lambda: [strptime_parse_time(value) for value in column], args.repeat)
+    column_ms = best_ms(lambda: timestamps.parse_time_column(column), args.repeat, setup=clear_cache)
+    print(f"\nColumn of {len(column)} timestamps (per timestamp, NumPy: {timestamps.NUMPY_AVAILABLE})")
+    print(f"  strptime loop:        {strptime_column_ms * per_string:8.2f} us")
+    print(f"  parse_time_column:    {column_ms * per_string:8.2f} us   ({strptime_column_ms / column_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 -- ALTER TABLE IF EXISTS flight_routes DISABLE ROW LEVEL SECURITY;
 -- ALTER TABLE IF EXISTS flight_delay_historical DISABLE ROW LEVEL SECURITY;
 -- ALTER TABLE IF EXISTS flight_delay_recent DISABLE ROW LEVEL SECURITY;
+-- ALTER TABLE IF EXISTS flight_reliability_stats DISABLE ROW LEVEL SECURITY;
 
 -- Create EXTENSION for UUID generation if not exists
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -13,6 +14,7 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 DROP TABLE IF EXISTS flight_routes;
 DROP TABLE IF EXISTS flight_delay_historical;
 DROP TABLE IF EXISTS flight_delay_recent;
+DROP TABLE IF EXISTS flight_reliability_stats;
 
 -- ===== FLIGHT ROUTES TABLE =====
 -- Stores flight route information between origin and destination airports
@@ -72,10 +74,31 @@ CREATE TABLE flight_delay_recent (
 -- Create index for faster lookups
 CREATE INDEX idx_flight_delay_recent_flight_number ON flight_delay_recent(flight_number);
 CREATE INDEX idx_flight_delay_recent_week_year ON flight_delay_recent(week_year);
+-- Supports "newest week for a flight" lookups (flight_number = ? ORDER BY week_year DESC LIMIT 1)
+CREATE INDEX idx_flight_delay_recent_flight_week ON flight_delay_recent(flight_number, week_year DESC);
 
 -- Comment on table
 COMMENT ON TABLE flight_delay_recent IS 'Stores recent flight data';
 
+-- ===== FLIGHT RELIABILITY STATS TABLE =====
+-- Stores the combined delay statistics and reliability score derived from the
+-- historical and recent tables, so rankings don't reprocess the raw payloads
+CREATE TABLE flight_reliability_stats (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    flight_number VARCHAR(10) NOT NULL,
+    scoring_version VARCHAR(50), -- Scoring logic and weights the stats were computed with
+    data_version VARCHAR(10), -- Week bucket (YYYY-WW) of the recent data used
+    stats JSONB, -- NULL once the raw data changed and the stats must be recomputed
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    
+    -- One row of derived statistics per flight
+    UNIQUE(flight_number)
+);
+
+-- Comment on table
+COMMENT ON TABLE flight_reliability_stats IS 'Stores derived flight reliability statistics';
+
 -- Function to automatically update the updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -99,4 +122,9 @@ EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_flight_delay_recent_updated_at
 BEFORE UPDATE ON flight_delay_recent
 FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_flight_reliability_stats_updated_at
+BEFORE UPDATE ON flight_reliability_stats
+FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
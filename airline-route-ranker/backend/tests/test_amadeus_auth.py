@@ -0,0 +1,73 @@
+"""
+Tests for the process-wide Amadeus token manager.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import amadeus_auth
+from app.api.amadeus_auth import AmadeusTokenManager
+
+
+class FakeTokenResponse:
+    """Minimal stand-in for an httpx response carrying a token."""
+
+    def __init__(self, token, expires_in):
+        self._data = {"access_token": token, "expires_in": expires_in}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def test_caller_joining_background_refresh_gets_new_token(monkeypatch):
+    monkeypatch.setenv("AMADUS_KEY", "key")
+    monkeypatch.setenv("AMADUS_SECRET", "secret")
+    monkeypatch.setattr(amadeus_auth, "load_dotenv", lambda: None)
+
+    calls = []
+    release_refresh = None
+
+    async def fake_upstream_request(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) == 2:
+            # Hold the background refresh open so a caller can join it
+            await release_refresh.wait()
+        # A long lifetime keeps the token refreshed by the background task
+        # from scheduling another immediate refresh
+        return FakeTokenResponse(f"token-{len(calls)}", 1 if len(calls) == 1 else 3600)
+
+    monkeypatch.setattr(amadeus_auth, "upstream_request", fake_upstream_request)
+
+    async def scenario():
+        nonlocal release_refresh
+        release_refresh = asyncio.Event()
+        manager = AmadeusTokenManager(refresh_margin=1)
+
+        assert await manager.get_token() == "token-1"
+
+        # Let the background task wake up and start its refresh
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        refresh_task = manager._refresh_task
+
+        # A 401 drops the token, and the next search joins the running refresh
+        manager.invalidate("token-1")
+        joined = asyncio.create_task(manager.get_token())
+        await asyncio.sleep(0)
+        release_refresh.set()
+
+        assert await joined == "token-2"
+        assert not refresh_task.cancelled()
+        assert manager._background_task is not None
+        assert not manager._background_task.done()
+        manager._background_task.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+"""
+Tests for the final-response cache of route rankings.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.response_cache import ResponseCache, make_etag, etag_matches
+from app.utils.revalidation import revalidator, _revalidating
+
+
+def store(cache, key, routes=(("AMS", "LHE"),), flights=("EK622",), **kwargs):
+    body = f"body-{key}".encode()
+    return cache.set(key, {"key": key}, body, list(routes), list(flights), **kwargs)
+
+
+def test_entries_are_dropped_when_a_dependency_is_rewritten():
+    cache = ResponseCache(ttl=600, max_entries=10, enabled=True)
+    store(cache, "a", routes=[("AMS", "LHE")], flights=["EK622"])
+    store(cache, "b", routes=[("AMS", "DXB")], flights=["EK148"])
+
+    cache.invalidate_flight("EK622")
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    # Route pairs match regardless of case
+    cache.invalidate_route("ams", "dxb")
+    assert cache.get("b") is None
+    assert cache.get_stats()["invalidations"] == 2
+
+
+def test_response_rewritten_by_a_background_refresh_is_not_stored():
+    cache = ResponseCache(ttl=600, max_entries=10, enabled=True)
+    since = revalidator.generation()
+
+    # A write by the request pipeline itself doesn't make its result outdated
+    cache.invalidate_flight("EK622")
+    assert store(cache, "a", since=since) is not None
+
+    token = _revalidating.set(True)
+    try:
+        cache.invalidate_flight("EK622")
+    finally:
+        _revalidating.reset(token)
+    assert store(cache, "b", since=since) is None
+    assert store(cache, "c", flights=["EK148"], since=since) is not None
+    assert cache.get_stats()["outdated_stores_refused"] == 1
+
+
+def test_etag_revalidation():
+    cache = ResponseCache(ttl=600, max_entries=10, enabled=True)
+    entry = store(cache, "a")
+    etag = entry["etag"]
+
+    assert etag == make_etag(b"body-a")
+    assert cache.get("a")["etag"] == etag
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_shorter_ttl_and_lru_eviction():
+    cache = ResponseCache(ttl=600, max_entries=2, enabled=True)
+    assert store(cache, "expired", ttl=0) is None
+
+    store(cache, "a")
+    store(cache, "b")
+    cache.get("a")
+    store(cache, "c")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get_stats()["evictions"] == 1
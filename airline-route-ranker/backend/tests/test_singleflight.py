@@ -0,0 +1,84 @@
+"""
+Tests for single-flight request coalescing.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        group = SingleFlight("test")
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": calls}
+
+        results = await asyncio.gather(*(group.do("key", compute) for _ in range(5)))
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+
+        # Once finished, the next call runs again
+        assert (await group.do("key", compute))["value"] == 2
+        stats = group.get_stats()
+        assert stats["executions"] == 2
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_exception_is_shared_by_all_callers():
+    async def scenario():
+        group = SingleFlight("test")
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+        assert calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+        # A failed computation is forgotten, so a later call retries
+        with pytest.raises(ValueError):
+            await group.do("key", fail)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        group = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(group.do("key", compute))
+        second = asyncio.create_task(group.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "done"
+        assert first.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+"""
+Tests for the write-behind buffer in front of Supabase cache upserts.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.write_behind import WriteBehindBuffer
+
+
+class FakeTable:
+    """Records the upserts made to one table."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._rows = None
+
+    def upsert(self, rows, on_conflict=None):
+        self._rows = (rows, on_conflict)
+        return self
+
+    def execute(self):
+        self.client.upserts.append((self.name, *self._rows))
+
+
+class FakeClient:
+    """Minimal stand-in for the Supabase client."""
+
+    def __init__(self):
+        self.upserts = []
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+def historical_row(flight_number, value):
+    return {"flight_number": flight_number, "delay_data": {"value": value}}
+
+
+def test_repeated_writes_to_a_key_are_coalesced():
+    client = FakeClient()
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=60)
+
+    buffer.enqueue("flight_delay_historical", historical_row("EK622", 1))
+    buffer.enqueue("flight_delay_historical", historical_row("EK622", 2))
+    buffer.enqueue("flight_delay_historical", historical_row("BA123", 3))
+
+    # Nothing is written until a flush, but pending rows stay readable
+    assert client.upserts == []
+    assert buffer.get_pending("flight_delay_historical", ("EK622",)) == historical_row("EK622", 2)
+
+    assert buffer.flush() == 2
+    assert len(client.upserts) == 1
+    table, rows, on_conflict = client.upserts[0]
+    assert table == "flight_delay_historical"
+    assert on_conflict == "flight_number"
+    assert sorted(rows, key=lambda row: row["flight_number"]) == [
+        historical_row("BA123", 3), historical_row("EK622", 2)
+    ]
+    assert buffer.get_stats()["coalesced"] == 1
+    assert buffer.get_pending("flight_delay_historical", ("EK622",)) is None
+
+    buffer.close()
+
+
+def test_close_flushes_pending_rows():
+    client = FakeClient()
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=60)
+
+    buffer.enqueue("flight_delay_recent", {"flight_number": "EK622", "week_year": "2026-41", "flight_data": []})
+    buffer.enqueue("flight_routes", {"origin_iata": "AMS", "destination_iata": "LHE",
+                                     "route_date": "2026-10-20", "route_data": {}})
+    buffer.close()
+
+    assert sorted(table for table, _, _ in client.upserts) == ["flight_delay_recent", "flight_routes"]
+    assert sum(buffer.get_stats()["pending"].values()) == 0
+
+    # Writes after close are flushed straight away
+    buffer.enqueue("flight_delay_historical", historical_row("EK622", 1))
+    assert client.upserts[-1][0] == "flight_delay_historical"